@@ -1,8 +1,13 @@
-import requests
+import os
+import json
+import threading
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from http_pool import make_session, HostLimiter
+from meeting_catalog import MeetingCatalog, meeting_paths
 
 
 
@@ -13,13 +18,111 @@ def main():
     START_DAY = datetime.strptime("20250519", "%Y%m%d")
     END_DAY = datetime.strptime("20250523", "%Y%m%d")
     LINK_ID = "ctl00_ContentPlaceHolder1_hypMinutes"
+    MAX_WORKERS = 8
+    PER_HOST_LIMIT = 4
+    CATALOG_PATH = Path("meeting_catalog.sqlite")
     ###############################
 
-    download_agendas_from_urls(INPUT_URLS_FOLDER, OUTPUT_RAW_AGENDA_FOLDER, START_DAY, END_DAY, LINK_ID)
+    catalog = MeetingCatalog(CATALOG_PATH)
 
+    download_agendas_from_urls(INPUT_URLS_FOLDER, OUTPUT_RAW_AGENDA_FOLDER, START_DAY, END_DAY, LINK_ID, MAX_WORKERS, PER_HOST_LIMIT, catalog)
 
 
-def download_agendas_from_urls(input_folder: Path, output_folder: Path, start_day: datetime, end_day: datetime, link_id: str):
+class DownloadManifest:
+    """
+    JSON file recording the URL, ETag and size of each downloaded file, and the ETag of interrupted
+    downloads so they are only resumed if the file on the server did not change.
+
+    Parameters:
+    - path (Path): Path object of JSON manifest file.
+    """
+    def __init__(self, path: Path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+
+    def get(self, name: str):
+        with self.lock:
+            return self.entries.get(name)
+
+    def put(self, name: str, entry):
+        with self.lock:
+            self.entries[name] = entry
+            # write then rename so a killed run never leaves a half written manifest
+            tmp_path = self.path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(self.entries, indent=2), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+
+
+def download_file(url: str, output_path: Path, session, limiter: HostLimiter, manifest: DownloadManifest = None, chunk_size: int = 1 << 16):
+    """
+    Streams a file to disk in chunks, writing to a .part file renamed into place once complete.
+    A file already present is skipped if its ETag (or size, if the server sends no ETag) matches the server.
+    An interrupted download is resumed with a Range request if the server still has the same file.
+
+    Parameters:
+    - url (str): string object of file URL.
+    - output_path (Path): Path object of destination file.
+    - session: requests session.
+    - limiter (HostLimiter): HostLimiter object bounding concurrent requests per host.
+    - manifest (DownloadManifest): optional DownloadManifest object of earlier downloads.
+    - chunk_size (int): int object of number of bytes written per chunk.
+    """
+    entry = manifest.get(output_path.name) if manifest is not None else None
+    part_path = output_path.with_name(output_path.name + ".part")
+
+    with limiter.get(url):
+        # already downloaded and unchanged
+        if output_path.exists():
+            head = session.head(url, allow_redirects=True, timeout=30)
+            head.raise_for_status()
+            etag = head.headers.get("ETag")
+            size = head.headers.get("Content-Length")
+
+            # compare ETags when both sides have one, sizes otherwise (e.g. files from before the manifest)
+            if etag and entry and entry.get("etag"):
+                unchanged = entry["etag"] == etag
+            else:
+                unchanged = size is not None and int(size) == output_path.stat().st_size
+
+            if unchanged:
+                if manifest is not None and etag and not (entry and entry.get("etag")):
+                    manifest.put(output_path.name, {"url": url, "etag": etag, "size": output_path.stat().st_size})
+                print(f"skipping, unchanged: {output_path}")
+                return False
+
+        headers = {}
+        resume_from = part_path.stat().st_size if part_path.exists() else 0
+        if resume_from and entry and entry.get("part_etag"):
+            headers["Range"] = f"bytes={resume_from}-"
+            headers["If-Range"] = entry["part_etag"]
+
+        with session.get(url, headers=headers, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            etag = response.headers.get("ETag")
+
+            # 206 continues the part file, anything else starts over
+            if response.status_code == 206:
+                print(f"resuming at byte {resume_from}: {url}")
+                mode = "ab"
+            else:
+                mode = "wb"
+
+            if manifest is not None and etag:
+                manifest.put(output_path.name, {"url": url, "part_etag": etag})
+
+            with open(part_path, mode) as f:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+
+    os.replace(part_path, output_path)
+    if manifest is not None:
+        manifest.put(output_path.name, {"url": url, "etag": etag, "size": output_path.stat().st_size})
+    return True
+
+
+
+def download_agendas_from_urls(input_folder: Path, output_folder: Path, start_day: datetime, end_day: datetime, link_id: str, max_workers: int = 8, per_host_limit: int = 4, catalog: MeetingCatalog = None):
     """
     Downloads agendas from city council website and saves them as PDF files.
 
@@ -29,64 +132,90 @@ def download_agendas_from_urls(input_folder: Path, output_folder: Path, start_da
     - start_day (datetime): datetime object of earliest day in timeframe.
     - end_day (datetime): datetime object of latest day in timeframe. 
     - link_id (str): ID of element with link to downloadable PDF on Meeting Details website.
+    - max_workers (int): int object of number of meetings downloaded concurrently.
+    - per_host_limit (int): int object of maximum concurrent requests per host.
+    - catalog (MeetingCatalog): optional MeetingCatalog object, meetings are looked up there and downloaded PDFs recorded.
     """
     output_folder.mkdir(parents=True, exist_ok=True)
 
-    # iterate through each meeting
-    for txt_file in sorted(input_folder.glob("*.txt")):
-        meeting_date = str(txt_file.name).split("_")[0]
-        meeting_datetime = datetime.strptime(meeting_date, "%Y%m%d")
+    # input URL files are written by hand, so the catalog picks up new or edited ones first
+    if catalog is not None:
+        catalog.sync_folder("legistar_url", input_folder, "*.txt")
+    txt_files = meeting_paths(input_folder, "*.txt", start_day, end_day, catalog, "legistar_url")
 
-        # skip, out of time frame
-        if not (start_day <= meeting_datetime <= end_day):
-            continue
+    session = make_session(max_workers)
+    limiter = HostLimiter(per_host_limit)
+    manifest = DownloadManifest(output_folder / ".downloads.json")
 
-        with open(txt_file, "r", encoding="utf-8") as f:
-            page_url = f.read().strip()
+    # iterate through each meeting, concurrently
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        list(pool.map(lambda txt_file: download_agenda(txt_file, output_folder, link_id, session, limiter, manifest, catalog), txt_files))
 
-        
-        # extract url from file
-        if not page_url:
-            print(f"!!! issue with url file: {txt_file}")
-            continue
 
-        print(f"processing: {page_url}")
+def download_agenda(txt_file: Path, output_folder: Path, link_id: str, session=None, limiter: HostLimiter = None, manifest: DownloadManifest = None, catalog: MeetingCatalog = None):
+    """
+    Downloads the agenda PDF of one meeting.
+
+    Parameters:
+    - txt_file (Path): Path object of txt file containing Legistar Meeting Details URL.
+    - output_folder (Path): Path object of folder where PDF file will be saved.
+    - link_id (str): ID of element with link to downloadable PDF on Meeting Details website.
+    - session: optional requests session shared between meetings.
+    - limiter (HostLimiter): optional HostLimiter object bounding concurrent requests per host.
+    - manifest (DownloadManifest): optional DownloadManifest object of earlier downloads.
+    - catalog (MeetingCatalog): optional MeetingCatalog object where the PDF is recorded.
+    """
+    session = session or make_session(1)
+    limiter = limiter or HostLimiter(1)
+    manifest = manifest or DownloadManifest(output_folder / ".downloads.json")
+
+    with open(txt_file, "r", encoding="utf-8") as f:
+        page_url = f.read().strip()
 
-        # load url
-        try:
-            response = requests.get(page_url, headers={"User-Agent": "Mozilla/5.0"})
-            response.raise_for_status()
-        except Exception as e:
-            print(f"!!! website fail: {page_url}")
-            continue
 
-        soup = BeautifulSoup(response.text, "html.parser")
+    # extract url from file
+    if not page_url:
+        print(f"!!! issue with url file: {txt_file}")
+        return
 
+    print(f"processing: {page_url}")
 
-        # find pdf
-        link_tag = soup.find("a", id=link_id)
-        if not link_tag or not link_tag.get("href"):
-            print(f"!!! pdf not found: {page_url}")
-            continue
+    # load url
+    try:
+        with limiter.get(page_url):
+            response = session.get(page_url, timeout=30)
+        response.raise_for_status()
+    except Exception as e:
+        print(f"!!! website fail: {page_url}")
+        return
 
-        pdf_url = urljoin(page_url, link_tag["href"])
-        print(f"found pdf: {pdf_url}")
+    soup = BeautifulSoup(response.text, "html.parser")
 
 
-        # download pdf
-        try:
-            pdf_response = requests.get(pdf_url, headers={"User-Agent": "Mozilla/5.0"})
-            pdf_response.raise_for_status()
-        except Exception as e:
-            print(f"!!! pdf download fail: {pdf_url}")
-            continue
+    # find pdf
+    link_tag = soup.find("a", id=link_id)
+    if not link_tag or not link_tag.get("href"):
+        print(f"!!! pdf not found: {page_url}")
+        return
 
-        output_filename = output_folder / (txt_file.stem + ".pdf")
-        with open(output_filename, "wb") as f:
-            f.write(pdf_response.content)
+    pdf_url = urljoin(page_url, link_tag["href"])
+    print(f"found pdf: {pdf_url}")
 
+
+    # download pdf
+    output_filename = output_folder / (txt_file.stem + ".pdf")
+    try:
+        downloaded = download_file(pdf_url, output_filename, session, limiter, manifest)
+    except Exception as e:
+        print(f"!!! pdf download fail: {pdf_url}")
+        return
+
+    if downloaded:
         print(f"pdf saved: '{output_filename}'\n")
 
+    if catalog is not None:
+        catalog.record("agenda_pdf", output_filename)
+
 
 
 
@@ -1,6 +1,15 @@
+import os
+import json
+import hashlib
 import pdfplumber
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from meeting_catalog import MeetingCatalog, meeting_paths
+
+
+# separates pages in processed agenda text, text.split(PAGE_BREAK) gives one entry per PDF page
+PAGE_BREAK = "\f"
 
 
 def main():
@@ -9,58 +18,157 @@ def main():
     OUTPUT_PROCESSED_AGENDA_FOLDER = Path("agendas_processed")
     START_DAY = datetime.strptime("20250519", "%Y%m%d")
     END_DAY = datetime.strptime("20250523", "%Y%m%d")
+    TEXT_BACKEND = "pymupdf"  # "pymupdf" (fast) or "pdfplumber", pdfplumber is always the fallback
+    WORKERS = os.cpu_count()
+    CATALOG_PATH = Path("meeting_catalog.sqlite")
     ###############################
 
-    process_agendas(INPUT_RAW_AGENDA_FOLDER, OUTPUT_PROCESSED_AGENDA_FOLDER, START_DAY, END_DAY)
+    catalog = MeetingCatalog(CATALOG_PATH)
+
+    process_agendas(INPUT_RAW_AGENDA_FOLDER, OUTPUT_PROCESSED_AGENDA_FOLDER, START_DAY, END_DAY, TEXT_BACKEND, WORKERS, catalog)
 
 
-def process_pdf_to_text(pdf_path: Path, output_path: Path):
+def extract_pages_pdfplumber(pdf_path: Path, page_numbers):
     """
-    Extracts text from all pages of a PDF file and writes it to a TXT file.
+    Extracts text of the given pages with pdfplumber. Returns one string per page.
 
     Parameters:
     - pdf_path (Path): Path object of the input PDF file.
-    - output_path (Path): Path object of where the extracted text will be saved as a TXT file.
-    - start_day (datetime): datetime object of earliest day in timeframe.
-    - end_day (datetime): datetime object of latest day in timeframe. 
+    - page_numbers: list of zero-based page numbers.
+    """
+    with pdfplumber.open(pdf_path) as pdf:
+        return [pdf.pages[i].extract_text() or "" for i in page_numbers]
+
+
+def extract_pages_pymupdf(pdf_path: Path, page_numbers):
+    """
+    Extracts text of the given pages with PyMuPDF. Returns one string per page.
+
+    Parameters:
+    - pdf_path (Path): Path object of the input PDF file.
+    - page_numbers: list of zero-based page numbers.
+    """
+    import pymupdf
+
+    texts = []
+    with pymupdf.open(pdf_path) as pdf:
+        for i in page_numbers:
+            # reading order by position, with layout spacing collapsed like pdfplumber output
+            lines = pdf[i].get_text(sort=True).splitlines()
+            texts.append("\n".join(" ".join(line.split()) for line in lines if line.strip()))
+    return texts
+
+
+TEXT_BACKENDS = {
+    "pdfplumber": extract_pages_pdfplumber,
+    "pymupdf": extract_pages_pymupdf,
+}
+
+
+def extract_pages(pdf_path: Path, page_numbers, backend: str):
+    """
+    Extracts text of the given pages with a text backend. Pages the backend fails on or finds no text in
+    (unusual layouts) are extracted again with pdfplumber. Runs in a worker process.
+
+    Parameters:
+    - pdf_path (Path): Path object of the input PDF file.
+    - page_numbers: list of zero-based page numbers.
+    - backend (str): string object of name of text backend in TEXT_BACKENDS.
     """
+    if backend == "pdfplumber":
+        return extract_pages_pdfplumber(pdf_path, page_numbers)
+
+    try:
+        texts = TEXT_BACKENDS[backend](pdf_path, page_numbers)
+    except Exception as e:
+        print(f"!!! {backend} failed on {pdf_path}, using pdfplumber: {e}")
+        return extract_pages_pdfplumber(pdf_path, page_numbers)
+
+    retry = [i for i, text in enumerate(texts) if not text]
+    if retry:
+        for i, text in zip(retry, extract_pages_pdfplumber(pdf_path, [page_numbers[i] for i in retry])):
+            texts[i] = text
+    return texts
+
+
+def count_pages(pdf_path: Path):
     with pdfplumber.open(pdf_path) as pdf:
-        all_text = ""
-        for page in pdf.pages:
-            page_text = page.extract_text()
-            if page_text:
-                all_text += page_text + "\n\n"
+        return len(pdf.pages)
+
+
+def file_hash(path: Path):
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def process_pdf_to_text(pdf_path: Path, output_path: Path, backend: str = "pdfplumber", pool=None, workers: int = 1):
+    """
+    Extracts text from all pages of a PDF file and writes it to a TXT file, pages separated by PAGE_BREAK.
+    With a process pool, pages are split into contiguous ranges extracted in parallel.
+
+    Parameters:
+    - pdf_path (Path): Path object of the input PDF file.
+    - output_path (Path): Path object of where the extracted text will be saved as a TXT file.
+    - backend (str): string object of name of text backend in TEXT_BACKENDS.
+    - pool: optional ProcessPoolExecutor, None to extract in this process.
+    - workers (int): int object of number of page ranges the PDF is split into.
+    """
+    n_pages = count_pages(pdf_path)
+    pages = list(range(n_pages))
+
+    if pool is None or n_pages < 2:
+        page_texts = extract_pages(pdf_path, pages, backend)
+    else:
+        size = -(-n_pages // workers)
+        ranges = [pages[i:i + size] for i in range(0, n_pages, size)]
+        futures = [pool.submit(extract_pages, pdf_path, page_range, backend) for page_range in ranges]
+        page_texts = [text for future in futures for text in future.result()]
 
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    output_path.write_text(all_text, encoding="utf-8")
+    output_path.write_text(PAGE_BREAK.join(text + "\n\n" for text in page_texts), encoding="utf-8")
+    return n_pages
 
 
-def process_agendas(input_folder: Path, output_folder: Path, start_day: datetime, end_day: datetime):
+def process_agendas(input_folder: Path, output_folder: Path, start_day: datetime, end_day: datetime, backend: str = "pdfplumber", workers: int = 1, catalog: MeetingCatalog = None):
     """
     Processes all agenda PDF files under a given input folder, extracting text and saving
-    each as a corresponding TXT file in the output folder.
+    each as a corresponding TXT file in the output folder. PDFs with the same content hash
+    and backend as in an earlier run are skipped.
 
     Parameters:
     - input_folder (Path): Path object of folder containing PDF files.
     - output_folder (Path): Path object of folder to save the processed TXT files.
+    - start_day (datetime): datetime object of earliest day in timeframe.
+    - end_day (datetime): datetime object of latest day in timeframe.
+    - backend (str): string object of name of text backend in TEXT_BACKENDS.
+    - workers (int): int object of number of worker processes extracting pages.
+    - catalog (MeetingCatalog): optional MeetingCatalog object, PDFs are looked up there and TXT files recorded.
     """
     output_folder.mkdir(parents=True, exist_ok=True)
 
-    for pdf_path in sorted(input_folder.rglob("*.pdf")):
-        meeting_date = str(pdf_path.name).split("_")[0]
-        meeting_datetime = datetime.strptime(meeting_date, "%Y%m%d")
+    # content hashes of PDFs extracted in earlier runs
+    hashes_path = output_folder / ".pdf_hashes.json"
+    hashes = json.loads(hashes_path.read_text(encoding="utf-8")) if hashes_path.exists() else {}
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for pdf_path in meeting_paths(input_folder, "*.pdf", start_day, end_day, catalog, "agenda_pdf"):
+            file_stem = pdf_path.stem
+            output_txt_path = output_folder / f"{file_stem}.txt"
+
+            digest = f"{backend}:{file_hash(pdf_path)}"
+            if output_txt_path.exists() and hashes.get(pdf_path.name) == digest:
+                print(f"skipping, unchanged: {pdf_path}")
+                continue
+
+            print(f"processing: {pdf_path}")
 
-        # skip, out of time frame
-        if not (start_day <= meeting_datetime <= end_day):
-            continue
-        
-        file_stem = pdf_path.stem  
-        output_txt_path = output_folder / f"{file_stem}.txt"
+            # process individual file
+            process_pdf_to_text(pdf_path, output_txt_path, backend, pool, workers)
 
-        print(f"processing: {pdf_path}")
+            hashes[pdf_path.name] = digest
+            hashes_path.write_text(json.dumps(hashes, indent=2), encoding="utf-8")
 
-        # process individual file
-        process_pdf_to_text(pdf_path, output_txt_path)
+            if catalog is not None:
+                catalog.record("agenda_text", output_txt_path)
 
 
 if __name__ == "__main__":
@@ -5,6 +5,8 @@ import csv
 from pathlib import Path
 import os
 from datetime import datetime
+from llm_cache import LLMCache, CachedClient
+from meeting_catalog import MeetingCatalog, meeting_paths
 
 
 
@@ -18,12 +20,18 @@ def main():
     START_DAY = datetime.strptime("20250519", "%Y%m%d")
     END_DAY = datetime.strptime("20250523", "%Y%m%d")
     SEGMENTATION_MODEL = "claude-3-5-haiku-20241022"
+    LLM_CACHE_PATH = Path("llm_cache.sqlite")
+    BYPASS_LLM_CACHE = False
+    CATALOG_PATH = Path("meeting_catalog.sqlite")
     ################################
 
 
-    client = anthropic.Anthropic(api_key=CLAUDE_KEY)
+    cache = LLMCache(LLM_CACHE_PATH, bypass=BYPASS_LLM_CACHE)
+    client = CachedClient(anthropic.Anthropic(api_key=CLAUDE_KEY), cache)
+    catalog = MeetingCatalog(CATALOG_PATH)
 
-    segment_all_agendas(INPUT_PROCESSED_AGENDA_FOLDER, OUTPUT_AGENDA_SEGMENTS_FOLDER, START_DAY, END_DAY, SEGMENTATION_MODEL, client)
+    segment_all_agendas(INPUT_PROCESSED_AGENDA_FOLDER, OUTPUT_AGENDA_SEGMENTS_FOLDER, START_DAY, END_DAY, SEGMENTATION_MODEL, client, catalog)
+    cache.report()
 
 
 
@@ -101,7 +109,7 @@ def save_json_segments_to_csv(json_string: str, output_path: Path):
 
 
 
-def segment_all_agendas(input_folder: Path, output_folder: Path, start_day: datetime, end_day: datetime, segmentation_model: str, client):
+def segment_all_agendas(input_folder: Path, output_folder: Path, start_day: datetime, end_day: datetime, segmentation_model: str, client, catalog: MeetingCatalog = None):
     """
     Prompts Claude to segment TXT meeting agendas and saves segments as CSV.
 
@@ -112,17 +120,11 @@ def segment_all_agendas(input_folder: Path, output_folder: Path, start_day: date
     - end_day (datetime): datetime object of latest day in timeframe. 
     - segmentation_model (str): string object of Claude model alias to segment.
     - client: Claude API client. 
+    - catalog (MeetingCatalog): optional MeetingCatalog object, agenda TXT files are looked up there and segments recorded.
     """
     output_folder.mkdir(parents=True, exist_ok=True)
 
-    for file_path in sorted(input_folder.rglob("*.txt")):
-        meeting_date = str(file_path.name).split("_")[0]
-        meeting_datetime = datetime.strptime(meeting_date, "%Y%m%d")
-
-        # skip, out of time frame
-        if not (start_day <= meeting_datetime <= end_day):
-            continue
-
+    for file_path in meeting_paths(input_folder, "*.txt", start_day, end_day, catalog, "agenda_text"):
         print(f"Segmenting {file_path}")
         file_stem = file_path.stem
         output_path = output_folder / f"{file_stem}.csv"
@@ -131,6 +133,9 @@ def segment_all_agendas(input_folder: Path, output_folder: Path, start_day: date
         segments_json = claude_segment(text, segmentation_model, client)
         save_json_segments_to_csv(segments_json, output_path)
 
+        if catalog is not None:
+            catalog.record("agenda_segments", output_path)
+
 
 
 
@@ -5,6 +5,7 @@ from urllib.parse import urljoin
 import csv
 import re
 from datetime import datetime
+from meeting_catalog import MeetingCatalog, meeting_paths
 
 
 def main():
@@ -14,13 +15,15 @@ def main():
     START_DAY = datetime.strptime("20250519", "%Y%m%d")
     END_DAY = datetime.strptime("20250523", "%Y%m%d")
     TABLE_ID = "ctl00_ContentPlaceHolder1_gridMain_ctl00"
+    CATALOG_PATH = Path("meeting_catalog.sqlite")
     ###############################
 
+    catalog = MeetingCatalog(CATALOG_PATH)
 
-    fetch_links(INPUT_URL_FOLDER, OUTPUT_LEGISLATION_FOLDER, START_DAY, END_DAY, TABLE_ID)
+    fetch_links(INPUT_URL_FOLDER, OUTPUT_LEGISLATION_FOLDER, START_DAY, END_DAY, TABLE_ID, catalog)
 
 
-def fetch_links(input_folder: Path, output_folder: Path, start_day: datetime, end_day: datetime, table_id: str):
+def fetch_links(input_folder: Path, output_folder: Path, start_day: datetime, end_day: datetime, table_id: str, catalog: MeetingCatalog = None):
     """
     Finds and stores the URLs to legislations for each meeting in input folder and stores as CSV in output folder.
 
@@ -30,71 +33,85 @@ def fetch_links(input_folder: Path, output_folder: Path, start_day: datetime, en
     - start_day (datetime): datetime object of earliest day in timeframe.
     - end_day (datetime): datetime object of latest day in timeframe. 
     - table_id (str): str object of element ID containing table of items (bills, proclamations, etc) on Meeting Details webpage.
+    - catalog (MeetingCatalog): optional MeetingCatalog object, meetings are looked up there and link CSVs recorded.
     """
     output_folder.mkdir(exist_ok=True, parents=True)
 
+    # input URL files are written by hand, so the catalog picks up new or edited ones first
+    if catalog is not None:
+        catalog.sync_folder("legistar_url", input_folder, "*.txt")
+
     # iterate through each TXT file
-    for txt_file in sorted(input_folder.glob("*.txt")):
-        meeting_date = str(txt_file.name).split("_")[0]
-        meeting_datetime = datetime.strptime(meeting_date, "%Y%m%d")
+    for txt_file in meeting_paths(input_folder, "*.txt", start_day, end_day, catalog, "legistar_url"):
+        fetch_meeting_links(txt_file, output_folder, table_id, catalog)
+
+
+def fetch_meeting_links(txt_file: Path, output_folder: Path, table_id: str, catalog: MeetingCatalog = None):
+    """
+    Finds and stores the URLs to legislations of one meeting as CSV in output folder.
 
-        # skip, out of time frame
-        if not (start_day <= meeting_datetime <= end_day):
-            continue
+    Parameters:
+    - txt_file (Path): Path object of TXT file containing URL to Legistar Meeting Details webpage.
+    - output_folder (Path): Path object of folder where CSV of legislation URLs will be saved.
+    - table_id (str): str object of element ID containing table of items (bills, proclamations, etc) on Meeting Details webpage.
+    - catalog (MeetingCatalog): optional MeetingCatalog object where the link CSV is recorded.
+    """
+    # extract url from TXT file
+    with open(txt_file, "r", encoding="utf-8") as f:
+        page_url = f.read().strip()
 
-        # extract url from TXT file
-        with open(txt_file, "r", encoding="utf-8") as f:
-            page_url = f.read().strip()
+    if not page_url:
+        print(f"!!! skipping empty file: {txt_file}")
+        return
 
-        if not page_url:
-            print(f"!!! skipping empty file: {txt_file}")
-            continue
 
+    # load webpage
+    print(f"processing: {page_url}")
 
-        # load webpage
-        print(f"processing: {page_url}")
+    try:
+        response = requests.get(page_url, headers={"User-Agent": "Mozilla/5.0"})
+        response.raise_for_status()
+    except Exception as e:
+        print(f"!!! webpage fail: {page_url}")
+        return
 
-        try:
-            response = requests.get(page_url, headers={"User-Agent": "Mozilla/5.0"})
-            response.raise_for_status()
-        except Exception as e:
-            print(f"!!! webpage fail: {page_url}")
-            continue
+    soup = BeautifulSoup(response.text, "html.parser")
 
-        soup = BeautifulSoup(response.text, "html.parser")
 
 
+    # extract table from webpage using table_id
+    table = soup.find("table", id=table_id)
+    if not table:
+        print(f"No table with id '{table_id}' found on page.")
+        return
 
-        # extract table from webpage using table_id
-        table = soup.find("table", id=table_id)
-        if not table:
-            print(f"No table with id '{table_id}' found on page.")
-            continue
+    output_csv_path = output_folder / f"{txt_file.stem}.csv"
 
-        output_csv_path = output_folder / f"{txt_file.stem}.csv"
 
+    # extract and save URLs of legislation and their corresponding item
+    with open(output_csv_path, "w", newline="", encoding="utf-8") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["item", "link"])
 
-        # extract and save URLs of legislation and their corresponding item
-        with open(output_csv_path, "w", newline="", encoding="utf-8") as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(["item", "link"])
+        # iterate table rows
+        for row in table.find_all("tr"):
+            cells = row.find_all("td")
+            if not cells:
+                continue
 
-            # iterate table rows
-            for row in table.find_all("tr"):
-                cells = row.find_all("td")
-                if not cells:
-                    continue
+            first_col = cells[0]
+            text = re.sub(r"[a-zA-Z\s]", "", first_col.get_text(strip=True))
+            links = first_col.find_all("a", href=True)
 
-                first_col = cells[0]
-                text = re.sub(r"[a-zA-Z\s]", "", first_col.get_text(strip=True))
-                links = first_col.find_all("a", href=True)
+            for a in links:
+                href = urljoin(page_url, a["href"])
+                if text and href:
+                    writer.writerow([text, href])
 
-                for a in links:
-                    href = urljoin(page_url, a["href"])
-                    if text and href:
-                        writer.writerow([text, href])
+    print(f"saved CSV: {output_csv_path}")
 
-        print(f"saved CSV: {output_csv_path}")
+    if catalog is not None:
+        catalog.record("legislation_links", output_csv_path)
 
 
 if __name__ == "__main__":
@@ -1,4 +1,7 @@
 import pandas as pd
+from bs4 import BeautifulSoup
+from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
@@ -10,6 +13,9 @@ from webdriver_manager.chrome import ChromeDriverManager
 from pathlib import Path
 import time
 from datetime import datetime
+from legislation_store import LegislationStore, matter_key
+from http_pool import make_session, HostLimiter
+from meeting_catalog import MeetingCatalog, meeting_paths
 
 
 def main():
@@ -19,8 +25,25 @@ def main():
     END_DAY = datetime.strptime("20250523", "%Y%m%d")
     TAB_XPATH = '//li[contains(@class, "rtsLI") and contains(@class, "rtsLast")]//span[contains(@class, "rtsTxt") and text()="Text"]/ancestor::li'
     TEXT_ID = "ctl00_ContentPlaceHolder1_pageText"
+    USE_HTTP = True  # plain HTTP first, Selenium only for pages where it fails
+    MAX_WORKERS = 8
+    PER_HOST_LIMIT = 4
+    LEGISLATION_STORE_PATH = Path("legislation_store.sqlite")
+    LEGISLATION_TTL_DAYS = 7
+    CATALOG_PATH = Path("meeting_catalog.sqlite")
     ###############################
 
+    store = LegislationStore(LEGISLATION_STORE_PATH, LEGISLATION_TTL_DAYS * 24 * 60 * 60)
+    catalog = MeetingCatalog(CATALOG_PATH)
+
+    fetch_text(INPUT_LEGISLATION_FOLDER, START_DAY, END_DAY, TAB_XPATH, TEXT_ID, USE_HTTP, MAX_WORKERS, PER_HOST_LIMIT, store, catalog)
+    store.report()
+
+
+def make_driver():
+    """
+    Starts a headless Chrome web driver.
+    """
     # headless scraper
     chrome_options = Options()
     chrome_options.add_argument("--headless")
@@ -28,85 +51,225 @@ def main():
     chrome_options.add_argument("--window-size=1920,1080")
 
     # use webdriver-manager to auto-handle driver
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+    return webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+
+
+def fetch_text_http(url: str, text_id: str, session, limiter: HostLimiter, store: LegislationStore = None):
+    """
+    Fetches the text of a legislation by plain HTTP. The "Text" tab content is already in the page HTML,
+    so no rendering or tab click is needed. Returns None if the text element is not found.
+    If the matter is in the store but older than the TTL, it is revalidated with a conditional request.
+
+    Parameters:
+    - url (str): string object of Legistar legislation URL.
+    - text_id (str): str object of id of element containing text of legislation on webpage.
+    - session: requests session.
+    - limiter (HostLimiter): HostLimiter object bounding concurrent requests per host.
+    - store (LegislationStore): optional LegislationStore object of texts from earlier runs.
+    """
+    key = matter_key(url)
+    entry = store.get(key) if store is not None else None
+
+    headers = {}
+    if entry is not None:
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    with limiter.get(url):
+        response = session.get(url, headers=headers, timeout=30)
+
+    # unchanged since last fetch
+    if entry is not None and response.status_code == 304:
+        store.touch(key)
+        store.count("revalidated")
+        return entry["text"]
+
+    response.raise_for_status()
+
+    soup = BeautifulSoup(response.text, "html.parser")
+    content_div = soup.find(id=text_id)
+    if content_div is None:
+        return None
+
+    # check for "Click here for full text" link
+    full_text_link = content_div.find("a", string=lambda s: s and "Click here for full text" in s)
+    if full_text_link and full_text_link.get("href"):
+        full_text_url = urljoin(url, full_text_link["href"])
+        print(f"    Found full text link, fetching {full_text_url}")
+        with limiter.get(full_text_url):
+            full_response = session.get(full_text_url, timeout=30)
+        full_response.raise_for_status()
+
+        content_div = BeautifulSoup(full_response.text, "html.parser").find(id=text_id)
+        if content_div is None:
+            return None
+
+    text_content = content_div.get_text("\n", strip=True)
+    if not text_content:
+        return None
+
+    if store is not None:
+        store.put(key, url, text_content, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        store.count("misses")
+    return text_content
+
+
+def fetch_text_selenium(url: str, tab_xpath: str, text_id: str, driver):
+    """
+    Fetches the text of a legislation by rendering the page in a web driver and clicking the "Text" tab.
+
+    Parameters:
+    - url (str): string object of Legistar legislation URL.
+    - tab_xpath (str): str object of xpath to switch Legistar webpage to display text of legislation.
+    - text_id (str): str object of id of element containing text of legislation on webpage.
+    - driver: web driver object.
+    """
+    driver.get(url)
+    wait = WebDriverWait(driver, 5)
+
+    # click the "Text" tab
+    tab_element = wait.until(EC.element_to_be_clickable((By.XPATH, tab_xpath)))
+    tab_element.click()
 
-    fetch_text(INPUT_LEGISLATION_FOLDER, START_DAY, END_DAY, TAB_XPATH, TEXT_ID, driver)
+    # check and access element containing text
+    content_div = wait.until(EC.visibility_of_element_located((By.ID, text_id)))
+    text_content = content_div.text.strip()
 
+    # check for "Click here for full text" link
+    try:
+        full_text_link = content_div.find_element(By.LINK_TEXT, "Click here for full text")
+        if full_text_link:
+            full_text_url = full_text_link.get_attribute("href")
+            print(f"    Found full text link, navigating to {full_text_url}")
+            driver.get(full_text_url)
 
-def fetch_text(input_folder: Path, start_day: datetime, end_day: datetime, tab_xpath: str, text_id, driver):
+            content_div = wait.until(EC.visibility_of_element_located((By.ID, text_id)))
+            text_content = content_div.text.strip()
+    except (TimeoutException, NoSuchElementException):
+        # text not long enough to have "Click here for full text" link
+        pass
+
+    return text_content
+
+
+def fetch_text(input_folder: Path, start_day: datetime, end_day: datetime, tab_xpath: str, text_id, use_http: bool = True, max_workers: int = 8, per_host_limit: int = 4, store: LegislationStore = None, catalog: MeetingCatalog = None):
     """
     Fetches the text of legislations on the Legistar webpage and saves with corresponding item and link.
 
     Parameters:
     - input_folder (Path): Path object of folder containing CSVs with links to legislations texts. Also where legislations texts will be saved.
     - start_day (datetime): datetime object of earliest day in timeframe.
-    - end_day (datetime): datetime object of latest day in timeframe. 
+    - end_day (datetime): datetime object of latest day in timeframe.
     - tab_xpath (str): str object of xpath to switch Legistar webpage to display text of legislation.
     - text_id (str): str object of id of element containing text of legislation on webpage.
-    - driver: web driver object.
+    - use_http (bool): bool object, if True pages are fetched by plain HTTP first and Selenium is only used where that fails.
+    - max_workers (int): int object of number of concurrent HTTP fetches.
+    - per_host_limit (int): int object of maximum concurrent HTTP fetches per host.
+    - store (LegislationStore): optional LegislationStore object, matters already in it are not fetched again.
+    - catalog (MeetingCatalog): optional MeetingCatalog object, link CSVs are looked up there and legislation texts recorded.
     """
+    # web driver is only started if a page needs it
+    drivers = []
+
+    def get_driver():
+        if not drivers:
+            drivers.append(make_driver())
+        return drivers[0]
+
+    session = make_session(max_workers) if use_http else None
+    limiter = HostLimiter(per_host_limit)
+
     try:
-        for csv_file in sorted(input_folder.rglob("*.csv")):
-            meeting_date = str(csv_file.name).split("_")[0]
-            meeting_datetime = datetime.strptime(meeting_date, "%Y%m%d")
+        for csv_file in meeting_paths(input_folder, "*.csv", start_day, end_day, catalog, "legislation_links"):
+            fetch_meeting_text(csv_file, tab_xpath, text_id, get_driver, session, limiter, max_workers, store, catalog)
+
+    finally:
+        for driver in drivers:
+            driver.quit()
+
+
+def fetch_meeting_text(csv_file: Path, tab_xpath: str, text_id: str, get_driver, session=None, limiter: HostLimiter = None, max_workers: int = 8, store: LegislationStore = None, catalog: MeetingCatalog = None):
+    """
+    Fetches the text of legislations of one meeting on the Legistar webpage and saves with corresponding item and link.
 
-            # skip, out of time frame
-            if not (start_day <= meeting_datetime <= end_day):
-                continue
+    Parameters:
+    - csv_file (Path): Path object of CSV with links to legislations texts. Also where legislations texts will be saved.
+    - tab_xpath (str): str object of xpath to switch Legistar webpage to display text of legislation.
+    - text_id (str): str object of id of element containing text of legislation on webpage.
+    - get_driver: function returning the web driver object, only called if a page needs Selenium.
+    - session: requests session for the HTTP fast path, None to only use Selenium.
+    - limiter (HostLimiter): HostLimiter object bounding concurrent requests per host.
+    - max_workers (int): int object of number of concurrent HTTP fetches.
+    - store (LegislationStore): optional LegislationStore object, matters already in it are not fetched again.
+    - catalog (MeetingCatalog): optional MeetingCatalog object where the legislation texts CSV is recorded.
+    """
+    print(f"processing file: {csv_file}")
+    df = pd.read_csv(csv_file)
 
-            print(f"processing file: {csv_file}")
-            df = pd.read_csv(csv_file)
+    if "link" not in df.columns:
+        print(f"!!! error with CSV file: {csv_file}.")
+        return
 
-            if "link" not in df.columns:
-                print(f"!!! error with CSV file: {csv_file}.")
-                continue
+    urls = list(df["link"])
+    texts = [None] * len(urls)
 
-            texts = []
+    # matters already seen in an earlier meeting
+    if store is not None:
+        for i, url in enumerate(urls):
+            entry = store.get(matter_key(url))
+            if entry is not None and store.is_fresh(entry):
+                store.count("hits")
+                texts[i] = entry["text"]
 
-            for _, url in enumerate(df["link"]):
-                print(f"opening legislation url: {url}")
-                try:
-                    driver.get(url)
-                    wait = WebDriverWait(driver, 5)
+    # fast path, concurrent plain HTTP
+    if session is not None:
+        limiter = limiter or HostLimiter(max_workers)
 
-                    # click the "Text" tab
-                    tab_element = wait.until(EC.element_to_be_clickable((By.XPATH, tab_xpath)))
-                    tab_element.click()
+        def fetch(i):
+            if texts[i] is not None:
+                return texts[i]
+            try:
+                return fetch_text_http(urls[i], text_id, session, limiter, store)
+            except Exception:
+                return None
 
-                    # check and access element containing text
-                    content_div = wait.until(EC.visibility_of_element_located((By.ID, text_id)))
-                    text_content = content_div.text.strip()
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            texts = list(pool.map(fetch, range(len(urls))))
 
-                    # check for "Click here for full text" link
-                    try:
-                        full_text_link = content_div.find_element(By.LINK_TEXT, "Click here for full text")
-                        if full_text_link:
-                            full_text_url = full_text_link.get_attribute("href")
-                            print(f"    Found full text link, navigating to {full_text_url}")
-                            driver.get(full_text_url)
+        for url, text_content in zip(urls, texts):
+            if text_content is not None:
+                print(f"retrieved text length: {len(text_content)} ({url})")
 
-                            content_div = wait.until(EC.visibility_of_element_located((By.ID, text_id)))
-                            text_content = content_div.text.strip()
-                    except (TimeoutException, NoSuchElementException):
-                        # text not long enough to have "Click here for full text" link
-                        pass
+    # slow path, Selenium for pages the fast path could not read
+    for i, url in enumerate(urls):
+        if texts[i] is not None:
+            continue
 
-                    print(f"retrieved text length: {len(text_content)}")
-                    texts.append(text_content)
+        print(f"opening legislation url: {url}")
+        try:
+            text_content = fetch_text_selenium(url, tab_xpath, text_id, get_driver())
+            print(f"retrieved text length: {len(text_content)}")
+            texts[i] = text_content
 
-                except Exception:
-                    print(f"!!! error processing url: {url}")
-                    # default value
-                    texts.append("NO_LEGISLATION")
+            if store is not None:
+                store.put(matter_key(url), url, text_content)
+                store.count("misses")
 
-                time.sleep(1)
+        except Exception:
+            print(f"!!! error processing url: {url}")
+            # default value
+            texts[i] = "NO_LEGISLATION"
 
-            df["text"] = texts
-            df.to_csv(csv_file, index=False)
-            print(f"saved with legislation texts: {csv_file}")
+        time.sleep(1)
 
-    finally:
-        driver.quit()
+    df["text"] = texts
+    df.to_csv(csv_file, index=False)
+    print(f"saved with legislation texts: {csv_file}")
+
+    if catalog is not None:
+        catalog.record("legislations", csv_file)
 
 
 if __name__ == "__main__":
@@ -1,6 +1,9 @@
 import pandas as pd
+from collections import deque
 from pathlib import Path
 from datetime import datetime
+from artifact_store import ArtifactStore
+from meeting_catalog import MeetingCatalog, meeting_paths
 
 def main():
     ######## CONFIGURATION ########
@@ -8,13 +11,19 @@ def main():
     LEGISLATION_FOLDER = Path("legislations")
     START_DAY = datetime.strptime("20250519", "%Y%m%d")
     END_DAY = datetime.strptime("20250523", "%Y%m%d")
+    USE_ARTIFACT_STORE = False  # add columns in the artifact store instead of rewriting agenda segments CSVs
+    ARTIFACT_STORE_PATH = Path("artifacts.sqlite")
+    CATALOG_PATH = Path("meeting_catalog.sqlite")
     ###############################
 
-    match_legislation_to_agenda_segments(AGENDA_SEGMENTS_FOLDER, LEGISLATION_FOLDER, START_DAY, END_DAY)
+    store = ArtifactStore(ARTIFACT_STORE_PATH) if USE_ARTIFACT_STORE else None
+    catalog = MeetingCatalog(CATALOG_PATH)
 
+    match_legislation_to_agenda_segments(AGENDA_SEGMENTS_FOLDER, LEGISLATION_FOLDER, START_DAY, END_DAY, store, catalog)
 
 
-def match_legislation_to_agenda_segments(agenda_segments_folder: Path, legislations_folder: Path, start_day: datetime, end_day: datetime):
+
+def match_legislation_to_agenda_segments(agenda_segments_folder: Path, legislations_folder: Path, start_day: datetime, end_day: datetime, store: ArtifactStore = None, catalog: MeetingCatalog = None):
     """
     Iterates through agenda segments to match corresponding legislation texts.
 
@@ -23,39 +32,139 @@ def match_legislation_to_agenda_segments(agenda_segments_folder: Path, legislati
     - legislations_folder (Path): Path object containing CSV files containing legislations texts.
     - start_day (datetime): datetime object of earliest day in timeframe.
     - end_day (datetime): datetime object of latest day in timeframe. 
+    - store (ArtifactStore): optional ArtifactStore object, matched legislations are saved there instead of the CSV.
+    - catalog (MeetingCatalog): optional MeetingCatalog object, legislation texts are looked up there and matches recorded.
     """
 
-    for leg_file in sorted(legislations_folder.rglob("*.csv")):
-        meeting_date = str(leg_file.name).split("_")[0]
-        meeting_datetime = datetime.strptime(meeting_date, "%Y%m%d")
+    for leg_file in meeting_paths(legislations_folder, "*.csv", start_day, end_day, catalog, "legislations"):
+        aseg_file = agenda_segments_folder / leg_file.name
+        match_meeting_legislation(leg_file, aseg_file, store)
 
-        # skip, out of time frame
-        if not (start_day <= meeting_datetime <= end_day):
-            continue
+        if catalog is not None:
+            catalog.record("matched_legislation", aseg_file)
 
-        print(f"matching: {leg_file}")
-        aseg_file = agenda_segments_folder / leg_file.name
-        
-        # read CSV files
-        aseg_df = pd.read_csv(aseg_file)
-        leg_df = pd.read_csv(leg_file)
+
+def build_automaton(patterns):
+    """
+    Builds an Aho-Corasick automaton over patterns, so all of them can be found in one pass over a text.
+
+    Parameters:
+    - patterns: list of unique pattern strings.
+    """
+    goto = [{}]
+    fail = [0]
+    output = [[]]
+
+    # trie of all patterns
+    for pattern_id, pattern in enumerate(patterns):
+        state = 0
+        for char in pattern:
+            if char not in goto[state]:
+                goto.append({})
+                fail.append(0)
+                output.append([])
+                goto[state][char] = len(goto) - 1
+            state = goto[state][char]
+        output[state].append(pattern_id)
+
+    # failure links, breadth first
+    queue = deque(goto[0].values())
+    while queue:
+        state = queue.popleft()
+        for char, next_state in goto[state].items():
+            queue.append(next_state)
+            f = fail[state]
+            while f and char not in goto[f]:
+                f = fail[f]
+            fail[next_state] = goto[f][char] if char in goto[f] and goto[f][char] != next_state else 0
+            output[next_state] = output[next_state] + output[fail[next_state]]
+
+    return goto, fail, output
+
+
+def find_patterns(text: str, automaton):
+    """
+    Returns the set of pattern ids that occur in text.
+
+    Parameters:
+    - text (str): string object to scan.
+    - automaton: automaton returned by build_automaton.
+    """
+    goto, fail, output = automaton
+    found = set()
+    state = 0
+    for char in text:
+        while state and char not in goto[state]:
+            state = fail[state]
+        state = goto[state].get(char, 0)
+        if output[state]:
+            found.update(output[state])
+    return found
+
+
+def match_legislation(aseg_df, leg_df):
+    """
+    Adds matched_legislation column to agenda segments: the texts of every legislation whose item number appears in
+    the segment, concatenated in legislation order. Each segment is scanned once for all item numbers.
+
+    Parameters:
+    - aseg_df: DataFrame of agenda segments with agenda_segment column.
+    - leg_df: DataFrame of legislations with item and text columns.
+    """
+    items = [str(item) for item in leg_df["item"]]
+    texts = list(leg_df["text"])
+
+    # legislation rows of each unique item number, in order
+    patterns = list(dict.fromkeys(items))
+    pattern_ids = {pattern: i for i, pattern in enumerate(patterns)}
+    rows_of_pattern = [[] for _ in patterns]
+    for row, item in enumerate(items):
+        rows_of_pattern[pattern_ids[item]].append(row)
+
+    automaton = build_automaton(patterns)
+
+    matched = []
+    for agenda_segment in aseg_df["agenda_segment"]:
+        found = find_patterns(str(agenda_segment), automaton)
+        rows = sorted(row for pattern_id in found for row in rows_of_pattern[pattern_id])
 
         # default value
-        aseg_df["matched_legislation"] = "NO_LEGISLATION"
+        if not rows:
+            matched.append("NO_LEGISLATION")
+        elif len(rows) == 1:
+            matched.append(texts[rows[0]])
+        else:
+            matched.append("".join(str(texts[row]) for row in rows))
+
+    aseg_df["matched_legislation"] = matched
+    return aseg_df
+
+
+def match_meeting_legislation(leg_file: Path, aseg_file: Path, store: ArtifactStore = None):
+    """
+    Matches legislation texts of one meeting to its agenda segments and saves to agenda segments CSV,
+    or only the matched_legislation column to the artifact store.
+
+    Parameters:
+    - leg_file (Path): Path object of CSV file containing legislations texts.
+    - aseg_file (Path): Path object of CSV file containing segmented agenda texts.
+    - store (ArtifactStore): optional ArtifactStore object, the agenda segments CSV is imported once and left as is.
+    """
+    print(f"matching: {leg_file}")
+
+    leg_df = pd.read_csv(leg_file, dtype={"item": str})
 
-        # find matches
-        for _, leg_row in leg_df.iterrows():
-            for aseg_idx, aseg_row in aseg_df.iterrows():
-                if leg_row["item"] in aseg_row["agenda_segment"]:
-                    # set to legislation text if default value and append if already been changed
-                    if aseg_df.at[aseg_idx, "matched_legislation"] == "NO_LEGISLATION":
-                        aseg_df.at[aseg_idx,"matched_legislation"] = leg_row["text"]
-                    else:
-                        aseg_df.at[aseg_idx,"matched_legislation"] = aseg_df.at[aseg_idx,"matched_legislation"] + leg_row["text"]
-            
+    if store is not None:
+        store.sync_csv(aseg_file.stem, "agenda_segments", aseg_file)
+        aseg_df = match_legislation(store.read(aseg_file.stem, "agenda_segments", ["agenda_segment"]), leg_df)
+        store.write(aseg_file.stem, "agenda_segments", aseg_df[["matched_legislation"]])
+        return
 
-        aseg_df.to_csv(aseg_file,index=False)
+    # read CSV files
+    aseg_df = pd.read_csv(aseg_file)
 
+    aseg_df = match_legislation(aseg_df, leg_df)
+    aseg_df.to_csv(aseg_file,index=False)
 
 
 if __name__ == "__main__":
@@ -1,6 +1,12 @@
+import re
+import os
+import subprocess
 import yt_dlp
 from pathlib import Path
 from datetime import datetime
+from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+from meeting_catalog import MeetingCatalog, meeting_paths, audio_file
 
 
 def main():
@@ -9,9 +15,22 @@ def main():
     OUTPUT_AUDIO_FOLDER = Path("audios")
     START_DAY = datetime.strptime("20250519", "%Y%m%d")
     END_DAY = datetime.strptime("20250523", "%Y%m%d")
+    AUDIO_FORMAT = "flac"  # "flac" or "opus" store 16 kHz mono for Whisper, "wav" keeps the full quality download
+    MAX_WORKERS = 4
+    CATALOG_PATH = Path("meeting_catalog.sqlite")
     ###############################
 
-    process_txt_files(INPUT_YT_LINK_FOLDER, OUTPUT_AUDIO_FOLDER, START_DAY, END_DAY)
+    catalog = MeetingCatalog(CATALOG_PATH)
+
+    process_txt_files(INPUT_YT_LINK_FOLDER, OUTPUT_AUDIO_FOLDER, START_DAY, END_DAY, AUDIO_FORMAT, MAX_WORKERS, catalog)
+
+
+# ffmpeg output options of compact formats, all 16 kHz mono (what Whisper resamples to anyway)
+AUDIO_CODECS = {
+    "flac": ["-c:a", "flac"],
+    "opus": ["-c:a", "libopus", "-b:a", "24k"],
+    "wav": ["-c:a", "pcm_s16le"],
+}
 
 
 def download_wav(youtube_url: str, output_file: Path):
@@ -20,7 +39,7 @@ def download_wav(youtube_url: str, output_file: Path):
 
     Parameters:
     - youtube_url (str): string object containing YouTube URL of meeting.
-    - output_file (Path): Path object of folder where WAV audio file is saved. 
+    - output_file (Path): Path object of folder where WAV audio file is saved.
     """
     ydl_opts = {
         "format": "bestaudio/best",
@@ -31,40 +50,121 @@ def download_wav(youtube_url: str, output_file: Path):
                 "preferredquality": "0",
             }
         ],
-        "outtmpl": str(output_file.with_suffix("")),  
+        "outtmpl": str(output_file.with_suffix("")),
     }
 
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
         ydl.download([youtube_url])
 
-def process_txt_files(input_folder: Path, output_folder: Path, start_day: datetime, end_day: datetime):
+
+def start_offset(youtube_url: str):
+    """
+    Returns the start offset in seconds of a YouTube URL's t parameter ("633s", "1h2m3s", "633"), 0 if none.
+
+    Parameters:
+    - youtube_url (str): string object containing YouTube URL of meeting.
+    """
+    if "://" not in youtube_url:
+        youtube_url = "https://" + youtube_url
+    t = parse_qs(urlparse(youtube_url).query).get("t", ["0"])[0]
+
+    if t.isdigit():
+        return int(t)
+    units = {"h": 3600, "m": 60, "s": 1}
+    return sum(int(value) * units[unit] for value, unit in re.findall(r"(\d+)([hms])", t))
+
+
+def transcode_audio(input_path, output_file: Path, start_seconds: int = 0, http_headers=None):
+    """
+    Converts any media file or stream URL to 16 kHz mono audio with ffmpeg, skipping the first start_seconds.
+    The codec is chosen from the output file suffix. Written to a temporary file renamed into place.
+
+    Parameters:
+    - input_path: Path object of media file, or string object of media stream URL.
+    - output_file (Path): Path object of destination audio file (.flac, .opus or .wav).
+    - start_seconds (int): int object of seconds skipped at the start.
+    - http_headers: optional dictionary of HTTP headers sent when reading a stream URL.
+    """
+    # -ss before -i seeks in the input, over HTTP with a range request, so skipped audio is never read
+    headers = ["-headers", "".join(f"{key}: {value}\r\n" for key, value in http_headers.items())] if http_headers else []
+    tmp_file = output_file.with_name(output_file.stem + ".part" + output_file.suffix)
+    subprocess.run(
+        ["ffmpeg", "-y", "-loglevel", "error", "-ss", str(start_seconds)] + headers + ["-i", str(input_path), "-vn", "-ac", "1", "-ar", "16000"]
+        + AUDIO_CODECS[output_file.suffix[1:]]
+        + [str(tmp_file)],
+        check=True,
+    )
+    os.replace(tmp_file, output_file)
+
+
+def download_audio(youtube_url: str, output_file: Path):
     """
-    Reads YouTube URL from TXT files and downloads audios as WAV file. 
+    Streams the audio of a YouTube URL (or takes a local media file) through ffmpeg and stores it as 16 kHz mono,
+    starting at the URL's t= offset to skip the dead air before the meeting.
+
+    Parameters:
+    - youtube_url (str): string object containing YouTube URL of meeting, or path of a local media file.
+    - output_file (Path): Path object of destination audio file (.flac, .opus or .wav).
+    """
+    if Path(youtube_url).exists():
+        transcode_audio(Path(youtube_url), output_file)
+        return
+
+    with yt_dlp.YoutubeDL({"format": "bestaudio/best", "quiet": True}) as ydl:
+        info = ydl.extract_info(youtube_url, download=False)
+
+    # ffmpeg reads the audio stream itself, starting at the offset, so the dead air is not downloaded
+    if info.get("url") and info.get("protocol", "https") in ("http", "https"):
+        transcode_audio(info["url"], output_file, start_offset(youtube_url), info.get("http_headers"))
+        return
+
+    # fragmented stream (DASH/HLS manifest), downloaded whole by yt_dlp and trimmed afterwards
+    ydl_opts = {
+        "format": "bestaudio/best",
+        "outtmpl": str(output_file.with_name(output_file.stem + ".source.%(ext)s")),
+        "quiet": True,
+    }
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(youtube_url, download=True)
+        source_file = Path(ydl.prepare_filename(info))
+
+    try:
+        transcode_audio(source_file, output_file, start_offset(youtube_url))
+    finally:
+        source_file.unlink(missing_ok=True)
+
+
+def process_txt_files(input_folder: Path, output_folder: Path, start_day: datetime, end_day: datetime, audio_format: str = "wav", max_workers: int = 1, catalog: MeetingCatalog = None):
+    """
+    Reads YouTube URL from TXT files and downloads audios, concurrently across meetings.
 
     Parameters:
     - input_folder (Path): Path object of folder containing TXT files with YouTube URLs (one per file).
-    - output_folder (Path): Path object of folder where WAV files will be saved.
+    - output_folder (Path): Path object of folder where audio files will be saved.
     - start_day (datetime): datetime object of earliest day in timeframe.
-    - end_day (datetime): datetime object of latest day in timeframe. 
+    - end_day (datetime): datetime object of latest day in timeframe.
+    - audio_format (str): string object of "flac" or "opus" for compact 16 kHz mono audio, "wav" for full quality WAV.
+    - max_workers (int): int object of number of meetings downloaded concurrently.
+    - catalog (MeetingCatalog): optional MeetingCatalog object, only meetings without recorded audio are downloaded and new audio is recorded.
     """
     output_folder.mkdir(parents=True, exist_ok=True)
 
-    for txt_file in sorted(input_folder.glob("*.txt")):
-        meeting_date = str(txt_file.name).split("_")[0]
-        meeting_datetime = datetime.strptime(meeting_date, "%Y%m%d")
+    # input URL files are written by hand, so the catalog picks up new or edited ones first
+    if catalog is not None:
+        catalog.sync_folder("youtube_url", input_folder, "*.txt")
+        txt_files = catalog.missing("audio", "youtube_url", start_day, end_day)
+    else:
+        txt_files = meeting_paths(input_folder, "*.txt", start_day, end_day)
 
-        # skip, out of time frame
-        if not (start_day <= meeting_datetime <= end_day):
-            continue
-        
-        output_file = output_folder / f"{txt_file.stem}.wav"
+    downloads = []
+    for txt_file in txt_files:
+        output_file = output_folder / f"{txt_file.stem}.{audio_format}"
 
-        # skip, already exists
-        if output_file.exists():
+        # skip, already exists (in any format)
+        if audio_file(output_folder, txt_file.stem).exists():
             print(f"skipping, already exists: {txt_file}")
             continue
 
-    
         link = txt_file.read_text().strip()
 
         # skip, no URL in TXT file
@@ -72,9 +172,25 @@ def process_txt_files(input_folder: Path, output_folder: Path, start_day: dateti
             print(f"!!! empty file: {txt_file}")
             continue
 
-        
-        print(f"downloading: {txt_file}")
-        download_wav(link, output_file)
+        downloads.append((link, output_file))
+
+    def download(item):
+        link, output_file = item
+        print(f"downloading: {link}")
+        try:
+            if audio_format == "wav":
+                download_wav(link, output_file)
+            else:
+                download_audio(link, output_file)
+            print(f"saved: {output_file}")
+
+            if catalog is not None:
+                catalog.record("audio", output_file)
+        except Exception as e:
+            print(f"!!! download fail: {link} ({e})")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        list(pool.map(download, downloads))
 
 if __name__ == "__main__":
     main()
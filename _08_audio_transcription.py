@@ -1,31 +1,89 @@
 import re
+import os
+import json
+import shutil
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
 import whisper
 import regex as regex
 from deepmultilingualpunctuation import PunctuationModel
 from datetime import datetime
+from meeting_catalog import MeetingCatalog, meeting_paths, AUDIO_FORMATS
 
 
 
+######## CONFIGURATION SHARED WITH run_pipeline ########
+ASR_MODEL_NAME = "large"
+CHUNKED = True
+CHUNK_SECONDS = 600
+THREADS_PER_WORKER = 2
+PUNCT_WINDOW_WORDS = 200
+PUNCT_OVERLAP_WORDS = 40
+PUNCT_BATCH_SIZE = 8
+PUNCT_WORKERS = 0  # 0 runs windows in this process
+#########################################################
+
+
 def main():
     ######## CONFIGURATION ########
     INPUT_AUDIO_FOLDER = Path("audios")
     OUTPUT_TRANSCRIPT_FOLDER = Path("transcripts")
     START_DAY = datetime.strptime("20250519", "%Y%m%d")
     END_DAY = datetime.strptime("20250523", "%Y%m%d")
-    ASR_MODEL = whisper.load_model("large")
     PUNCT_MODEL = PunctuationModel()
+    CATALOG_PATH = Path("meeting_catalog.sqlite")
     ###############################
 
+    catalog = MeetingCatalog(CATALOG_PATH)
+
+    # in chunked mode every worker process loads its own model
+    asr_model = None if CHUNKED else whisper.load_model(ASR_MODEL_NAME)
+
+    process_audio_folder(INPUT_AUDIO_FOLDER, OUTPUT_TRANSCRIPT_FOLDER, START_DAY, END_DAY, asr_model, PUNCT_MODEL, CHUNKED, ASR_MODEL_NAME, CHUNK_SECONDS, count_chunk_workers(THREADS_PER_WORKER), THREADS_PER_WORKER, punct_options(), catalog)
+
+
+def count_chunk_workers(threads_per_worker: int):
+    """
+    Returns number of chunk worker processes that fit the available cores.
+
+    Parameters:
+    - threads_per_worker (int): int object of number of torch threads per worker.
+    """
+    return max(1, len(os.sched_getaffinity(0)) // threads_per_worker)
+
+
+def punct_options():
+    """
+    Returns the restore_punctuation_windowed arguments of the shared configuration.
+    """
+    return {
+        "window_words": PUNCT_WINDOW_WORDS,
+        "overlap_words": PUNCT_OVERLAP_WORDS,
+        "batch_size": PUNCT_BATCH_SIZE,
+        "workers": PUNCT_WORKERS,
+    }
+
 
 
-    process_audio_folder(INPUT_AUDIO_FOLDER, OUTPUT_TRANSCRIPT_FOLDER, START_DAY, END_DAY, ASR_MODEL, PUNCT_MODEL)
+def whisper_segments(result, offset_seconds: float = 0.0):
+    """
+    Returns the timestamped segments of a Whisper result as a list of dictionaries with start, end and text.
 
+    Parameters:
+    - result: dictionary returned by Whisper transcribe.
+    - offset_seconds (float): float object of seconds added to every timestamp.
+    """
+    return [
+        {"start": round(segment["start"] + offset_seconds, 2), "end": round(segment["end"] + offset_seconds, 2), "text": segment["text"]}
+        for segment in result["segments"]
+    ]
 
 
 def transcribe_audio(audio_path: Path, asr_model):
     """
-    Transcribes WAV audio file using Whisper.
+    Transcribes WAV audio file using Whisper. Returns (text, timestamped segments).
 
     Parameters:
     - audio_path (Path): Path object of WAV file.
@@ -33,7 +91,172 @@ def transcribe_audio(audio_path: Path, asr_model):
     """
     print(f"transcribing: {audio_path}")
     result = asr_model.transcribe(str(audio_path), language="en")
-    return result["text"]
+    return result["text"], whisper_segments(result)
+
+
+def find_chunk_boundaries(audio, chunk_seconds: int, search_seconds: int = 30, overlap_seconds: float = 2.0, sample_rate: int = whisper.audio.SAMPLE_RATE):
+    """
+    Splits audio into chunks of about chunk_seconds, cutting at the quietest point near each boundary.
+    Neighbouring chunks overlap by overlap_seconds so no word is lost at a cut.
+
+    Parameters:
+    - audio: numpy array of 16 kHz mono audio samples.
+    - chunk_seconds (int): int object of target chunk length in seconds.
+    - search_seconds (int): int object of how far around each target boundary to look for silence.
+    - overlap_seconds (float): float object of overlap between neighbouring chunks in seconds.
+    - sample_rate (int): int object of audio sample rate.
+    """
+    frame = sample_rate // 10
+    n_frames = len(audio) // frame
+    if n_frames == 0:
+        return [(0, len(audio))]
+
+    # RMS energy of 100 ms frames
+    energy = np.sqrt(np.mean(audio[:n_frames * frame].reshape(n_frames, frame) ** 2, axis=1))
+
+    cuts = [0]
+    target = chunk_seconds * 10
+    search = search_seconds * 10
+    while target + search < n_frames:
+        window = energy[target - search:target + search]
+        cut = target - search + int(np.argmin(window))
+        cuts.append(cut * frame)
+        target = cut + chunk_seconds * 10
+    cuts.append(len(audio))
+
+    overlap = int(overlap_seconds * sample_rate)
+    return [(max(0, start - overlap), end) for start, end in zip(cuts[:-1], cuts[1:])]
+
+
+_worker_model = None
+
+
+def init_chunk_worker(asr_model_name: str, threads: int):
+    """
+    Loads a Whisper model once per worker process.
+
+    Parameters:
+    - asr_model_name (str): string object of Whisper model name.
+    - threads (int): int object of number of torch threads per worker.
+    """
+    global _worker_model
+    import torch
+    torch.set_num_threads(threads)
+    _worker_model = whisper.load_model(asr_model_name)
+
+
+def transcribe_chunk(index: int, samples, checkpoint_path: Path, offset_seconds: float = 0.0):
+    """
+    Transcribes one chunk in a worker process and saves it as a checkpoint.
+
+    Parameters:
+    - index (int): int object of chunk number.
+    - samples: numpy array of chunk audio samples.
+    - checkpoint_path (Path): Path object of JSON file where chunk text is saved.
+    - offset_seconds (float): float object of start of the chunk in the meeting audio.
+    """
+    result = _worker_model.transcribe(samples, language="en")
+    checkpoint = {"index": index, "text": result["text"], "segments": whisper_segments(result, offset_seconds)}
+
+    # write then rename so a killed run never leaves a half written checkpoint
+    tmp_path = checkpoint_path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(checkpoint), encoding="utf-8")
+    os.replace(tmp_path, checkpoint_path)
+    return index
+
+
+def stitch_chunks(texts, max_overlap_words: int = 60):
+    """
+    Joins chunk texts, removing words repeated because of the overlap between neighbouring chunks.
+
+    Parameters:
+    - texts: list of chunk texts in order.
+    - max_overlap_words (int): int object of longest repeated run of words to look for.
+    """
+    def norm(word):
+        return re.sub(r"[^\w']", "", word.lower())
+
+    words = []
+    for text in texts:
+        new_words = text.split()
+        tail = [norm(w) for w in words[-max_overlap_words:]]
+        head = [norm(w) for w in new_words[:max_overlap_words]]
+
+        # longest suffix of what we have that is a prefix of the new chunk
+        overlap = 0
+        for n in range(min(len(tail), len(head)), 0, -1):
+            if tail[-n:] == head[:n]:
+                overlap = n
+                break
+
+        words.extend(new_words[overlap:])
+    return " ".join(words)
+
+
+def stitch_chunk_segments(chunk_segments, boundaries, sample_rate: int = whisper.audio.SAMPLE_RATE):
+    """
+    Joins the timestamped segments of chunks. A segment in the overlap with the previous chunk is kept only by
+    the chunk its midpoint falls in. Returns None if any chunk has no segments saved.
+
+    Parameters:
+    - chunk_segments: list of segment lists in chunk order (absolute timestamps).
+    - boundaries: list of (start, end) sample ranges of the chunks.
+    - sample_rate (int): int object of audio sample rate.
+    """
+    if any(segments is None for segments in chunk_segments):
+        return None
+
+    stitched = []
+    for i, segments in enumerate(chunk_segments):
+        previous_end = boundaries[i - 1][1] / sample_rate if i > 0 else 0.0
+        stitched.extend(s for s in segments if (s["start"] + s["end"]) / 2 >= previous_end)
+    return stitched
+
+
+def transcribe_audio_chunked(audio_path: Path, checkpoint_folder: Path, asr_model_name: str, chunk_seconds: int, workers: int, threads_per_worker: int):
+    """
+    Transcribes WAV audio file in silence-split chunks across a process pool. Finished chunks are checkpointed,
+    so a killed run picks up at the chunks that are not done yet.
+
+    Parameters:
+    - audio_path (Path): Path object of WAV file.
+    - checkpoint_folder (Path): Path object of folder where chunk boundaries and chunk texts are saved.
+    - asr_model_name (str): string object of Whisper model name.
+    - chunk_seconds (int): int object of target chunk length in seconds.
+    - workers (int): int object of number of worker processes.
+    - threads_per_worker (int): int object of number of torch threads per worker.
+
+    Returns (text, timestamped segments), segments are None if resumed from checkpoints saved without them.
+    """
+    print(f"transcribing: {audio_path}")
+    checkpoint_folder.mkdir(parents=True, exist_ok=True)
+    audio = whisper.load_audio(str(audio_path))
+
+    # reuse boundaries from an interrupted run so checkpoints still line up
+    boundaries_path = checkpoint_folder / "chunks.json"
+    if boundaries_path.exists():
+        boundaries = json.loads(boundaries_path.read_text(encoding="utf-8"))
+    else:
+        boundaries = find_chunk_boundaries(audio, chunk_seconds)
+        boundaries_path.write_text(json.dumps(boundaries), encoding="utf-8")
+
+    checkpoint_paths = [checkpoint_folder / f"{i:04d}.json" for i in range(len(boundaries))]
+    pending = [i for i, path in enumerate(checkpoint_paths) if not path.exists()]
+    print(f"{len(boundaries)} chunks, {len(boundaries) - len(pending)} already done")
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending)), initializer=init_chunk_worker, initargs=(asr_model_name, threads_per_worker)) as pool:
+            futures = [
+                pool.submit(transcribe_chunk, i, audio[boundaries[i][0]:boundaries[i][1]], checkpoint_paths[i], boundaries[i][0] / whisper.audio.SAMPLE_RATE)
+                for i in pending
+            ]
+            for future in as_completed(futures):
+                print(f"chunk {future.result() + 1}/{len(boundaries)} done")
+
+    checkpoints = [json.loads(path.read_text(encoding="utf-8")) for path in checkpoint_paths]
+    text = stitch_chunks([checkpoint["text"] for checkpoint in checkpoints])
+    segments = stitch_chunk_segments([checkpoint.get("segments") for checkpoint in checkpoints], boundaries)
+    return text, segments
 
 
 def clean_text(text: str):
@@ -60,58 +283,241 @@ def clean_text(text: str):
 
 
 
-def punctuate_and_save(raw_text: str, transcript_txt_path: Path, punct_model):
+def label_window(words, result):
+    """
+    Maps token predictions of the punctuation pipeline back to one label per word, the same way
+    PunctuationModel.predict does (a word takes the label of its last sub-token).
+
+    Parameters:
+    - words: list of words in the window.
+    - result: list of token predictions from the punctuation pipeline for " ".join(words).
     """
-    Punctuates transcript text and saves to TXT file. 
+    labels = []
+    char_index = 0
+    result_index = 0
+    for word in words:
+        char_index += len(word) + 1
+        label, score = "0", 0.0
+        while result_index < len(result) and char_index > result[result_index]["end"]:
+            label = result[result_index]["entity"]
+            score = result[result_index]["score"]
+            result_index += 1
+        labels.append((label, score))
+    return labels
+
+
+def predict_windows(window_texts, punct_model, batch_size: int):
+    """
+    Runs window texts through the punctuation pipeline in batches and returns the raw token predictions.
+
+    Parameters:
+    - window_texts: list of window texts.
+    - punct_model: deepmultilingualpunctuation model.
+    - batch_size (int): int object of number of windows per forward pass.
+    """
+    return list(punct_model.pipe(window_texts, batch_size=batch_size))
+
+
+_worker_punct_model = None
+
+
+def init_punct_worker():
+    """
+    Loads a punctuation model once per worker process.
+    """
+    global _worker_punct_model
+    _worker_punct_model = PunctuationModel()
+
+
+def predict_windows_worker(window_texts, batch_size: int):
+    return predict_windows(window_texts, _worker_punct_model, batch_size)
+
+
+def restore_punctuation_windowed(text: str, punct_model, window_words: int = 200, overlap_words: int = 40, batch_size: int = 8, workers: int = 0):
+    """
+    Restores punctuation by splitting text into overlapping word windows, running them through the model in batches
+    (optionally across a process pool) and merging the overlaps. In an overlap each word keeps the label from the
+    window whose centre is closest to it (the earlier window on ties), so the result is deterministic.
+
+    Parameters:
+    - text (str): Text with no punctuation.
+    - punct_model: deepmultilingualpunctuation model.
+    - window_words (int): int object of number of words per window (must stay under the model's token limit).
+    - overlap_words (int): int object of number of words shared by neighbouring windows.
+    - batch_size (int): int object of number of windows per forward pass.
+    - workers (int): int object of number of worker processes, 0 to run in this process.
+    """
+    words = punct_model.preprocess(text)
+    if not words:
+        return ""
+
+    step = window_words - overlap_words
+    starts = list(range(0, max(1, len(words) - overlap_words), step))
+    windows = [words[start:start + window_words] for start in starts]
+    window_texts = [" ".join(window) for window in windows]
+
+    if workers > 0:
+        groups = [window_texts[i:i + batch_size * 4] for i in range(0, len(window_texts), batch_size * 4)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_punct_worker) as pool:
+            results = [r for group in pool.map(predict_windows_worker, groups, [batch_size] * len(groups)) for r in group]
+    else:
+        results = predict_windows(window_texts, punct_model, batch_size)
+
+    # for every word, use the window whose centre is closest
+    tagged_words = [None] * len(words)
+    best_distance = [None] * len(words)
+    for start, window, result in zip(starts, windows, results):
+        centre = start + (len(window) - 1) / 2
+        for offset, (label, score) in enumerate(label_window(window, result)):
+            i = start + offset
+            distance = abs(i - centre)
+            if best_distance[i] is None or distance < best_distance[i]:
+                best_distance[i] = distance
+                tagged_words[i] = [words[i], label, score]
+
+    return punct_model.prediction_to_text(tagged_words)
+
+
+def split_to_segments(punctuated_text: str, word_counts):
+    """
+    Splits punctuated text back into segment texts, given the number of words of each segment.
+
+    Parameters:
+    - punctuated_text (str): Punctuated text of all segments joined.
+    - word_counts: list of number of words of each segment before punctuation.
+    """
+    words = punctuated_text.split()
+    total = sum(word_counts)
+
+    # punctuation keeps one output word per input word (scale is 1), otherwise split proportionally
+    scale = len(words) / max(total, 1)
+
+    texts = []
+    start = 0
+    cumulative = 0
+    for count in word_counts:
+        cumulative += count
+        end = round(cumulative * scale)
+        texts.append(" ".join(words[start:end]))
+        start = end
+    return texts
+
+
+def punctuate_and_save(raw_text: str, transcript_txt_path: Path, punct_model, punct_options=None, segments=None):
+    """
+    Punctuates transcript text and saves to TXT file. If timestamped segments are given, the text is built
+    from them and a sidecar CSV of numbered segments with start/end times and punctuated text is saved
+    next to the transcript.
 
     Parameters:
     - raw_text (str): Raw transcript text with no punctuation.
     - transcript_txt_path (Path): Path object of destination file where transcript will be saved.
     - punct_model: deepmultilingualpunctuation model.
+    - punct_options: optional dictionary of restore_punctuation_windowed arguments, None for a single restore_punctuation call.
+    - segments: optional list of timestamped segment dictionaries from transcription.
     """
     print(f"cleaning: {transcript_txt_path}")
-    cleaned_text = clean_text(raw_text)
+    if segments is not None:
+        # clean per segment so every word keeps its segment
+        segments = [dict(segment, text=clean_text(segment["text"])) for segment in segments]
+        segments = [segment for segment in segments if segment["text"]]
+        cleaned_text = " ".join(segment["text"] for segment in segments)
+    else:
+        cleaned_text = clean_text(raw_text)
 
     print(f"punctuating: {transcript_txt_path}")
-    punctuated_text = punct_model.restore_punctuation(cleaned_text)
+    if punct_options is None:
+        punctuated_text = punct_model.restore_punctuation(cleaned_text)
+    else:
+        punctuated_text = restore_punctuation_windowed(cleaned_text, punct_model, **punct_options)
 
     with open(transcript_txt_path, "w", encoding="utf-8") as f:
         f.write(punctuated_text)
 
+    if segments is not None:
+        texts = split_to_segments(punctuated_text, [len(punct_model.preprocess(segment["text"])) for segment in segments])
+        sidecar_path = transcript_txt_path.with_name(f"{transcript_txt_path.stem}_segments.csv")
+        pd.DataFrame({
+            "segment": range(len(segments)),
+            "start": [segment["start"] for segment in segments],
+            "end": [segment["end"] for segment in segments],
+            "text": texts,
+        }).to_csv(sidecar_path, index=False)
+        print(f"saved segments: {sidecar_path}")
 
 
-def process_audio_folder(audio_folder: Path, transcript_folder: Path, start_day: datetime, end_day: datetime, asr_model, punct_model):
+def transcribe_meeting(audio_file: Path, transcript_txt_path: Path, asr_model, punct_model, chunked: bool = False, asr_model_name: str = "large", chunk_seconds: int = 600, chunk_workers: int = 1, threads_per_worker: int = 1, punct_options=None):
     """
-    Transcribes, cleans, punctuates, and saves audios WAV files to transcript TXT files.
+    Transcribes, punctuates and saves one meeting's audio file to a transcript TXT file. In chunked mode chunks are
+    checkpointed next to the transcript until it is saved, so a killed run resumes at the unfinished chunks.
 
     Parameters:
-    - audio_folder (Path): Path object of folder containining WAV audio files.
+    - audio_file (Path): Path object of WAV, FLAC or Opus audio file.
+    - transcript_txt_path (Path): Path object of destination transcript TXT file.
+    - asr_model: Whisper audio transcription model, unused (None) in chunked mode.
+    - punct_model: deepmultilingualpunctuation model.
+    - chunked (bool): bool object, if True audio is transcribed in checkpointed chunks across a process pool.
+    - asr_model_name (str): string object of Whisper model name loaded by each worker in chunked mode.
+    - chunk_seconds (int): int object of target chunk length in seconds in chunked mode.
+    - chunk_workers (int): int object of number of worker processes in chunked mode.
+    - threads_per_worker (int): int object of number of torch threads per worker in chunked mode.
+    - punct_options: optional dictionary of restore_punctuation_windowed arguments, None for a single restore_punctuation call.
+    """
+    # transcribe audio
+    if chunked:
+        checkpoint_folder = transcript_txt_path.parent / ".chunks" / transcript_txt_path.stem
+        raw_text, segments = transcribe_audio_chunked(audio_file, checkpoint_folder, asr_model_name, chunk_seconds, chunk_workers, threads_per_worker)
+    else:
+        raw_text, segments = transcribe_audio(audio_file, asr_model)
+
+    # punctuate and save, with timestamped segments sidecar
+    punctuate_and_save(raw_text, transcript_txt_path, punct_model, punct_options, segments)
+
+    # chunk checkpoints are only needed until the transcript is saved
+    if chunked:
+        shutil.rmtree(checkpoint_folder)
+
+
+def process_audio_folder(audio_folder: Path, transcript_folder: Path, start_day: datetime, end_day: datetime, asr_model, punct_model, chunked: bool = False, asr_model_name: str = "large", chunk_seconds: int = 600, chunk_workers: int = 1, threads_per_worker: int = 1, punct_options=None, catalog: MeetingCatalog = None):
+    """
+    Transcribes, cleans, punctuates, and saves audio files (WAV, or compact FLAC/Opus) to transcript TXT files.
+
+    Parameters:
+    - audio_folder (Path): Path object of folder containining WAV, FLAC or Opus audio files.
     - transcript_folder (Path): Path object of destination folder where transcript TXT files will be saved.
     - start_day (datetime): datetime object of earliest day in timeframe.
     - end_day (datetime): datetime object of latest day in timeframe. 
     - asr_model: Whisper audio transcription model.
     - punct_model: deepmultilingualpunctuation model.
+    - chunked (bool): bool object, if True audio is transcribed in checkpointed chunks across a process pool.
+    - asr_model_name (str): string object of Whisper model name loaded by each worker in chunked mode.
+    - chunk_seconds (int): int object of target chunk length in seconds in chunked mode.
+    - chunk_workers (int): int object of number of worker processes in chunked mode.
+    - threads_per_worker (int): int object of number of torch threads per worker in chunked mode.
+    - punct_options: optional dictionary of restore_punctuation_windowed arguments, None for a single restore_punctuation call.
+    - catalog (MeetingCatalog): optional MeetingCatalog object, audio files are looked up there and transcripts recorded.
     """
     transcript_folder.mkdir(parents=True, exist_ok=True)
 
-    for audio_file in sorted(audio_folder.rglob("*.wav")):
-        meeting_date = str(audio_file.name).split("_")[0]
-        meeting_datetime = datetime.strptime(meeting_date, "%Y%m%d")
-
-        # skip, out of time frame
-        if not (start_day <= meeting_datetime <= end_day):
-            continue
-
+    if catalog is not None and catalog.knows("audio"):
+        audio_files = catalog.paths("audio", start_day, end_day)
+    else:
+        # compact 16 kHz mono audio is preferred over WAV if a meeting has both
+        audio_files = {}
+        for audio_format in reversed(AUDIO_FORMATS):
+            for audio_file in meeting_paths(audio_folder, f"*.{audio_format}", start_day, end_day):
+                audio_files[audio_file.stem] = audio_file
+        audio_files = [audio_files[stem] for stem in sorted(audio_files)]
+
+    for audio_file in audio_files:
         print(f"\nprocessing: {audio_file}")
         stem = audio_file.stem
 
         transcript_txt_path = transcript_folder / f"{stem}.txt"
+        transcribe_meeting(audio_file, transcript_txt_path, asr_model, punct_model, chunked, asr_model_name, chunk_seconds, chunk_workers, threads_per_worker, punct_options)
 
-        # transcribe audio
-        raw_text = transcribe_audio(audio_file, asr_model)
-
-        # punctuate and save
-        punctuate_and_save(raw_text, transcript_txt_path, punct_model)
+        if catalog is not None:
+            catalog.record("transcript", transcript_txt_path)
 
 
 
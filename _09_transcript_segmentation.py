@@ -4,8 +4,27 @@ import json
 import csv
 from pathlib import Path
 import os
+import re
+import numpy as np
 import pandas as pd
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from llm_cache import LLMCache, CachedClient
+from meeting_catalog import MeetingCatalog, meeting_paths
+
+
+######## CONFIGURATION SHARED WITH run_pipeline ########
+SEGMENTATION_MODEL = "claude-3-7-sonnet-20250219"
+CHUNKED = False  # segment overlapping transcript windows concurrently, then stitch (only if offsets and pre-alignment are not used)
+WINDOW_WORDS = 6000
+OVERLAP_WORDS = 300
+MAX_WORKERS = 4
+USE_SEGMENT_OFFSETS = False  # ask for Whisper segment ranges instead of transcript text when a sidecar exists, takes precedence over the others
+PRE_ALIGN = False  # align locally with BM25 and only send uncertain boundaries to Claude, takes precedence over chunking
+ALIGN_BLOCK_WORDS = 80
+ALIGN_MARGIN = 0.2
+ALIGN_MAX_BLOCKS = 6
+#########################################################
 
 
 def main():
@@ -18,10 +37,14 @@ def main():
     OUTPUT_TRANSCRIPT_SEGMENTS_FOLDER = Path("transcript_segments")
     START_DAY = datetime.strptime("20250519", "%Y%m%d")
     END_DAY = datetime.strptime("20250523", "%Y%m%d")
-    SEGMENTATION_MODEL = "claude-3-7-sonnet-20250219"
+    LLM_CACHE_PATH = Path("llm_cache.sqlite")
+    BYPASS_LLM_CACHE = False
+    CATALOG_PATH = Path("meeting_catalog.sqlite")
     ################################
 
-    client = anthropic.Anthropic(api_key=CLAUDE_KEY)
+    cache = LLMCache(LLM_CACHE_PATH, bypass=BYPASS_LLM_CACHE)
+    client = CachedClient(anthropic.Anthropic(api_key=CLAUDE_KEY), cache)
+    catalog = MeetingCatalog(CATALOG_PATH)
 
     segment_all_transcripts(
         INPUT_TRANSCRIPT_FOLDER,
@@ -30,8 +53,19 @@ def main():
         START_DAY, 
         END_DAY,
         SEGMENTATION_MODEL,
-        client
+        client,
+        CHUNKED,
+        WINDOW_WORDS,
+        OVERLAP_WORDS,
+        MAX_WORKERS,
+        USE_SEGMENT_OFFSETS,
+        PRE_ALIGN,
+        ALIGN_BLOCK_WORDS,
+        ALIGN_MARGIN,
+        ALIGN_MAX_BLOCKS,
+        catalog
     )
+    cache.report()
 
 
 def transcript_segmentation_prompt(text: str):
@@ -61,68 +95,561 @@ Here is the combined agenda + transcript text:
     """.strip()
 
 
+def transcript_offsets_prompt(text: str):
+    return f"""
+You are given:
+1. The transcript of a city council meeting, as numbered segments, one per line, like "[12] text of segment 12".
+2. A list of agenda items with their full text.
 
+Your task:
+- Split the transcript into passages of consecutive segments, assigning each passage to the agenda item it most closely relates to.
+- The meeting may not have followed the agenda in exact order, so match passages based on content, not position in the list.
+- An agenda item can appear multiple times in different parts of the transcript if the discussion returns to it.
+- Give each passage by the numbers of its first and last segment (inclusive), do not copy any transcript text.
+- Return the output as **strict JSON only**, parsable by Python's json.loads().
+- Do not include any explanations, notes, markdown, code fences, or commentary — output ONLY the JSON array.
 
-def claude_segment(transcript_text: str, segmentation_model: str, client):
+Output format (must be exactly JSON, no extra text):
+[
+  {{"agenda_item": "Agenda Item 4: Proclamation 2022-1222", "first_segment": 0, "last_segment": 17}},
+  {{"agenda_item": "Agenda Item 2: Pledge of Allegiance", "first_segment": 18, "last_segment": 25}}
+]
+
+Here is the combined agenda + transcript text:
+\"\"\"
+{text}
+\"\"\"
+    """.strip()
+
+
+class SegmentStreamParser:
+    """
+    Incremental parser of a streamed JSON array of segment objects. Only the object currently being
+    streamed is buffered; each one is returned by feed as soon as its closing brace arrives.
+    """
+    def __init__(self):
+        self.buffer = []
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.malformed = 0
+
+    def feed(self, text: str):
+        """
+        Consumes the next piece of streamed text and returns the list of objects completed by it.
+
+        Parameters:
+        - text (str): string object of streamed response text.
+        """
+        completed = []
+        for char in text:
+            if self.depth == 0:
+                # between objects: array brackets, commas, whitespace
+                if char == "{":
+                    self.depth = 1
+                    self.buffer = [char]
+                continue
+
+            self.buffer.append(char)
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == "{":
+                self.depth += 1
+            elif char == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    try:
+                        completed.append(json.loads("".join(self.buffer)))
+                    except json.JSONDecodeError:
+                        self.malformed += 1
+                    self.buffer = []
+        return completed
+
+
+def continuation_prompt(text: str, last_segment, prompt_function=transcript_segmentation_prompt):
+    """
+    Prompt asking Claude to continue a segmentation that stopped at max_tokens after last_segment.
+
+    Parameters:
+    - text (str): String containing text from meeting transcript and list of agenda items.
+    - last_segment: dictionary of last complete segment received.
+    - prompt_function: function building the original prompt from text.
+    """
+    if "last_segment" in last_segment:
+        return prompt_function(text) + f"""
+
+Your previous answer was cut off. The last complete passage was assigned to "{last_segment.get("agenda_item", "")}" and ended at segment {last_segment["last_segment"]}.
+Continue the segmentation from the segment right after that passage, in the same JSON format."""
+
+    tail = " ".join(str(last_segment.get("transcript", "")).split()[-40:])
+    return prompt_function(text) + f"""
+
+Your previous answer was cut off. The last complete passage was assigned to "{last_segment.get("agenda_item", "")}" and ended with:
+\"\"\"
+{tail}
+\"\"\"
+Continue the segmentation from the transcript text right after that passage, in the same JSON format."""
+
+
+def claude_segment(transcript_text: str, segmentation_model: str, client, on_segment, max_continuations: int = 3, prompt_function=transcript_segmentation_prompt):
     """
-    Prompts Claude to segment transcript into transcript segments.
+    Prompts Claude to segment transcript into transcript segments. Segments are parsed while the response
+    streams and passed to on_segment one by one. If the response stops at max_tokens, a continuation request
+    resumes after the last complete segment. Returns True if the segmentation was completed.
 
     Parameters:
     - transcript_text (str): String containing text from meeting transcript and list of agenda items.
+    - segmentation_model (str): string object of Claude model alias to segment.
     - client: Claude API client.
+    - on_segment: function called with each segment dictionary as soon as it is complete.
+    - max_continuations (int): int object of maximum continuation requests after max_tokens.
+    - prompt_function: function building the prompt from transcript_text.
     """
-    prompt = transcript_segmentation_prompt(transcript_text)
-    
-    stream = client.messages.create(
-        model=segmentation_model,
-        max_tokens=64000,
-        temperature=0,
-        stream=True,
-        messages=[{"role": "user", "content": prompt}]
-    )
-    
-    response_text = ""
-    for chunk in stream:
-        if chunk.type == "content_block_delta":
-            response_text += chunk.delta.text
-    
-    return response_text.strip()
+    prompt = prompt_function(transcript_text)
+    last_segment = None
+
+    for attempt in range(max_continuations + 1):
+        stream = client.messages.create(
+            model=segmentation_model,
+            max_tokens=64000,
+            temperature=0,
+            stream=True,
+            messages=[{"role": "user", "content": prompt}]
+        )
+
+        parser = SegmentStreamParser()
+        stop_reason = None
+        for chunk in stream:
+            if chunk.type == "content_block_delta":
+                for segment in parser.feed(chunk.delta.text):
+                    if not isinstance(segment, dict):
+                        continue
+                    last_segment = segment
+                    on_segment(segment)
+            elif chunk.type == "message_delta":
+                stop_reason = chunk.delta.stop_reason
+
+        if parser.malformed:
+            print(f"!!! skipped {parser.malformed} malformed segments")
+
+        if stop_reason != "max_tokens":
+            return True
+
+        if last_segment is None:
+            print("!!! output cut off before first complete segment")
+            return False
+
+        if attempt == max_continuations:
+            break
+        print(f"    output cut off, continuing ({attempt + 1}/{max_continuations})")
+        prompt = continuation_prompt(transcript_text, last_segment, prompt_function)
+
+    print("!!! output still cut off after continuations")
+    return False
+
+
+def save_segments_to_csv(segments, output_path: Path, fieldnames=("agenda_item", "transcript")):
+    """
+    Saves transcript segments to output path.
 
+    Parameters:
+    - segments: list of dictionaries with agenda_item and transcript keys.
+    - output_path (Path): Path object of destination CSV file.
+    - fieldnames: columns saved from each segment dictionary.
+    """
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, mode="w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(fieldnames))
+        writer.writeheader()
+        for row in segments:
+            writer.writerow({field: row.get(field, "") for field in fieldnames})
+    print(f"saved: {output_path}")
 
-def save_json_segments_to_csv(json_string: str, output_path: Path):
+
+def stream_segments_to_csv(text: str, partial_path: Path, segmentation_model: str, client, fieldnames=("agenda_item", "transcript"), prompt_function=transcript_segmentation_prompt, keep=None):
     """
-    Processes LLM response as JSON string and saves to output path.
+    Prompts Claude to segment text and appends each segment to a partial CSV as soon as it is complete, flushed,
+    so a crash or a cut-off response keeps everything received so far. Returns True if the segmentation was completed.
 
     Parameters:
-    - json_string (str): String parsable as JSON.
+    - text (str): String containing text from meeting transcript and list of agenda items.
+    - partial_path (Path): Path object of partial CSV file segments are appended to.
+    - segmentation_model (str): string object of Claude model alias to segment.
+    - client: Claude API client.
+    - fieldnames: columns saved from each segment dictionary.
+    - prompt_function: function building the prompt from text.
+    - keep: optional function, only segments for which it returns True are saved.
+    """
+    partial_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(partial_path, mode="w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(fieldnames))
+        writer.writeheader()
+
+        def write_segment(row):
+            if keep is not None and not keep(row):
+                return
+            writer.writerow({field: row.get(field, "") for field in fieldnames})
+            f.flush()
+
+        return claude_segment(text, segmentation_model, client, write_segment, prompt_function=prompt_function)
+
+
+def segment_transcript_offsets(sidecar_path: Path, agenda_text: str, output_path: Path, segmentation_model: str, client):
+    """
+    Prompts Claude with the numbered Whisper segments of a transcript and only asks for the range of segments of
+    each passage, so output is a few tokens per passage instead of the transcript text. Saves agenda_item,
+    first_segment and last_segment columns, the text is rebuilt from the sidecar when combining segments.
+
+    Parameters:
+    - sidecar_path (Path): Path object of CSV of numbered transcript segments saved by audio transcription.
+    - agenda_text (str): String containing list of agenda items.
     - output_path (Path): Path object of destination CSV file.
+    - segmentation_model (str): string object of Claude model alias to segment.
+    - client: Claude API client.
     """
-    try:
-        data = json.loads(json_string)
-        if not isinstance(data, list):
-            raise ValueError("!!! not list of JSON objects")
-
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(output_path, mode="w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=["agenda_item", "transcript"])
-            writer.writeheader()
-            for row in data:
-                writer.writerow({
-                    "agenda_item": row.get("agenda_item", ""),
-                    "transcript": row.get("transcript", "")
-                })
+    sidecar_df = pd.read_csv(sidecar_path, keep_default_na=False)
+    numbered = "\n".join(f"[{row.segment}] {row.text}" for row in sidecar_df.itertuples())
+
+    # replace double quotes for JSON parsing
+    text = ("Meeting Transcript:\n" + numbered + agenda_text).replace('"', "'")
+
+    # passages are appended as they stream in, the CSV is only renamed into place once complete
+    partial_path = output_path.with_suffix(".partial.csv")
+    complete = stream_segments_to_csv(
+        text, partial_path, segmentation_model, client, ("agenda_item", "first_segment", "last_segment"), transcript_offsets_prompt,
+        lambda p: isinstance(p.get("first_segment"), int) and isinstance(p.get("last_segment"), int),
+    )
+
+    if complete:
+        partial_path.replace(output_path)
         print(f"saved: {output_path}")
+    else:
+        print(f"!!! incomplete segmentation, salvaged segments in: {partial_path}")
+
+
+def split_windows(n_words: int, window_words: int, overlap_words: int):
+    """
+    Returns (start, end) word ranges of overlapping windows covering a transcript.
+
+    Parameters:
+    - n_words (int): int object of number of words in transcript.
+    - window_words (int): int object of number of words per window.
+    - overlap_words (int): int object of number of words shared by neighbouring windows.
+    """
+    step = window_words - overlap_words
+    windows = []
+    start = 0
+    while True:
+        end = min(start + window_words, n_words)
+        windows.append((start, end))
+        if end >= n_words:
+            return windows
+        start += step
+
+
+def normalize_word(word: str):
+    return re.sub(r"[^\w]", "", word.lower())
+
+
+def find_anchor(words, anchor, expected: int):
+    """
+    Returns the index in words where anchor starts, taking the occurrence closest to expected, or None.
+
+    Parameters:
+    - words: list of normalized words.
+    - anchor: list of normalized words to find.
+    - expected (int): int object of index where anchor should be if no words were dropped or added.
+    """
+    best = None
+    for i in range(len(words) - len(anchor) + 1):
+        if words[i:i + len(anchor)] == anchor and (best is None or abs(i - expected) < abs(best - expected)):
+            best = i
+    return best
+
+
+def stitch_windows(windows, window_segments, words, anchor_words: int = 8):
+    """
+    Stitches the segments of overlapping windows into one list of segments. Each overlap is cut at its midpoint,
+    located in both windows by the transcript words starting there, so boundary passages are kept once and
+    take the agenda item of the window that saw more context around them.
 
-    except json.JSONDecodeError as e:
-        print(f"!!! JSON parsing error: {e}")
-        with open(str(output_path).replace(".csv", ".txt"), "w", encoding="utf-8") as f:
-            f.write(json_string)
+    Parameters:
+    - windows: list of (start, end) word ranges from split_windows.
+    - window_segments: list of segment lists, one per window.
+    - words: list of transcript words.
+    - anchor_words (int): int object of number of words used to locate the cut in each window.
+    """
+    # flatten each window to (agenda_item, word) pairs
+    flats = []
+    for segments in window_segments:
+        flat = []
+        for row in segments:
+            for word in str(row.get("transcript", "")).split():
+                flat.append((row.get("agenda_item", ""), word))
+        flats.append(flat)
+
+    keep_from = [0] * len(windows)
+    keep_to = [len(flat) for flat in flats]
+
+    for k in range(len(windows) - 1):
+        (_, end), (next_start, _) = windows[k], windows[k + 1]
+        mid = next_start + (end - next_start) // 2
+        anchor = [normalize_word(w) for w in words[mid:mid + anchor_words]]
+
+        expected_cut = len(flats[k]) - (end - mid)
+        cut = find_anchor([normalize_word(w) for _, w in flats[k]], anchor, expected_cut)
+        keep_to[k] = cut if cut is not None else max(expected_cut, 0)
+
+        expected_start = mid - next_start
+        next_cut = find_anchor([normalize_word(w) for _, w in flats[k + 1]], anchor, expected_start)
+        keep_from[k + 1] = next_cut if next_cut is not None else min(expected_start, len(flats[k + 1]))
+
+    # regroup consecutive words of the same agenda item, merging across window boundaries
+    stitched = []
+    for k, flat in enumerate(flats):
+        for agenda_item, word in flat[keep_from[k]:keep_to[k]]:
+            if stitched and stitched[-1]["agenda_item"] == agenda_item:
+                stitched[-1]["transcript"] += " " + word
+            else:
+                stitched.append({"agenda_item": agenda_item, "transcript": word})
+
+    return stitched
+
+
+def tokenize(text: str):
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def bm25_scores(blocks, documents, k1: float = 1.5, b: float = 0.75):
+    """
+    Returns a (blocks x documents) matrix of BM25 scores of each transcript block, used as query,
+    against each agenda segment.
+
+    Parameters:
+    - blocks: list of token lists of transcript blocks.
+    - documents: list of token lists of agenda segments.
+    - k1 (float): float object of BM25 term frequency saturation.
+    - b (float): float object of BM25 length normalization.
+    """
+    vocabulary = {}
+    for tokens in documents:
+        for token in tokens:
+            vocabulary.setdefault(token, len(vocabulary))
+
+    tf = np.zeros((len(documents), len(vocabulary)))
+    for d, tokens in enumerate(documents):
+        for token in tokens:
+            tf[d, vocabulary[token]] += 1
+
+    lengths = tf.sum(axis=1, keepdims=True)
+    df = (tf > 0).sum(axis=0)
+    idf = np.log(1 + (len(documents) - df + 0.5) / (df + 0.5))
+    weights = idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * lengths / max(lengths.mean(), 1)))
+
+    queries = np.zeros((len(blocks), len(vocabulary)))
+    for q, tokens in enumerate(blocks):
+        for token in tokens:
+            if token in vocabulary:
+                queries[q, vocabulary[token]] += 1
+
+    return queries @ weights.T
+
+
+def monotonic_alignment(scores):
+    """
+    Assigns each transcript block to an agenda item so that items never go backwards and the total score
+    is maximal. Items may be skipped. Returns list of agenda item indexes, one per block.
+
+    Parameters:
+    - scores: (blocks x items) matrix of block to agenda item scores.
+    """
+    n_blocks, n_items = scores.shape
+    best = np.zeros((n_blocks, n_items))
+    came_from = np.zeros((n_blocks, n_items), dtype=int)
+
+    best[0] = scores[0]
+    for t in range(1, n_blocks):
+        # best previous item at or before each item
+        prefix_arg = np.zeros(n_items, dtype=int)
+        for i in range(1, n_items):
+            prefix_arg[i] = i if best[t - 1, i] >= best[t - 1, prefix_arg[i - 1]] else prefix_arg[i - 1]
+        came_from[t] = prefix_arg
+        best[t] = scores[t] + best[t - 1, prefix_arg]
+
+    labels = [int(best[-1].argmax())]
+    for t in range(n_blocks - 1, 0, -1):
+        labels.append(int(came_from[t, labels[-1]]))
+    return labels[::-1]
+
+
+def uncertain_regions(labels, scores, margin: float, max_blocks: int):
+    """
+    Returns (first, last) block ranges around agenda item changes that the local scores do not clearly
+    support. A block is certain if its assigned item is its best scoring item by at least margin (relative
+    to its best score); a change is trusted if the blocks on both sides of it are certain. Around an
+    untrusted change, the range grows over uncertain blocks up to max_blocks on each side.
+
+    Parameters:
+    - labels: list of agenda item indexes, one per block.
+    - scores: (blocks x items) matrix of block to agenda item scores.
+    - margin (float): float object of minimum relative margin for a block to be certain.
+    - max_blocks (int): int object of maximum number of blocks a range grows on each side of a change.
+    """
+    top = np.sort(scores, axis=1)
+    best, runner_up = top[:, -1], top[:, -2] if scores.shape[1] > 1 else np.zeros(len(scores))
+    assigned = scores[np.arange(len(labels)), labels]
+    certain = (assigned >= best) & (best - runner_up >= margin * np.maximum(best, 1e-9))
+
+    regions = []
+    for t in range(1, len(labels)):
+        if labels[t] == labels[t - 1] or (certain[t - 1] and certain[t]):
+            continue
+
+        first, last = t - 1, t
+        while first > 0 and t - first < max_blocks and not certain[first - 1]:
+            first -= 1
+        while last < len(labels) - 1 and last - t < max_blocks and not certain[last + 1]:
+            last += 1
+
+        # merge overlapping ranges
+        if regions and first <= regions[-1][1] + 1:
+            regions[-1] = (regions[-1][0], max(regions[-1][1], last))
+        else:
+            regions.append((first, last))
+    return regions
+
+
+def agenda_label(index: int, agenda_segment: str):
+    return f"Agenda Item {index + 1}: {str(agenda_segment).strip().splitlines()[0].strip()}"
+
+
+def estimate_tokens(text: str):
+    return len(text) // 4
 
 
+def refine_region(region_words, candidates, agenda_segments, segmentation_model: str, client, excerpt_words: int = 60):
+    """
+    Prompts Claude to segment one uncertain transcript region against its candidate agenda items and returns
+    (agenda item index per word, prompt text). Items are given by excerpt only, keeping their agenda numbers.
+    Returns None as labels if the response could not be used.
+
+    Parameters:
+    - region_words: list of transcript words of the region.
+    - candidates: list of agenda item indexes the region may belong to.
+    - agenda_segments: list of agenda segment texts.
+    - segmentation_model (str): string object of Claude model alias to segment.
+    - client: Claude API client.
+    - excerpt_words (int): int object of number of words of each agenda item given to Claude.
+    """
+    text = "Meeting Transcript:\n" + " ".join(region_words)
+    for i in candidates:
+        text += f"\n\nAgenda Item {i+1}:\n" + " ".join(str(agenda_segments[i]).split()[:excerpt_words])
+
+    # replace double quotes for JSON parsing
+    text = text.replace('"', "'")
+
+    segments = []
+    if not claude_segment(text, segmentation_model, client, segments.append):
+        return None, text
+
+    # one label per word Claude returned, spread over the original words of the region
+    returned = []
+    for row in segments:
+        try:
+            index = int(str(row.get("agenda_item", "")).split(":")[0].split(" ")[-1]) - 1
+        except ValueError:
+            continue
+        if index in candidates:
+            returned += [index] * len(str(row.get("transcript", "")).split())
+
+    if not returned:
+        return None, text
+    return [returned[i * len(returned) // len(region_words)] for i in range(len(region_words))], text
 
-def segment_all_transcripts(input_folder: Path, agenda_folder: Path, output_folder: Path, start_day: datetime, end_day: datetime, segmentation_model: str, client):
+
+def segment_transcript_aligned(words, agenda_segments, output_path: Path, segmentation_model: str, client, block_words: int = 80, margin: float = 0.2, max_blocks: int = 6, max_workers: int = 4):
     """
-    Prompts Claude to segment TXT meeting transcripts and saves segments as CSV.
+    Segments a transcript by aligning blocks of words to agenda items locally (BM25 scores and a monotonic
+    alignment, as meetings mostly follow the agenda), then only sends the uncertain boundary regions to
+    Claude. Saves segments as CSV and prints the input tokens avoided compared to one full request.
+
+    Parameters:
+    - words: list of transcript words.
+    - agenda_segments: list of agenda segment texts.
+    - output_path (Path): Path object of destination CSV file.
+    - segmentation_model (str): string object of Claude model alias to segment.
+    - client: Claude API client.
+    - block_words (int): int object of number of transcript words per aligned block.
+    - margin (float): float object of minimum relative score margin for a block to be certain.
+    - max_blocks (int): int object of maximum number of blocks sent to Claude on each side of an uncertain boundary.
+    - max_workers (int): int object of number of regions refined concurrently.
+    """
+    if not words:
+        print("!!! empty transcript")
+        return
+
+    # skip, nothing to align to
+    if not agenda_segments:
+        print("!!! no agenda segments")
+        return
+
+    blocks = [words[i:i + block_words] for i in range(0, len(words), block_words)]
+    scores = bm25_scores([tokenize(" ".join(block)) for block in blocks], [tokenize(str(a)) for a in agenda_segments])
+    labels = monotonic_alignment(scores)
+    regions = uncertain_regions(labels, scores, margin, max_blocks)
+
+    word_labels = [labels[i // block_words] for i in range(len(words))]
+
+    def refine(region):
+        first, last = region
+        candidates = list(range(labels[max(first - 1, 0)], labels[min(last + 1, len(labels) - 1)] + 1))
+        start, end = first * block_words, min((last + 1) * block_words, len(words))
+        try:
+            return start, end, refine_region(words[start:end], candidates, agenda_segments, segmentation_model, client)
+        except Exception as e:
+            # one failed region keeps its local labels instead of losing the whole meeting
+            print(f"!!! refining words {start}-{end} failed ({e})")
+            return start, end, (None, None)
+
+    sent_tokens = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for start, end, (region_labels, text) in pool.map(refine, regions):
+            if text is not None:
+                sent_tokens += estimate_tokens(transcript_segmentation_prompt(text))
+            if region_labels is None:
+                print(f"!!! could not refine words {start}-{end}, keeping local alignment")
+                continue
+            word_labels[start:end] = region_labels
+
+    segments = []
+    for word, label in zip(words, word_labels):
+        if segments and segments[-1]["index"] == label:
+            segments[-1]["transcript"] += " " + word
+        else:
+            segments.append({"index": label, "agenda_item": agenda_label(label, agenda_segments[label]), "transcript": word})
+
+    full_text = "Meeting Transcript:\n" + " ".join(words) + "".join(f"\n\nAgenda Item {i+1}:\n{a}" for i, a in enumerate(agenda_segments))
+    full_tokens = estimate_tokens(transcript_segmentation_prompt(full_text))
+    print(
+        f"    pre-alignment: {len(regions)} uncertain regions sent to Claude, "
+        f"~{sent_tokens} input tokens instead of ~{full_tokens} ({full_tokens - sent_tokens} avoided)"
+    )
+
+    save_segments_to_csv(segments, output_path)
+
+
+def segment_all_transcripts(input_folder: Path, agenda_folder: Path, output_folder: Path, start_day: datetime, end_day: datetime, segmentation_model: str, client, chunked: bool = False, window_words: int = 6000, overlap_words: int = 300, max_workers: int = 4, use_offsets: bool = False, pre_align: bool = False, block_words: int = 80, margin: float = 0.2, max_blocks: int = 6, catalog: MeetingCatalog = None):
+    """
+    Prompts Claude to segment TXT meeting transcripts and saves segments as CSV. The modes are tried in order:
+    segment offsets (use_offsets and a sidecar exists), then pre-alignment (pre_align), then windows (chunked),
+    and by default one full request per transcript.
 
     Parameters:
     - input_folder (Path): Path object of folder with TXT transcript files.
@@ -132,18 +659,26 @@ def segment_all_transcripts(input_folder: Path, agenda_folder: Path, output_fold
     - end_day (datetime): datetime object of latest day in timeframe. 
     - segmentation_model (str): string object of Claude model alias to segment.
     - client: Claude API client. 
+    - chunked (bool): bool object, if True transcripts are segmented in overlapping windows concurrently.
+    - window_words (int): int object of number of transcript words per window.
+    - overlap_words (int): int object of number of words shared by neighbouring windows.
+    - max_workers (int): int object of number of windows segmented concurrently.
+    - use_offsets (bool): bool object, if True and the transcript has a segments sidecar, Claude only returns segment ranges.
+    - pre_align (bool): bool object, if True the transcript is aligned locally and only uncertain boundaries are sent to Claude.
+    - block_words (int): int object of number of transcript words per aligned block.
+    - margin (float): float object of minimum relative score margin for a block to be certain.
+    - max_blocks (int): int object of maximum number of blocks sent to Claude on each side of an uncertain boundary.
+    - catalog (MeetingCatalog): optional MeetingCatalog object, only transcripts without recorded segments are segmented and new segments are recorded.
     """
 
     output_folder.mkdir(parents=True, exist_ok=True)
 
-    for file_path in sorted(input_folder.rglob("*.txt")):
-        meeting_date = str(file_path.name).split("_")[0]
-        meeting_datetime = datetime.strptime(meeting_date, "%Y%m%d")
-
-        # skip, out of time frame
-        if not (start_day <= meeting_datetime <= end_day):
-            continue
+    if catalog is not None and catalog.knows("transcript"):
+        file_paths = catalog.missing("transcript_segments", "transcript", start_day, end_day)
+    else:
+        file_paths = meeting_paths(input_folder, "*.txt", start_day, end_day)
 
+    for file_path in file_paths:
         file_stem = file_path.stem
         agenda_path = agenda_folder / f"{file_stem}.csv"
         output_path = output_folder / f"{file_stem}.csv"
@@ -152,22 +687,99 @@ def segment_all_transcripts(input_folder: Path, agenda_folder: Path, output_fold
             print(f"skipping, already exists: {file_path}")
             continue
 
+        segment_transcript(file_path, agenda_path, output_path, segmentation_model, client, chunked, window_words, overlap_words, max_workers, use_offsets, pre_align, block_words, margin, max_blocks)
+
+        if catalog is not None:
+            catalog.record("transcript_segments", output_path)
+
+
+def segment_transcript(file_path: Path, agenda_path: Path, output_path: Path, segmentation_model: str, client, chunked: bool = False, window_words: int = 6000, overlap_words: int = 300, max_workers: int = 4, use_offsets: bool = False, pre_align: bool = False, block_words: int = 80, margin: float = 0.2, max_blocks: int = 6):
+    """
+    Prompts Claude to segment one meeting transcript against its agenda segments and saves segments as CSV.
+    The first mode that applies is used: segment offsets (use_offsets and a sidecar exists), pre-alignment
+    (pre_align), overlapping windows (chunked and longer than one window), otherwise one full request.
+
+    Parameters:
+    - file_path (Path): Path object of TXT transcript file.
+    - agenda_path (Path): Path object of CSV agenda segments file.
+    - output_path (Path): Path object of destination CSV file.
+    - segmentation_model (str): string object of Claude model alias to segment.
+    - client: Claude API client.
+    - chunked (bool): bool object, if True the transcript is segmented in overlapping windows concurrently.
+    - window_words (int): int object of number of transcript words per window.
+    - overlap_words (int): int object of number of words shared by neighbouring windows.
+    - max_workers (int): int object of number of windows segmented concurrently.
+    - use_offsets (bool): bool object, if True and the transcript has a segments sidecar, Claude only returns segment ranges.
+    - pre_align (bool): bool object, if True the transcript is aligned locally and only uncertain boundaries are sent to Claude.
+    - block_words (int): int object of number of transcript words per aligned block.
+    - margin (float): float object of minimum relative score margin for a block to be certain.
+    - max_blocks (int): int object of maximum number of blocks sent to Claude on each side of an uncertain boundary.
+    """
+    print(f"segmenting: {file_path}")
 
-        print(f"segmenting: {file_path}")
+    transcript = file_path.read_text(encoding='utf-8')
 
+    agenda_text = ""
+    agenda_segments = list(pd.read_csv(agenda_path)["agenda_segment"])
+    for i in range(len(agenda_segments)):
+        agenda_text += f"\n\nAgenda Item {i+1}:\n" + agenda_segments[i]
 
-        text = "Meeting Transcript:\n" + file_path.read_text(encoding='utf-8')
+    sidecar_path = file_path.with_name(f"{file_path.stem}_segments.csv")
+    if use_offsets and sidecar_path.exists():
+        segment_transcript_offsets(sidecar_path, agenda_text, output_path, segmentation_model, client)
+        return
 
-        agenda_segments = list(pd.read_csv(agenda_path)["agenda_segment"])
-        for i in range(len(agenda_segments)):
-            text += f"\n\nAgenda Item {i+1}:\n" + agenda_segments[i]
+    words = transcript.split()
+    if pre_align:
+        segment_transcript_aligned(words, agenda_segments, output_path, segmentation_model, client, block_words, margin, max_blocks, max_workers)
+        return
 
+    if not chunked or len(words) <= window_words:
+        text = "Meeting Transcript:\n" + transcript + agenda_text
 
         # replace double quotes for JSON parsing
         text = text.replace('"', "'")
 
-        segments_json = claude_segment(text, segmentation_model, client)
-        save_json_segments_to_csv(segments_json, output_path)
+        # segments are appended as they stream in, the CSV is only renamed into place once complete
+        partial_path = output_path.with_suffix(".partial.csv")
+        complete = stream_segments_to_csv(text, partial_path, segmentation_model, client)
+
+        if complete:
+            partial_path.replace(output_path)
+            print(f"saved: {output_path}")
+        else:
+            print(f"!!! incomplete segmentation, salvaged segments in: {partial_path}")
+        return
+
+    windows = split_windows(len(words), window_words, overlap_words)
+    print(f"    {len(windows)} windows of {window_words} words")
+
+    # each window streams into its own partial CSV, read back for stitching once all are done
+    window_paths = [output_path.with_name(f"{output_path.stem}.window{k}.partial.csv") for k in range(len(windows))]
+
+    def segment_window(k):
+        start, end = windows[k]
+        # replace double quotes for JSON parsing
+        text = ("Meeting Transcript:\n" + " ".join(words[start:end]) + agenda_text).replace('"', "'")
+        return stream_segments_to_csv(text, window_paths[k], segmentation_model, client)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        completed = list(pool.map(segment_window, range(len(windows))))
+
+    window_segments = []
+    for window_path in window_paths:
+        with open(window_path, newline="", encoding="utf-8") as f:
+            window_segments.append(list(csv.DictReader(f)))
+    stitched = stitch_windows(windows, window_segments, words)
+
+    if all(completed):
+        save_segments_to_csv(stitched, output_path)
+        for window_path in window_paths:
+            window_path.unlink()
+    else:
+        partial_path = output_path.with_suffix(".partial.csv")
+        save_segments_to_csv(stitched, partial_path)
+        print(f"!!! incomplete segmentation, salvaged segments in: {partial_path} (per window in {output_path.stem}.window*.partial.csv)")
 
 
 if __name__ == "__main__":
@@ -1,21 +1,30 @@
 import pandas as pd
 from pathlib import Path
 from datetime import datetime
+from artifact_store import ArtifactStore
+from meeting_catalog import MeetingCatalog, meeting_paths
 
 
 def main():
     ######## CONFIGURATION ########
     INPUT_TRANSCRIPT_SEGMENTS_FOLDER = Path("transcript_segments")
     INPUT_AGENDA_SEGMENTS_FOLDER = Path("agenda_segments")
+    INPUT_TRANSCRIPT_FOLDER = Path("transcripts")
     START_DAY = datetime.strptime("20250519", "%Y%m%d")
     END_DAY = datetime.strptime("20250523", "%Y%m%d")
+    USE_ARTIFACT_STORE = False  # add columns in the artifact store instead of rewriting agenda segments CSVs
+    ARTIFACT_STORE_PATH = Path("artifacts.sqlite")
+    CATALOG_PATH = Path("meeting_catalog.sqlite")
     ###############################
 
-    combine_all_segments_in_folder(INPUT_TRANSCRIPT_SEGMENTS_FOLDER, INPUT_AGENDA_SEGMENTS_FOLDER, START_DAY, END_DAY)
+    store = ArtifactStore(ARTIFACT_STORE_PATH) if USE_ARTIFACT_STORE else None
+    catalog = MeetingCatalog(CATALOG_PATH)
 
+    combine_all_segments_in_folder(INPUT_TRANSCRIPT_SEGMENTS_FOLDER, INPUT_AGENDA_SEGMENTS_FOLDER, START_DAY, END_DAY, INPUT_TRANSCRIPT_FOLDER, store, catalog)
 
 
-def combine_all_segments_in_folder(transcript_segments_folder: Path, agenda_segments_folder: Path, start_day: datetime, end_day: datetime):
+
+def combine_all_segments_in_folder(transcript_segments_folder: Path, agenda_segments_folder: Path, start_day: datetime, end_day: datetime, transcript_folder: Path = Path("transcripts"), store: ArtifactStore = None, catalog: MeetingCatalog = None):
     """
     Pairs matching transcript segments for each agenda segment and combines agenda, legislation, and transcript into combined segment. Saves to original agenda segments location.
 
@@ -24,73 +33,118 @@ def combine_all_segments_in_folder(transcript_segments_folder: Path, agenda_segm
     - agenda_segments_folder (Path): Path object of folder containing agenda segments and matched legislations. 
     - start_day (datetime): datetime object of earliest day in timeframe.
     - end_day (datetime): datetime object of latest day in timeframe. 
+    - transcript_folder (Path): Path object of folder containing transcripts and their segments sidecars.
+    - store (ArtifactStore): optional ArtifactStore object, combined segments are saved there instead of the CSV.
+    - catalog (MeetingCatalog): optional MeetingCatalog object, agenda segments with matched legislations are looked up there and combined segments recorded.
     """
-    for agenda_file in sorted(agenda_segments_folder.rglob("*.csv")):
-        meeting_date = str(agenda_file.name).split("_")[0]
-        meeting_datetime = datetime.strptime(meeting_date, "%Y%m%d")
-
-        # skip, out of time frame
-        if not (start_day <= meeting_datetime <= end_day):
-            continue
+    for agenda_file in meeting_paths(agenda_segments_folder, "*.csv", start_day, end_day, catalog, "matched_legislation"):
 
-        print(f"combining: {agenda_file}")
         transcript_file = transcript_segments_folder / f"{agenda_file.name}"
+        sidecar_file = transcript_folder / f"{agenda_file.stem}_segments.csv"
+        combine_segments(agenda_file, transcript_file, sidecar_file, store)
+
+        if catalog is not None:
+            catalog.record("combined_segments", agenda_file)
+
 
+def rebuild_transcripts(transcript_df, sidecar_file: Path):
+    """
+    Fills the transcript column of transcript segments given as ranges of Whisper segments, from the segments sidecar.
+
+    Parameters:
+    - transcript_df: DataFrame of transcript segments with agenda_item, first_segment and last_segment columns.
+    - sidecar_file (Path): Path object of CSV of numbered transcript segments saved by audio transcription.
+    """
+    texts = list(pd.read_csv(sidecar_file, keep_default_na=False)["text"])
+
+    transcripts = []
+    for _, row in transcript_df.iterrows():
+        first = max(int(row["first_segment"]), 0)
+        last = min(int(row["last_segment"]), len(texts) - 1)
+        transcripts.append(" ".join(texts[first:last + 1]))
+
+    transcript_df["transcript"] = transcripts
+    return transcript_df
+
+
+def combine_segments(agenda_file: Path, transcript_file: Path, sidecar_file: Path = None, store: ArtifactStore = None):
+    """
+    Pairs matching transcript segments of one meeting with its agenda segments and saves combined segments to the agenda segments file.
+
+    Parameters:
+    - agenda_file (Path): Path object of CSV file containing agenda segments and matched legislations.
+    - transcript_file (Path): Path object of CSV file containing transcript segments.
+    - sidecar_file (Path): Path object of CSV of numbered transcript segments, needed if transcript segments are given as segment ranges.
+    - store (ArtifactStore): optional ArtifactStore object, only the new columns are saved there and the CSV is left as is.
+    """
+    print(f"combining: {agenda_file}")
+
+    if store is not None:
+        store.sync_csv(agenda_file.stem, "agenda_segments", agenda_file)
+        agenda_df = store.read(agenda_file.stem, "agenda_segments", ["agenda_segment", "matched_legislation"])
+    else:
         agenda_df = pd.read_csv(agenda_file)
-        transcript_df = pd.read_csv(transcript_file)
-
-        # default value
-        agenda_df["matched_transcript"] = "NO_TRANSCRIPT"
-
-        # special case where only one thing on agenda ("Public hearing", etc)
-        if len(agenda_df) == 1 and len(transcript_df) == 1:
-            agenda_df.loc[0, "matched_transcript"] = transcript_df.loc[0, "transcript"]
-        else:
-            # matches up transcript segments and agenda segments.
-            for idx, row in transcript_df.iterrows():
-                agenda_item = row["agenda_item"]
-                transcript = row["transcript"]
-
-                try:
-                    agenda_num = int(agenda_item.split(":")[0].split(" ")[-1])
-                except:
-                    raise ValueError(f"!!! cannot find agenda item: {transcript_file}, row {str(idx)}")
-                
-                agenda_idx = agenda_num - 1
-
-                if agenda_df.loc[agenda_idx, "matched_transcript"] == "NO_TRANSCRIPT":
-                    agenda_df.loc[agenda_idx, "matched_transcript"] = transcript
-                else:
-                    agenda_df.loc[agenda_idx, "matched_transcript"] = agenda_df.loc[agenda_idx, "matched_transcript"] + " " + transcript
-        
-        
-
-        # combining agenda, legislation, and transcript 
-        agenda_df["combined_segment"] = "NO_SEGMENT"
-
-        for idx, row in agenda_df.iterrows():
-            agenda_segment = row["agenda_segment"]
-            legislation = row["matched_legislation"]
-            transcript_segment = row["matched_transcript"]
-
-            # skip if there is no relevant transcript segments to the agenda segment, meaning not mentioned in transcript
-            if transcript_segment == "NO_TRANSCRIPT":
-                continue
-
-            combined_segment = (
-                "**Section of meeting agenda:**\n"
-                f"{agenda_segment}\n\n"
-                "**Section of meeting legislation:**\n"
-                f"{legislation}\n\n"
-                "**Section of meeting transcript:**\n"
-                f"{transcript_segment}"
-            )
-
-            agenda_df.loc[idx, "combined_segment"] = combined_segment
-
-        # save to original agenda segments file location
-        agenda_df.to_csv(agenda_file, index=False)
+    transcript_df = pd.read_csv(transcript_file)
+
+    # segmented by Whisper segment ranges, text is rebuilt locally
+    if "transcript" not in transcript_df.columns:
+        transcript_df = rebuild_transcripts(transcript_df, sidecar_file)
+
+    # default value
+    agenda_df["matched_transcript"] = "NO_TRANSCRIPT"
+
+    # special case where only one thing on agenda ("Public hearing", etc)
+    if len(agenda_df) == 1 and len(transcript_df) == 1:
+        agenda_df.loc[0, "matched_transcript"] = transcript_df.loc[0, "transcript"]
+    else:
+        # matches up transcript segments and agenda segments.
+        for idx, row in transcript_df.iterrows():
+            agenda_item = row["agenda_item"]
+            transcript = row["transcript"]
+
+            try:
+                agenda_num = int(agenda_item.split(":")[0].split(" ")[-1])
+            except:
+                raise ValueError(f"!!! cannot find agenda item: {transcript_file}, row {str(idx)}")
+
+            agenda_idx = agenda_num - 1
+
+            if agenda_df.loc[agenda_idx, "matched_transcript"] == "NO_TRANSCRIPT":
+                agenda_df.loc[agenda_idx, "matched_transcript"] = transcript
+            else:
+                agenda_df.loc[agenda_idx, "matched_transcript"] = agenda_df.loc[agenda_idx, "matched_transcript"] + " " + transcript
+
+
+
+    # combining agenda, legislation, and transcript 
+    agenda_df["combined_segment"] = "NO_SEGMENT"
+
+    for idx, row in agenda_df.iterrows():
+        agenda_segment = row["agenda_segment"]
+        legislation = row["matched_legislation"]
+        transcript_segment = row["matched_transcript"]
+
+        # skip if there is no relevant transcript segments to the agenda segment, meaning not mentioned in transcript
+        if transcript_segment == "NO_TRANSCRIPT":
+            continue
+
+        combined_segment = (
+            "**Section of meeting agenda:**\n"
+            f"{agenda_segment}\n\n"
+            "**Section of meeting legislation:**\n"
+            f"{legislation}\n\n"
+            "**Section of meeting transcript:**\n"
+            f"{transcript_segment}"
+        )
+
+        agenda_df.loc[idx, "combined_segment"] = combined_segment
+
+    if store is not None:
+        store.write(agenda_file.stem, "agenda_segments", agenda_df[["matched_transcript", "combined_segment"]])
+        return
 
+    # save to original agenda segments file location
+    agenda_df.to_csv(agenda_file, index=False)
 
 
 if __name__ == "__main__":
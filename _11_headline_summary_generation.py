@@ -1,10 +1,26 @@
 import os
+import json
 import time
+import random
+import asyncio
+import threading
 import pandas as pd
 from pathlib import Path
 from dotenv import load_dotenv
 import anthropic
 from datetime import datetime
+from artifact_store import ArtifactStore
+from meeting_catalog import MeetingCatalog, meeting_paths
+from llm_cache import LLMCache, CachedClient, cached_response
+from llm_batch import load_batch_state, save_batch_state, submit_batch, wait_for_batch
+
+
+######## CONFIGURATION SHARED WITH run_pipeline ########
+HEADLINE_MODEL = "claude-sonnet-4-20250514"
+SUMMARY_MODEL = "claude-sonnet-4-20250514"
+RATE_LIMIT_SECONDS = 10
+SINGLE_CALL = False  # if True, one JSON request per row for headline and summary, invalid responses fall back to two requests
+#########################################################
 
 
 def main():
@@ -16,17 +32,51 @@ def main():
     OUTPUT_REPORTS_FOLDER = Path("reports")
     START_DAY = datetime.strptime("20250519", "%Y%m%d")
     END_DAY = datetime.strptime("20250523", "%Y%m%d")
-    HEADLINE_MODEL = "claude-sonnet-4-20250514"
-    SUMMARY_MODEL = "claude-sonnet-4-20250514"
-    RATE_LIMIT_SECONDS = 10
+    EXECUTION_MODE = "sync"  # "sync", "async" (concurrent, rate limited) or "batch"
+    MAX_CONCURRENT_REQUESTS = 8
+    REQUESTS_PER_MINUTE = 50
+    CLAUDE_BASE_URL = os.getenv("CLAUDE_BASE_URL")  # set to point at a local mock messages server
+    BATCH_POLL_SECONDS = 60
+    LLM_CACHE_PATH = Path("llm_cache.sqlite")
+    BYPASS_LLM_CACHE = False
+    USE_ARTIFACT_STORE = False  # read combined segments from the artifact store instead of agenda segments CSVs
+    ARTIFACT_STORE_PATH = Path("artifacts.sqlite")
+    CATALOG_PATH = Path("meeting_catalog.sqlite")
     ###############################
 
-    claude_client = anthropic.Anthropic(api_key=CLAUDE_KEY)
-    generate_headlines_summaries(INPUT_AGENDA_SEGMENTS_FOLDER, OUTPUT_REPORTS_FOLDER, START_DAY, END_DAY, HEADLINE_MODEL, SUMMARY_MODEL, RATE_LIMIT_SECONDS, claude_client)
+    cache = LLMCache(LLM_CACHE_PATH, bypass=BYPASS_LLM_CACHE)
+    store = ArtifactStore(ARTIFACT_STORE_PATH) if USE_ARTIFACT_STORE else None
+    catalog = MeetingCatalog(CATALOG_PATH)
+    stats = SingleCallStats() if SINGLE_CALL else None
 
+    if EXECUTION_MODE == "batch":
+        claude_client = anthropic.Anthropic(api_key=CLAUDE_KEY, base_url=CLAUDE_BASE_URL)
+        generate_headlines_summaries_batch(INPUT_AGENDA_SEGMENTS_FOLDER, OUTPUT_REPORTS_FOLDER, START_DAY, END_DAY, HEADLINE_MODEL, SUMMARY_MODEL, BATCH_POLL_SECONDS, claude_client, cache, store, catalog, stats)
+    elif EXECUTION_MODE == "async":
+        # rate limiting and all retries (429, 5xx, 529 overloaded, connection errors, timeouts) are handled here, not by the SDK
+        async_client = anthropic.AsyncAnthropic(api_key=CLAUDE_KEY, base_url=CLAUDE_BASE_URL, max_retries=0)
+        asyncio.run(generate_headlines_summaries_async(INPUT_AGENDA_SEGMENTS_FOLDER, OUTPUT_REPORTS_FOLDER, START_DAY, END_DAY, HEADLINE_MODEL, SUMMARY_MODEL, MAX_CONCURRENT_REQUESTS, REQUESTS_PER_MINUTE, async_client, cache, store, catalog, stats))
+    else:
+        claude_client = CachedClient(anthropic.Anthropic(api_key=CLAUDE_KEY, base_url=CLAUDE_BASE_URL), cache)
+        generate_headlines_summaries(INPUT_AGENDA_SEGMENTS_FOLDER, OUTPUT_REPORTS_FOLDER, START_DAY, END_DAY, HEADLINE_MODEL, SUMMARY_MODEL, RATE_LIMIT_SECONDS, claude_client, store, catalog, stats)
 
-def build_headline_prompt(combined_segment: str):
-    return f"""
+    if stats is not None:
+        stats.report()
+    cache.report()
+
+
+def segment_context_block(combined_segment: str):
+    """
+    Returns the combined segment as the first content block of headline and summary prompts, marked for prompt caching.
+    Both prompts start with the same block, so the summary request reads the segment from the cache written by the
+    headline request (with the same model, within the cache lifetime) instead of paying for it again.
+
+    Parameters:
+    - combined_segment (str): string object containing combined segment.
+    """
+    return {
+        "type": "text",
+        "text": f"""
 You are a local government reporter covering city council meetings.
 
 You will receive:
@@ -34,6 +84,20 @@ You will receive:
 - A section from the related **official legislation**
 - A section from the **meeting transcript**
 
+---
+{combined_segment}
+---
+""",
+        "cache_control": {"type": "ephemeral"},
+    }
+
+
+def build_headline_prompt(combined_segment: str):
+    return [
+        segment_context_block(combined_segment),
+        {
+            "type": "text",
+            "text": """
 Your task is to write a **clear, one-sentence headline** that:
 - Focuses on the **most newsworthy action or decision**
 - Summarizes what the **council actually did**, proposed, debated, or approved
@@ -43,22 +107,20 @@ Your task is to write a **clear, one-sentence headline** that:
 
 Do *not* copy or paraphrase the agenda title. Use the transcript and legislation instead.
 
----
-{combined_segment}
-
 Headline:
-"""
+""",
+        },
+    ]
 
 
 def build_summary_prompt(headline: str, combined_segment: str):
-    return f"""
-You are a beat reporter covering public meetings.
-
-Given:
-- A section from the **meeting agenda**
-- Related **official legislation**
-- A **meeting transcript segment**
-- A **headline** summarizing the segment
+    return [
+        segment_context_block(combined_segment),
+        {
+            "type": "text",
+            "text": f"""
+You are also given a **headline** summarizing the segment:
+{headline}
 
 Write a **bullet-point summary** that:
 - Focuses only on the topic described in the headline
@@ -67,14 +129,115 @@ Write a **bullet-point summary** that:
 - Ignores unrelated discussion
 - Is at an **eighth-grade reading level**
 
----
-{combined_segment}
+Summary:
+""",
+        },
+    ]
 
-Headline:
-{headline}
 
-Summary:
-"""
+def build_headline_summary_prompt(combined_segment: str):
+    return [
+        segment_context_block(combined_segment),
+        {
+            "type": "text",
+            "text": """
+Your task is to write a **clear, one-sentence headline** and a **bullet-point summary**.
+
+The headline:
+- Focuses on the **most newsworthy action or decision**
+- Summarizes what the **council actually did**, proposed, debated, or approved
+- Highlights **specific outcomes**, impacts, or controversial statements
+- Is written at an **eighth-grade reading level**
+- Contains **no commentary** or extra background
+
+Do *not* copy or paraphrase the agenda title. Use the transcript and legislation instead.
+
+The summary:
+- Focuses only on the topic described in the headline
+- Uses relevant context from the transcript and agenda
+- Clarifies or expands on important details (specific figures, decisions)
+- Ignores unrelated discussion
+- Is at an **eighth-grade reading level**
+
+Respond with only a JSON object and nothing else:
+{"headline": "<one-sentence headline>", "summary": "<bullet-point summary, one bullet per line>"}
+""",
+        },
+    ]
+
+
+def parse_headline_summary(text: str):
+    """
+    Parses and validates the JSON response of a single call prompt. Returns (headline, summary),
+    raises ValueError if the response is not a JSON object with a one-line headline and a non-empty summary.
+
+    Parameters:
+    - text (str): string object of Claude response.
+    """
+    # tolerate a code fence or a sentence around the object
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end < start:
+        raise ValueError("no JSON object")
+
+    try:
+        data = json.loads(text[start:end + 1])
+    except json.JSONDecodeError as e:
+        raise ValueError(f"invalid JSON ({e})")
+
+    headline, summary = data.get("headline"), data.get("summary")
+    if not isinstance(headline, str) or not headline.strip() or "\n" in headline.strip():
+        raise ValueError("headline missing or not one line")
+    if not isinstance(summary, str) or not summary.strip():
+        raise ValueError("summary missing")
+
+    return headline.strip(), summary.strip()
+
+
+def prompt_tokens(usage):
+    """
+    Returns the number of prompt tokens of a response, cached or not.
+
+    Parameters:
+    - usage: usage object of a Claude response.
+    """
+    return sum(getattr(usage, field, None) or 0 for field in ("input_tokens", "cache_creation_input_tokens", "cache_read_input_tokens"))
+
+
+class SingleCallStats:
+    """
+    Counts rows answered by one JSON request and rows that fell back to two requests, with the requests and
+    prompt tokens saved. A valid single call saves the second request (about as many prompt tokens as it sent itself),
+    a fallback wastes the single call.
+    """
+    def __init__(self):
+        self.single = 0
+        self.fallback = 0
+        self.tokens_saved = 0
+
+    def add(self, valid: bool, usage=None):
+        """
+        Records the outcome of one single call request.
+
+        Parameters:
+        - valid (bool): bool object, True if the response passed validation.
+        - usage: usage object of the response, None if not known (cached or batch responses).
+        """
+        tokens = prompt_tokens(usage) if usage is not None else 0
+        if valid:
+            self.single += 1
+            self.tokens_saved += tokens
+        else:
+            self.fallback += 1
+            self.tokens_saved -= tokens + (getattr(usage, "output_tokens", 0) or 0)
+
+    def report(self):
+        """
+        Prints rows done in one request, fallbacks, and requests and tokens saved.
+        """
+        print(
+            f"single call: {self.single} rows in one request, {self.fallback} fell back to two requests, "
+            f"{self.single - self.fallback} requests and {self.tokens_saved} tokens saved"
+        )
 
 
 def generate_headline_claude(combined_segment: str, headline_model: str, client):
@@ -95,6 +258,46 @@ def generate_headline_claude(combined_segment: str, headline_model: str, client)
     return response.content[0].text.strip()
 
 
+def generate_headline_summary_claude(combined_segment: str, summary_model: str, client, stats: SingleCallStats = None):
+    """
+    Prompts Claude to generate headline and summary from combined segment in one request.
+    Returns (headline, summary), or None if the response fails validation.
+
+    Parameters:
+    - combined_segment (str): string object containing combined segment.
+    - summary_model (str): string object of Claude model alias to generate headline and summary.
+    - client: Claude API client.
+    - stats (SingleCallStats): optional SingleCallStats object the outcome is counted in.
+    """
+    response = client.messages.create(
+        model=summary_model,
+        max_tokens=4096,
+        temperature=0,
+        messages=[{"role": "user", "content": build_headline_summary_prompt(combined_segment)}]
+    )
+    return validate_single_call(response.content[0].text, response.usage, stats)
+
+
+def validate_single_call(text: str, usage, stats: SingleCallStats = None):
+    """
+    Returns (headline, summary) of a single call response, or None if it fails validation.
+
+    Parameters:
+    - text (str): string object of Claude response.
+    - usage: usage object of the response, None if not known.
+    - stats (SingleCallStats): optional SingleCallStats object the outcome is counted in.
+    """
+    try:
+        result = parse_headline_summary(text)
+    except ValueError as e:
+        print(f"!!! single call response rejected, falling back to two requests: {e}")
+        result = None
+
+    if stats is not None:
+        stats.add(result is not None, usage)
+    return result
+
+
 def generate_summary_claude(headline: str, combined_segment: str, summary_model: str, client):
     """
     Prompts Claude to generate summary from headline and combined segment.
@@ -115,7 +318,7 @@ def generate_summary_claude(headline: str, combined_segment: str, summary_model:
     return response.content[0].text.strip()
 
 
-def generate_headlines_summaries(input_agenda_segments_folder: Path, output_reports_folder: Path, start_day: datetime, end_day: datetime, headline_model: str, summary_model: str, rate_limit_seconds: int, client):
+def generate_headlines_summaries(input_agenda_segments_folder: Path, output_reports_folder: Path, start_day: datetime, end_day: datetime, headline_model: str, summary_model: str, rate_limit_seconds: int, client, store: ArtifactStore = None, catalog: MeetingCatalog = None, stats: SingleCallStats = None):
     """
     Iterates through all combined segments in time frame within folder and generates headlines and summaries.
 
@@ -128,62 +331,617 @@ def generate_headlines_summaries(input_agenda_segments_folder: Path, output_repo
     - summary_model (str): string object of Claude model alias to generate summaries.
     - rate_limit_seconds (int): int object of number of seconds for Claude to sleep between prompts.
     - client: Claude API client.
+    - store (ArtifactStore): optional ArtifactStore object, combined segments are read and headlines saved there.
+    - catalog (MeetingCatalog): optional MeetingCatalog object, combined segments are looked up there and reports recorded.
+    - stats (SingleCallStats): optional SingleCallStats object, if given headline and summary are first requested in one call.
     """
     output_reports_folder.mkdir(parents=True, exist_ok=True)
 
-    for input_path in sorted(input_agenda_segments_folder.rglob("*.csv")):
-        meeting_date = str(input_path.name).split("_")[0]
-        meeting_datetime = datetime.strptime(meeting_date, "%Y%m%d")
+    for input_path in meeting_paths(input_agenda_segments_folder, "*.csv", start_day, end_day, catalog, "combined_segments"):
+        print(f"processing: {input_path}")
+
+        output_path = output_reports_folder / input_path.name
+
+        generate_meeting_headlines_summaries(input_path, output_path, headline_model, summary_model, rate_limit_seconds, client, store, catalog, stats)
+
+
+def generate_meeting_headlines_summaries(input_path: Path, output_path: Path, headline_model: str, summary_model: str, rate_limit_seconds: int, client, store: ArtifactStore = None, catalog: MeetingCatalog = None, stats: SingleCallStats = None):
+    """
+    Generates headlines and summaries for all combined segments of one meeting.
+
+    Parameters:
+    - input_path (Path): Path object of CSV file containing combined segments.
+    - output_path (Path): Path object of CSV file where report (headlines and summaries) is saved.
+    - headline_model (str): string object of Claude model alias to generate headlines.
+    - summary_model (str): string object of Claude model alias to generate summaries.
+    - rate_limit_seconds (int): int object of number of seconds for Claude to sleep between prompts.
+    - client: Claude API client.
+    - store (ArtifactStore): optional ArtifactStore object, combined segments are read and headlines saved there.
+    - catalog (MeetingCatalog): optional MeetingCatalog object where the report is recorded.
+    - stats (SingleCallStats): optional SingleCallStats object, if given headline and summary are first requested in one call.
+    """
+    journal = ReportJournal.for_report(output_path)
+    df = load_meeting_report(input_path, output_path, store, journal)
+
+    for idx, row in df.iterrows():
+        combined_segment = row["combined_segment"]
 
-        # skip, out of time frame
-        if not (start_day <= meeting_datetime <= end_day):
+        # skip, no segment exists
+        if combined_segment == "NO_SEGMENT":
+            print(f"skipping row {idx}, no segment")
             continue
 
-        print(f"processing: {input_path}")
+        # skip, already done
+        if row["headline"] != "NO_HEADLINE":
+            print(f"skipping row {idx}, already done")
+            continue
 
-        output_path = output_reports_folder / input_path.name
+        print(f"processing row {idx}")
+
+        try:
+            time.sleep(rate_limit_seconds)
+            result = generate_headline_summary_claude(combined_segment, summary_model, client, stats) if stats is not None else None
+
+            if result is not None:
+                headline, summary = result
+            else:
+                # generate headline
+                headline = generate_headline_claude(combined_segment, headline_model, client)
+
+                # generate summary
+                summary = generate_summary_claude(headline, combined_segment, summary_model, client)
+
+            df.at[idx, "headline"] = headline
+            df.at[idx, "summary"] = summary
+            journal.append(idx, headline, summary)
+
+        except Exception as e:
+            print(f"error processing row {idx}: {e}")
+            continue
+
+    journal.compact(df, output_path, store, catalog)
+
+
+def load_meeting_report(input_path: Path, output_path: Path, store: ArtifactStore = None, journal: "ReportJournal" = None):
+    """
+    Loads the combined segments of one meeting with headline and summary columns, continuing from earlier progress.
+    With an artifact store only the combined_segment, headline and summary columns are loaded.
+    Rows finished by an interrupted run are replayed from the journal.
 
+    Parameters:
+    - input_path (Path): Path object of CSV file containing combined segments.
+    - output_path (Path): Path object of CSV file where report (headlines and summaries) is saved.
+    - store (ArtifactStore): optional ArtifactStore object holding the combined segments.
+    - journal (ReportJournal): optional ReportJournal object of the report.
+    """
+    if store is not None:
+        store.sync_csv(input_path.stem, "agenda_segments", input_path)
+        columns = [c for c in ("combined_segment", "headline", "summary") if c in store.columns(input_path.stem, "agenda_segments")]
+        df = store.read(input_path.stem, "agenda_segments", columns)
+    else:
         # use output file if it exists to not restart progress
         active_path = output_path if output_path.exists() else input_path
         df = pd.read_csv(active_path)
 
-        # create columns if missing 
-        if "headline" not in df.columns:
-            df["headline"] = "NO_HEADLINE"
-        if "summary" not in df.columns:
-            df["summary"] = "NO_SUMMARY"
+    # create columns if missing
+    if "headline" not in df.columns:
+        df["headline"] = "NO_HEADLINE"
+    if "summary" not in df.columns:
+        df["summary"] = "NO_SUMMARY"
+
+    if journal is not None:
+        replayed = journal.replay(df)
+        if replayed:
+            print(f"replayed {replayed} rows from {journal.path}")
+
+    return df
+
+
+def save_meeting_report(df, output_path: Path, store: ArtifactStore = None, catalog: MeetingCatalog = None):
+    """
+    Saves the report of one meeting to CSV. With an artifact store only the headline and summary columns are
+    written to the store, and the full report is exported to CSV for the ranking scripts.
+
+    Parameters:
+    - df: DataFrame of report returned by load_meeting_report.
+    - output_path (Path): Path object of CSV file where report (headlines and summaries) is saved.
+    - store (ArtifactStore): optional ArtifactStore object holding the combined segments.
+    - catalog (MeetingCatalog): optional MeetingCatalog object where the report is recorded.
+    """
+    if store is not None:
+        store.write(output_path.stem, "agenda_segments", df[["headline", "summary"]])
+        store.export_csv(output_path.stem, "agenda_segments", output_path)
+    else:
+        # written next to the report and renamed, so a crash never leaves half a CSV
+        tmp_path = output_path.with_suffix(".tmp")
+        df.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, output_path)
+
+    if catalog is not None:
+        catalog.record("reports", output_path)
+
+
+class ReportJournal:
+    """
+    Append-only JSONL journal of the finished rows of one meeting report, fsynced after every row so a crash or kill
+    loses at most the rows in flight. Replayed when the report is loaded again and folded into the report by compact().
+
+    Parameters:
+    - path (Path): Path object of JSONL journal file.
+    """
+    def __init__(self, path: Path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = None
+
+    @classmethod
+    def for_report(cls, output_path: Path):
+        """
+        Returns the journal of a report, e.g. reports/20250519_REG.journal.jsonl for reports/20250519_REG.csv.
+
+        Parameters:
+        - output_path (Path): Path object of CSV file where report (headlines and summaries) is saved.
+        """
+        return cls(output_path.with_suffix(".journal.jsonl"))
+
+    def replay(self, df):
+        """
+        Applies the journaled rows to a report and returns their number. A last line cut off by a crash is dropped
+        from the file, so rows appended later stay readable.
+
+        Parameters:
+        - df: DataFrame of report.
+        """
+        if not self.path.exists():
+            return 0
+
+        replayed, valid_bytes = 0, 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                df.at[entry["row"], "headline"] = entry["headline"]
+                df.at[entry["row"], "summary"] = entry["summary"]
+                replayed += 1
+                valid_bytes += len(line)
+
+        if valid_bytes < self.path.stat().st_size:
+            with open(self.path, "r+b") as f:
+                f.truncate(valid_bytes)
+        return replayed
+
+    def append(self, row: int, headline: str, summary: str):
+        """
+        Appends one finished row and forces it to disk.
+
+        Parameters:
+        - row (int): int object of row index in the report.
+        - headline (str): string object of headline.
+        - summary (str): string object of summary.
+        """
+        line = json.dumps({"row": int(row), "headline": headline, "summary": summary}, ensure_ascii=False) + "\n"
+        with self.lock:
+            if self.file is None:
+                self.file = open(self.path, "a", encoding="utf-8")
+            self.file.write(line)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def compact(self, df, output_path: Path, store: ArtifactStore = None, catalog: MeetingCatalog = None):
+        """
+        Saves the report with every journaled row and removes the journal.
+
+        Parameters:
+        - df: DataFrame of report with the journaled rows applied.
+        - output_path (Path): Path object of CSV file where report (headlines and summaries) is saved.
+        - store (ArtifactStore): optional ArtifactStore object holding the combined segments.
+        - catalog (MeetingCatalog): optional MeetingCatalog object where the report is recorded.
+        """
+        save_meeting_report(df, output_path, store, catalog)
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+            self.path.unlink(missing_ok=True)
+
+
+class TokenBucket:
+    """
+    Asyncio token bucket that paces requests and follows the API's rate-limit headers.
+
+    Parameters:
+    - requests_per_minute (int): int object of refill rate used until the API reports its own limits.
+    - capacity (int): int object of maximum burst size (defaults to requests_per_minute).
+    """
+    def __init__(self, requests_per_minute: int, capacity: int = None):
+        self.rate = requests_per_minute / 60
+        self.capacity = capacity or requests_per_minute
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """
+        Waits until a token is available (and any retry-after pause has passed), then takes it.
+        """
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """
+        Stops handing out tokens for the given number of seconds (e.g. from a 429 retry-after).
+
+        Parameters:
+        - seconds (float): float object of number of seconds to pause.
+        """
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+    def update_from_headers(self, headers):
+        """
+        Adjusts the bucket to the anthropic-ratelimit-requests-* response headers.
+
+        Parameters:
+        - headers: response headers of the last API call.
+        """
+        limit = headers.get("anthropic-ratelimit-requests-limit")
+        remaining = headers.get("anthropic-ratelimit-requests-remaining")
+        reset = headers.get("anthropic-ratelimit-requests-reset")
+
+        if limit:
+            self.capacity = int(limit)
+            self.rate = int(limit) / 60
+
+        if remaining is not None:
+            self._refill()
+            self.tokens = min(self.tokens, float(remaining))
+
+            # nothing left in this window, wait until the API says it resets
+            if int(remaining) == 0 and reset:
+                try:
+                    reset_at = datetime.fromisoformat(reset.replace("Z", "+00:00"))
+                    self.pause(max(0.0, reset_at.timestamp() - time.time()))
+                except ValueError:
+                    pass
+
+
+# retries of transient errors (5xx, 529 overloaded, connection errors, timeouts), same as the SDK's own default
+MAX_RETRIES = 2
+MAX_BACKOFF_SECONDS = 8
+
+
+def is_transient_error(e: Exception):
+    """
+    Checks whether an API error is worth retrying: 5xx including 529 overloaded, connection errors and timeouts.
 
-        for idx, row in df.iterrows():
-            combined_segment = row["combined_segment"]
+    Parameters:
+    - e (Exception): Exception object raised by the Claude API client.
+    """
+    if isinstance(e, anthropic.APIConnectionError):
+        return True
+    return isinstance(e, anthropic.APIStatusError) and e.status_code >= 500
+
+
+async def create_message_async(client, bucket: TokenBucket, semaphore: asyncio.Semaphore, cache: LLMCache, **kwargs):
+    """
+    Sends one messages request through the token bucket, retrying on 429 after the retry-after value and on transient
+    errors with exponential backoff, as the SDK would with its own retries. Cached responses are returned without a request.
 
-            # skip, no segment exists
-            if combined_segment == "NO_SEGMENT":
-                print(f"skipping row {idx}, no segment")
+    Parameters:
+    - client: async Claude API client.
+    - bucket (TokenBucket): TokenBucket object shared by all requests.
+    - semaphore (asyncio.Semaphore): Semaphore object bounding the number of in-flight requests.
+    - cache (LLMCache): LLMCache object of previous responses.
+    - kwargs: arguments passed to client.messages.create.
+    """
+    cached = cache.lookup(**kwargs)
+    if cached is not None:
+        return cached_response(*cached)
+
+    attempt = 0
+    while True:
+        await bucket.acquire()
+        async with semaphore:
+            try:
+                raw = await client.messages.with_raw_response.create(**kwargs)
+                error = None
+            except anthropic.RateLimitError as e:
+                retry_after = float(e.response.headers.get("retry-after", 1))
+                print(f"rate limited, retrying in {retry_after}s")
+                bucket.pause(retry_after)
                 continue
+            except anthropic.APIError as e:
+                if not is_transient_error(e) or attempt >= MAX_RETRIES:
+                    raise
+                error = e
+
+        # back off outside the semaphore, so other requests keep their slots
+        if error is not None:
+            attempt += 1
+            delay = min(MAX_BACKOFF_SECONDS, 0.5 * 2 ** attempt) * random.uniform(0.75, 1.0)
+            print(f"!!! {type(error).__name__}, retry {attempt}/{MAX_RETRIES} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            continue
+
+        bucket.update_from_headers(raw.headers)
+        response = raw.parse()
+        cache.usage.add(response.usage)
+        cache.store(response.content[0].text, response.stop_reason, **kwargs)
+        return response
+
+
+async def generate_headline_summary_async(combined_segment: str, headline_model: str, summary_model: str, bucket: TokenBucket, semaphore: asyncio.Semaphore, cache: LLMCache, client, stats: SingleCallStats = None):
+    """
+    Generates headline and then summary for one combined segment.
+
+    Parameters:
+    - combined_segment (str): string object containing combined segment.
+    - headline_model (str): string object of Claude model alias to generate headlines.
+    - summary_model (str): string object of Claude model alias to generate summaries.
+    - bucket (TokenBucket): TokenBucket object shared by all requests.
+    - semaphore (asyncio.Semaphore): Semaphore object bounding the number of in-flight requests.
+    - cache (LLMCache): LLMCache object of previous responses.
+    - client: async Claude API client.
+    - stats (SingleCallStats): optional SingleCallStats object, if given headline and summary are first requested in one call.
+    """
+    if stats is not None:
+        response = await create_message_async(
+            client, bucket, semaphore, cache,
+            model=summary_model,
+            max_tokens=4096,
+            temperature=0,
+            messages=[{"role": "user", "content": build_headline_summary_prompt(combined_segment)}]
+        )
+        result = validate_single_call(response.content[0].text, response.usage, stats)
+        if result is not None:
+            return result
+
+    response = await create_message_async(
+        client, bucket, semaphore, cache,
+        model=headline_model,
+        max_tokens=64,
+        temperature=0,
+        messages=[{"role": "user", "content": build_headline_prompt(combined_segment)}]
+    )
+    headline = response.content[0].text.strip()
+
+    # summary depends on the headline, so it is only sent once the headline is back
+    response = await create_message_async(
+        client, bucket, semaphore, cache,
+        model=summary_model,
+        max_tokens=4096,
+        temperature=0,
+        messages=[{"role": "user", "content": build_summary_prompt(headline, combined_segment)}]
+    )
+    return headline, response.content[0].text.strip()
+
+
+async def generate_headlines_summaries_async(input_agenda_segments_folder: Path, output_reports_folder: Path, start_day: datetime, end_day: datetime, headline_model: str, summary_model: str, max_concurrent_requests: int, requests_per_minute: int, client, cache: LLMCache, store: ArtifactStore = None, catalog: MeetingCatalog = None, stats: SingleCallStats = None):
+    """
+    Async version of generate_headlines_summaries. Rows are processed concurrently with a bounded number of in-flight requests.
+
+    Parameters:
+    - input_agenda_segments_folder (Path): Path object of folder containing combined segments.
+    - output_reports_folder (Path): Path object of folder where reports (headlines and summaries) are saved.
+    - start_day (datetime): datetime object of earliest day in timeframe.
+    - end_day (datetime): datetime object of latest day in timeframe.
+    - headline_model (str): string object of Claude model alias to generate headlines.
+    - summary_model (str): string object of Claude model alias to generate summaries.
+    - max_concurrent_requests (int): int object of maximum number of requests in flight at once.
+    - requests_per_minute (int): int object of starting request rate before rate-limit headers are seen.
+    - client: async Claude API client.
+    - cache (LLMCache): LLMCache object of previous responses.
+    - store (ArtifactStore): optional ArtifactStore object, combined segments are read and headlines saved there.
+    - catalog (MeetingCatalog): optional MeetingCatalog object, combined segments are looked up there and reports recorded.
+    - stats (SingleCallStats): optional SingleCallStats object, if given headline and summary are first requested in one call.
+    """
+    output_reports_folder.mkdir(parents=True, exist_ok=True)
+
+    bucket = TokenBucket(requests_per_minute)
+    semaphore = asyncio.Semaphore(max_concurrent_requests)
+    start_time = time.monotonic()
+    rows_done = 0
+
+    for input_path in meeting_paths(input_agenda_segments_folder, "*.csv", start_day, end_day, catalog, "combined_segments"):
+        print(f"processing: {input_path}")
+
+        output_path = output_reports_folder / input_path.name
 
-            # skip, already done
-            if row["headline"] != "NO_HEADLINE":
-                print(f"skipping row {idx}, already done")
+        journal = ReportJournal.for_report(output_path)
+        df = load_meeting_report(input_path, output_path, store, journal)
+
+        # skip rows with no segment or already done
+        pending = [
+            idx for idx, row in df.iterrows()
+            if row["combined_segment"] != "NO_SEGMENT" and row["headline"] == "NO_HEADLINE"
+        ]
+
+        # every row is journaled as soon as it is done, not when the whole meeting is
+        async def generate_row(idx):
+            headline, summary = await generate_headline_summary_async(df.at[idx, "combined_segment"], headline_model, summary_model, bucket, semaphore, cache, client, stats)
+            journal.append(idx, headline, summary)
+            return headline, summary
+
+        results = await asyncio.gather(*[generate_row(idx) for idx in pending], return_exceptions=True)
+
+        for idx, result in zip(pending, results):
+            if isinstance(result, Exception):
+                print(f"error processing row {idx}: {result}")
                 continue
 
-            print(f"processing row {idx}")
+            df.at[idx, "headline"], df.at[idx, "summary"] = result
+            rows_done += 1
 
-            try:
-                time.sleep(rate_limit_seconds)
-                # generate headline
-                headline = generate_headline_claude(combined_segment, headline_model, client)
+        journal.compact(df, output_path, store, catalog)
 
-                # generate summary
-                summary = generate_summary_claude(headline, combined_segment, summary_model, client)
+    elapsed_minutes = (time.monotonic() - start_time) / 60
+    if elapsed_minutes > 0:
+        print(f"throughput: {rows_done} rows in {elapsed_minutes:.2f} min ({rows_done / elapsed_minutes:.1f} rows/minute)")
+
+
+def generate_headlines_summaries_batch(input_agenda_segments_folder: Path, output_reports_folder: Path, start_day: datetime, end_day: datetime, headline_model: str, summary_model: str, poll_seconds: int, client, cache: LLMCache, store: ArtifactStore = None, catalog: MeetingCatalog = None, stats: SingleCallStats = None):
+    """
+    Batch version of generate_headlines_summaries. Every pending headline in the time frame is sent as one
+    Message Batch, then every pending summary as a second one. An interrupted run resumes the recorded batch ID.
+
+    Parameters:
+    - input_agenda_segments_folder (Path): Path object of folder containing combined segments.
+    - output_reports_folder (Path): Path object of folder where reports (headlines and summaries) are saved.
+    - start_day (datetime): datetime object of earliest day in timeframe.
+    - end_day (datetime): datetime object of latest day in timeframe.
+    - headline_model (str): string object of Claude model alias to generate headlines.
+    - summary_model (str): string object of Claude model alias to generate summaries.
+    - poll_seconds (int): int object of number of seconds to wait between batch status polls.
+    - client: Claude API client.
+    - cache (LLMCache): LLMCache object of previous responses.
+    - store (ArtifactStore): optional ArtifactStore object, combined segments are read and headlines saved there.
+    - catalog (MeetingCatalog): optional MeetingCatalog object, combined segments are looked up there and reports recorded.
+    - stats (SingleCallStats): optional SingleCallStats object, if given headline and summary are first requested in one call.
+    """
+    output_reports_folder.mkdir(parents=True, exist_ok=True)
+    state_path = output_reports_folder / f'{start_day.strftime("%Y%m%d")}_{end_day.strftime("%Y%m%d")}_batch.json'
 
-                df.at[idx, "headline"] = headline
-                df.at[idx, "summary"] = summary
+    # load every meeting in time frame
+    dfs = {}
+    for input_path in meeting_paths(input_agenda_segments_folder, "*.csv", start_day, end_day, catalog, "combined_segments"):
+        output_path = output_reports_folder / input_path.name
 
-            except Exception as e:
-                print(f"error processing row {idx}: {e}")
+        journal = ReportJournal.for_report(output_path)
+        df = load_meeting_report(input_path, output_path, store, journal)
+
+        # rows of an interrupted sync or async run, batch results are recovered from the batch itself
+        if journal.path.exists():
+            journal.compact(df, output_path, store, catalog)
+
+        dfs[input_path.stem] = df
+
+    state = load_batch_state(state_path)
+    phases = ["headline", "summary"]
+    if stats is not None or state.get("phase") == "single":
+        phases.insert(0, "single")
+    start_phase = phases.index(state["phase"]) if state else 0
+
+    # single call requests go first, rows rejected there are in the headline batch
+    # summaries depend on headlines, so headlines are a separate batch before them
+    for phase in phases[start_phase:]:
+        if state.get("phase") == phase:
+            batch_id = state["batch_id"]
+            print(f"resuming {phase} batch {batch_id}")
+        else:
+            requests = []
+            for stem, df in dfs.items():
+                for idx, row in df.iterrows():
+                    if row["combined_segment"] == "NO_SEGMENT":
+                        continue
+
+                    if phase == "single" and row["headline"] == "NO_HEADLINE":
+                        params = {
+                            "model": summary_model,
+                            "max_tokens": 4096,
+                            "temperature": 0,
+                            "messages": [{"role": "user", "content": build_headline_summary_prompt(row["combined_segment"])}],
+                        }
+                    elif phase == "headline" and row["headline"] == "NO_HEADLINE":
+                        params = {
+                            "model": headline_model,
+                            "max_tokens": 64,
+                            "temperature": 0,
+                            "messages": [{"role": "user", "content": build_headline_prompt(row["combined_segment"])}],
+                        }
+                    elif phase == "summary" and row["headline"] != "NO_HEADLINE" and row["summary"] == "NO_SUMMARY":
+                        params = {
+                            "model": summary_model,
+                            "max_tokens": 4096,
+                            "temperature": 0,
+                            "messages": [{"role": "user", "content": build_summary_prompt(row["headline"], row["combined_segment"])}],
+                        }
+                    else:
+                        continue
+
+                    # use cached response instead of sending it again
+                    cached = cache.lookup(**params)
+                    if cached is not None:
+                        save_batch_result(df, idx, phase, cached[0], stats)
+                        continue
+
+                    requests.append({"custom_id": f"{stem}-{idx}", "params": params})
+
+            if not requests:
+                print(f"no pending {phase} requests")
+                save_reports(dfs, output_reports_folder, store, catalog)
                 continue
 
-        df.to_csv(output_path, index=False)
+            batch_id = submit_batch(requests, client)
+            state = {"phase": phase, "batch_id": batch_id, "requests": {r["custom_id"]: r["params"] for r in requests}}
+            save_batch_state(state_path, state)
+
+        results = wait_for_batch(batch_id, poll_seconds, client, cache.usage)
+
+        # write results back into the reports
+        for custom_id, text in results.items():
+            stem, idx = custom_id.rsplit("-", 1)
+            save_batch_result(dfs[stem], int(idx), phase, text, stats)
+            cache.store(text, "end_turn", **state["requests"][custom_id])
+
+        save_reports(dfs, output_reports_folder, store, catalog)
+        state = {}
+
+    state_path.unlink(missing_ok=True)
+
+
+def save_batch_result(df, idx: int, phase: str, text: str, stats: SingleCallStats = None):
+    """
+    Writes the response of one batch request into a report. Single call responses that fail validation are
+    left out, so the row is sent again in the headline batch.
+
+    Parameters:
+    - df: DataFrame of report of one meeting.
+    - idx (int): int object of row index.
+    - phase (str): string object of batch phase, "single", "headline" or "summary".
+    - text (str): string object of response text.
+    - stats (SingleCallStats): optional SingleCallStats object single call outcomes are counted in.
+    """
+    if phase != "single":
+        df.at[idx, phase] = text.strip()
+        return
+
+    result = validate_single_call(text, None, stats)
+    if result is not None:
+        df.at[idx, "headline"], df.at[idx, "summary"] = result
+
+
+def save_reports(dfs, output_reports_folder: Path, store: ArtifactStore = None, catalog: MeetingCatalog = None):
+    """
+    Saves reports of each meeting to CSV.
+
+    Parameters:
+    - dfs: dictionary containing DataFrame of reports for each meeting file stem.
+    - output_reports_folder (Path): Path object of folder where reports (headlines and summaries) are saved.
+    - store (ArtifactStore): optional ArtifactStore object holding the combined segments.
+    - catalog (MeetingCatalog): optional MeetingCatalog object where the reports are recorded.
+    """
+    for stem, df in dfs.items():
+        save_meeting_report(df, output_reports_folder / f"{stem}.csv", store, catalog)
 
 
 if __name__ == "__main__":
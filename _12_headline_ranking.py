@@ -1,15 +1,25 @@
 import os
+import re
 import csv
 import time
 import json
 from pathlib import Path
 from datetime import datetime
 from itertools import combinations
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
 from dotenv import load_dotenv
 from trueskill import TrueSkill
 import anthropic
 import random
+import math
+import hashlib
+from llm_cache import LLMCache, CachedClient
+from llm_batch import load_batch_state, save_batch_state, submit_batch, wait_for_batch
+from meeting_catalog import MeetingCatalog, meeting_paths
+from judgment_ledger import JudgmentLedger
 
 def main():
     load_dotenv()
@@ -22,9 +32,23 @@ def main():
     END_DAY = datetime.strptime("20250523", "%Y%m%d")
     RANKING_MODEL = "claude-sonnet-4-20250514"
     RATE_LIMIT_SECONDS = 5
+    RANKING_MODE = "all_pairs"  # "all_pairs", "batch", or "adaptive" and "listwise" to stop once the top k is separated
+    TOP_K = 3
+    SEPARATION_Z = 1.0
+    GROUP_SIZE = 8  # headlines ordered per prompt in listwise mode
+    RATING_ENGINE = "trueskill"  # "trueskill" rates each comparison in turn, "bradley_terry" fits all outcomes at the end ("all_pairs" and "batch" modes)
+    MAX_WORKERS = 1  # comparisons sent concurrently in "all_pairs" mode with the "bradley_terry" engine
+    BATCH_POLL_SECONDS = 60
+    LLM_CACHE_PATH = Path("llm_cache.sqlite")
+    BYPASS_LLM_CACHE = False
+    CATALOG_PATH = Path("meeting_catalog.sqlite")
+    JUDGMENT_LEDGER_PATH = Path("judgment_ledger.sqlite")
     ###############################
 
-    claude_client = anthropic.Anthropic(api_key=CLAUDE_KEY)
+    cache = LLMCache(LLM_CACHE_PATH, bypass=BYPASS_LLM_CACHE)
+    claude_client = CachedClient(anthropic.Anthropic(api_key=CLAUDE_KEY), cache)
+    catalog = MeetingCatalog(CATALOG_PATH)
+    ledger = JudgmentLedger(JUDGMENT_LEDGER_PATH)
 
     rank_headlines(
         INPUT_REPORTS_FOLDER,
@@ -33,13 +57,29 @@ def main():
         END_DAY,
         RANKING_MODEL,
         RATE_LIMIT_SECONDS,
-        claude_client
+        claude_client,
+        RANKING_MODE,
+        TOP_K,
+        SEPARATION_Z,
+        BATCH_POLL_SECONDS,
+        catalog,
+        GROUP_SIZE,
+        RATING_ENGINE,
+        MAX_WORKERS,
+        ledger
     )
+    ledger.report()
+    cache.report()
 
 
 
-def make_comparison_prompt(headline1: str, headline2: str):
-    return f"""
+# share of a window's comparisons that may fail in the concurrent Bradley-Terry path before the window is given up.
+# A dropped pair only removes one outcome from the fit, TrueSkill stops at the first failure like before.
+MAX_FAILED_COMPARISONS = 0.05
+
+# same for every comparison, so it is sent first. Not marked for prompt caching: at about 250 tokens it is far
+# below the 1024-token minimum prefix the API caches, so a marker would be ignored.
+COMPARISON_INSTRUCTIONS = """
 You will be shown two headlines from city council meetings.
 
 ### Your Task
@@ -57,17 +97,31 @@ A headline is important if:
 - **Depth**: How significant or lasting is the impact?
 - **Equity**: Does it affect vulnerable or underserved communities?
 
+Your output should be a single line: either `Headline 1` or `Headline 2` — no explanation.
+"""
+
+
+def make_comparison_prompt(headline1: str, headline2: str):
+    return [
+        {"type": "text", "text": COMPARISON_INSTRUCTIONS},
+        {
+            "type": "text",
+            "text": f"""
 ---
 
 ### Compare the Headlines Below
 
 Headline 1: {headline1}
 Headline 2: {headline2}
+""",
+        },
+    ]
 
----
 
-Your output should be a single line: either `Headline 1` or `Headline 2` — no explanation.
-"""
+# judgments in the ledger are only replayed for the same prompt, so any edit to it starts a new version
+COMPARISON_PROMPT_VERSION = hashlib.sha256(
+    json.dumps(make_comparison_prompt("{headline1}", "{headline2}"), sort_keys=True).encode("utf-8")
+).hexdigest()[:12]
 
 
 def compare_headlines_claude(h1: str, h2: str, ranking_model: str, client):
@@ -90,7 +144,81 @@ def compare_headlines_claude(h1: str, h2: str, ranking_model: str, client):
     return response.content[0].text.strip()
 
 
-def collect_headlines_summaries(folder: Path, start_day: datetime, end_day: datetime):
+# same for every group, so it is sent first (also too short to cache)
+GROUP_INSTRUCTIONS = """
+You will be shown a numbered list of headlines from city council meetings.
+
+### Your Task
+Order all of the headlines from most important to least important, using the definition below.
+
+### What Does “Important” Mean?
+A headline is important if:
+- It reflects a major change to the status quo,
+- OR it has a large impact on a large number of people,
+- OR it has a large impact on a marginalized group (e.g., people facing poverty, discrimination, or limited access to resources),
+- OR it covers an issue that is especially newsworthy due to its civic relevance, urgency, or long-term consequences.
+
+### Consider These Factors
+- **Scope**: How many people in the city are affected?
+- **Depth**: How significant or lasting is the impact?
+- **Equity**: Does it affect vulnerable or underserved communities?
+
+Your output should be a single line listing every headline number exactly once, most important first, separated by commas (e.g. `3, 1, 2`) — no explanation.
+"""
+
+
+def make_group_prompt(group):
+    listing = "\n".join(f"Headline {i}: {headline}" for i, headline in enumerate(group, 1))
+    return [
+        {"type": "text", "text": GROUP_INSTRUCTIONS},
+        {
+            "type": "text",
+            "text": f"""
+---
+
+### Order the Headlines Below
+
+{listing}
+""",
+        },
+    ]
+
+
+def rank_group_claude(group, ranking_model: str, client):
+    """
+    Prompts Claude to order a group of headlines.
+
+    Parameters:
+    - group: list of headlines in the order they are shown.
+    - ranking_model (str): string object of Claude model alias to compare (rank) headlines.
+    - client: Claude API client.
+    """
+    prompt = make_group_prompt(group)
+    response = client.messages.create(
+        model=ranking_model,
+        max_tokens=64,
+        temperature=0,
+        messages=[{"role": "user", "content": prompt}],
+    )
+    return response.content[0].text.strip()
+
+
+def parse_group_ordering(text: str, n: int):
+    """
+    Returns the headline numbers of Claude's ordering of a group as 0-based positions in the group, most important first.
+    Raises ValueError unless every number from 1 to n appears exactly once.
+
+    Parameters:
+    - text (str): string object of Claude's answer, e.g. "3, 1, 2".
+    - n (int): int object of number of headlines in the group.
+    """
+    ordering = [int(number) - 1 for number in re.findall(r"\d+", text)]
+    if sorted(ordering) != list(range(n)):
+        raise ValueError(f"!!! unexpected LLM output: {text}")
+    return ordering
+
+
+def collect_headlines_summaries(folder: Path, start_day: datetime, end_day: datetime, catalog: MeetingCatalog = None):
     """
     Collects list of headline and parallel list of summaries in time frame.
 
@@ -98,16 +226,10 @@ def collect_headlines_summaries(folder: Path, start_day: datetime, end_day: date
     - folder (Path): Path object of folder containing reports (headlines and summaries).
     - start_day (datetime): datetime object of earliest day in timeframe.
     - end_day (datetime): datetime object of latest day in timeframe.
+    - catalog (MeetingCatalog): optional MeetingCatalog object where reports are looked up.
     """
     headlines, summaries = [], []
-    for reports_file in sorted(folder.rglob("*.csv")):
-        meeting_date = str(reports_file.name).split("_")[0]
-        meeting_datetime = datetime.strptime(meeting_date, "%Y%m%d")
-
-        # skip, out of time frame
-        if not (start_day <= meeting_datetime <= end_day):
-            continue
-
+    for reports_file in meeting_paths(folder, "*.csv", start_day, end_day, catalog, "reports"):
         reports_df = pd.read_csv(reports_file)
         for _, row in reports_df.iterrows():
             # skip, default values
@@ -180,9 +302,11 @@ def save_label_maps_as_json(output_folder: Path,
     print(f"\nlabel maps saved: {json_path}")
 
 
-def run_pairwise_comparisons(headlines, headlines_to_labels, ranking_model, rate_limit_seconds: int, client):
+def run_pairwise_comparisons(headlines, headlines_to_labels, ranking_model, rate_limit_seconds: int, client, rating_engine: str = "trueskill", max_workers: int = 1, ledger: JudgmentLedger = None):
     """
-    Prompts Claude to compare all pairwise comparisons of headlines to determine each headline's TrueSkill rating.
+    Prompts Claude to compare all pairwise comparisons of headlines to determine each headline's TrueSkill rating,
+    or with the Bradley-Terry engine sends the comparisons concurrently and fits all outcomes at the end,
+    leaving out failed comparisons unless more than MAX_FAILED_COMPARISONS of them fail (RuntimeError).
 
     Parameters:
     - headlines: list of headlines to rate.
@@ -190,39 +314,567 @@ def run_pairwise_comparisons(headlines, headlines_to_labels, ranking_model, rate
     - ranking_model (str): Claude model alias used to rank headlines.
     - rate_limit_seconds (int): number of seconds to wait between prompts.
     - client: Claude API client.
+    - rating_engine (str): "trueskill" to rate each comparison in turn, "bradley_terry" to fit all outcomes at the end.
+    - max_workers (int): int object of number of comparisons sent concurrently with the Bradley-Terry engine.
+    - ledger (JudgmentLedger): optional JudgmentLedger object, recorded pairs are replayed and only new pairs are compared.
     """
+    replayed = replay_judgments(headlines, ranking_model, ledger)
+    played = {frozenset(outcome) for outcome in replayed}
+    pairs = [pair for pair in combinations(headlines, 2) if frozenset(pair) not in played]
+
+    if rating_engine == "bradley_terry":
+        def compare(item):
+            i, (h1, h2) = item
+            time.sleep(rate_limit_seconds)
+
+            # randomly swap the order of h1 and h2 to reduce bias
+            if random.choice([True, False]):
+                h1, h2 = h2, h1
+            try:
+                winner = compare_headlines_claude(h1, h2, ranking_model, client)
+                outcome = comparison_outcome(h1, h2, winner, headlines_to_labels, f"{i}/{len(pairs)}")
+            except Exception as e:
+                print(f"!!! comparison fail: {headlines_to_labels[h1]} vs {headlines_to_labels[h2]} ({e})")
+                return None
+
+            if ledger is not None:
+                ledger.record(h1, h2, outcome[0], ranking_model, COMPARISON_PROMPT_VERSION)
+            return outcome
+
+        outcomes, failed = [], 0
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for outcome in pool.map(compare, enumerate(pairs, 1)):
+                if outcome is not None:
+                    outcomes.append(outcome)
+                    continue
+
+                failed += 1
+                if failed > MAX_FAILED_COMPARISONS * len(pairs):
+                    pool.shutdown(cancel_futures=True)
+                    raise RuntimeError(f"!!! {failed} of {len(pairs)} comparisons failed, more than {MAX_FAILED_COMPARISONS:.0%}")
+
+        if failed:
+            print(f"!!! {failed} of {len(pairs)} comparisons failed and were left out of the fit")
+        return rate_bradley_terry(headlines, replayed + outcomes)
+
     ts = TrueSkill(draw_probability=0)
     ratings = {h: ts.create_rating() for h in headlines}
-
-    pairs = list(combinations(headlines, 2))
+    apply_outcomes(replayed, ts, ratings)
 
     for i, (h1, h2) in enumerate(pairs, 1):
         time.sleep(rate_limit_seconds)
+        compare_and_rate(h1, h2, ts, ratings, headlines_to_labels, ranking_model, client, f"{i}/{len(pairs)}", ledger)
+
+    return ratings
+
+
+def compare_and_rate(h1: str, h2: str, ts, ratings, headlines_to_labels, ranking_model: str, client, progress: str, ledger: JudgmentLedger = None):
+    """
+    Prompts Claude to compare two headlines and updates both TrueSkill ratings in place.
+
+    Parameters:
+    - h1 (str): string object containing first headline.
+    - h2 (str): string object containing second headline.
+    - ts: TrueSkill environment.
+    - ratings: dictionary containing TrueSkill rating of each headline.
+    - headlines_to_labels: dictionary containing unique labels for each headline.
+    - ranking_model (str): Claude model alias used to rank headlines.
+    - client: Claude API client.
+    - progress (str): string object printed as progress counter.
+    - ledger (JudgmentLedger): optional JudgmentLedger object where the judgment is recorded.
+    """
+    # randomly swap the order of h1 and h2 to reduce bias
+    if random.choice([True, False]):
+        h1, h2 = h2, h1
+
+    winner = compare_headlines_claude(h1, h2, ranking_model, client)
+    winner_h, _ = apply_comparison(h1, h2, winner, ts, ratings, headlines_to_labels, progress)
+
+    if ledger is not None:
+        ledger.record(h1, h2, winner_h, ranking_model, COMPARISON_PROMPT_VERSION)
+
+
+def apply_comparison(h1: str, h2: str, winner: str, ts, ratings, headlines_to_labels, progress: str):
+    """
+    Updates both TrueSkill ratings in place from Claude's answer to a comparison and returns (winning headline, losing headline).
+
+    Parameters:
+    - h1 (str): string object containing headline shown first.
+    - h2 (str): string object containing headline shown second.
+    - winner (str): string object of Claude's answer ("Headline 1" or "Headline 2").
+    - ts: TrueSkill environment.
+    - ratings: dictionary containing TrueSkill rating of each headline.
+    - headlines_to_labels: dictionary containing unique labels for each headline.
+    - progress (str): string object printed as progress counter.
+    """
+    winner_h, loser_h = comparison_outcome(h1, h2, winner, headlines_to_labels, progress)
+    ratings[winner_h], ratings[loser_h] = ts.rate_1vs1(ratings[winner_h], ratings[loser_h])
+    return winner_h, loser_h
+
+
+def replay_judgments(headlines, ranking_model: str, ledger: JudgmentLedger = None):
+    """
+    Returns (winning headline, losing headline) of the judgments between the headlines recorded in the ledger
+    for the ranking model and current comparison prompt, oldest first. Empty without ledger.
 
-        # randomly swap the order of h1 and h2 to reduce bias
-        if random.choice([True, False]):
-            h1, h2 = h2, h1
+    Parameters:
+    - headlines: list of headlines to rate.
+    - ranking_model (str): Claude model alias used to rank headlines.
+    - ledger (JudgmentLedger): optional JudgmentLedger object.
+    """
+    if ledger is None:
+        return []
 
-        winner = compare_headlines_claude(h1, h2, ranking_model, client)
+    outcomes = ledger.replay(headlines, ranking_model, COMPARISON_PROMPT_VERSION)
+    print(f"replayed {len(outcomes)} judgments from ledger")
+    return outcomes
 
-        # adjust rating updates depending on whether we swapped
-        if winner == "Headline 1":
-            winner_h, loser_h = (h1, h2)
-        elif winner == "Headline 2":
-            winner_h, loser_h = (h2, h1)
-        else:
-            raise ValueError(f"!!! unexpected LLM output: {winner}")
 
+def apply_outcomes(outcomes, ts, ratings):
+    """
+    Updates TrueSkill ratings in place with known outcomes, in order.
+
+    Parameters:
+    - outcomes: list of (winning headline, losing headline).
+    - ts: TrueSkill environment.
+    - ratings: dictionary containing TrueSkill rating of each headline.
+    """
+    for winner_h, loser_h in outcomes:
         ratings[winner_h], ratings[loser_h] = ts.rate_1vs1(ratings[winner_h], ratings[loser_h])
 
-        print(
-            f"[{i}/{len(pairs)}] {headlines_to_labels[h1]} vs {headlines_to_labels[h2]} --- {headlines_to_labels[winner_h]}"
+
+def comparison_outcome(h1: str, h2: str, winner: str, headlines_to_labels, progress: str):
+    """
+    Returns (winning headline, losing headline) of Claude's answer to a comparison.
+
+    Parameters:
+    - h1 (str): string object containing headline shown first.
+    - h2 (str): string object containing headline shown second.
+    - winner (str): string object of Claude's answer ("Headline 1" or "Headline 2").
+    - headlines_to_labels: dictionary containing unique labels for each headline.
+    - progress (str): string object printed as progress counter.
+    """
+    # adjust rating updates depending on whether we swapped
+    if winner == "Headline 1":
+        winner_h, loser_h = (h1, h2)
+    elif winner == "Headline 2":
+        winner_h, loser_h = (h2, h1)
+    else:
+        raise ValueError(f"!!! unexpected LLM output: {winner}")
+
+    print(
+        f"[{progress}] {headlines_to_labels[h1]} vs {headlines_to_labels[h2]} --- {headlines_to_labels[winner_h]}"
+    )
+    return winner_h, loser_h
+
+
+# same attributes as a TrueSkill rating, so rankings are saved the same way. mu is a centered log-strength.
+BradleyTerryRating = namedtuple("BradleyTerryRating", ["mu", "sigma"])
+
+
+def fit_bradley_terry(n_items: int, winners, losers, prior: float = 1.0, max_iterations: int = 10000, tol: float = 1e-6):
+    """
+    Fits Bradley-Terry strengths to all outcomes at once with vectorized minorization-maximization iterations.
+    Outcomes are aggregated into win counts per item pair first, so repeated pairs cost nothing extra.
+    Every item also gets prior wins and losses against a virtual item of strength 1, which keeps items
+    without wins or losses finite. Returns (centered log-strengths, standard errors) as NumPy arrays.
+
+    Parameters:
+    - n_items (int): int object of number of items.
+    - winners: NumPy array of index of winning item of each outcome.
+    - losers: NumPy array of index of losing item of each outcome, parallel to winners.
+    - prior (float): float object of number of virtual wins and of virtual losses per item.
+    - max_iterations (int): int object of maximum number of iterations.
+    - tol (float): float object of largest change of a log-strength at which the fit stops.
+    """
+    winners = np.asarray(winners, dtype=np.int64)
+    losers = np.asarray(losers, dtype=np.int64)
+
+    # win matrix as sparse pair counts: games of each item pair (a < b) and wins of a
+    a, b = np.minimum(winners, losers), np.maximum(winners, losers)
+    pair_keys, pair_index = np.unique(a * n_items + b, return_inverse=True)
+    pair_a, pair_b = pair_keys // n_items, pair_keys % n_items
+    games = np.bincount(pair_index, minlength=len(pair_keys)).astype(float)
+
+    wins = np.bincount(winners, minlength=n_items) + prior
+    strengths = np.ones(n_items)
+
+    for _ in range(max_iterations):
+        # sum over opponents of games / (p_i + p_j), plus the prior games against the virtual item
+        per_pair = games / (strengths[pair_a] + strengths[pair_b])
+        denominator = (
+            np.bincount(pair_a, per_pair, minlength=n_items)
+            + np.bincount(pair_b, per_pair, minlength=n_items)
+            + 2 * prior / (strengths + 1)
         )
+        new_strengths = wins / denominator
+
+        # only the prior fixes the overall scale, which MM steps move slowly, so it gets its own Newton step
+        p = new_strengths / (new_strengths + 1)
+        new_strengths = new_strengths * np.exp(np.sum(1 - 2 * p) / np.sum(2 * p * (1 - p)))
+
+        change = np.max(np.abs(np.log(new_strengths) - np.log(strengths)))
+        strengths = new_strengths
+        if change < tol:
+            break
+
+    # standard errors of the log-strengths from the diagonal of the Fisher information
+    per_pair = games * strengths[pair_a] * strengths[pair_b] / (strengths[pair_a] + strengths[pair_b]) ** 2
+    information = (
+        np.bincount(pair_a, per_pair, minlength=n_items)
+        + np.bincount(pair_b, per_pair, minlength=n_items)
+        + 2 * prior * strengths / (strengths + 1) ** 2
+    )
+
+    scores = np.log(strengths)
+    return scores - scores.mean(), 1 / np.sqrt(information)
+
+
+def rate_bradley_terry(headlines, outcomes):
+    """
+    Fits Bradley-Terry ratings of headlines to all comparison outcomes. The result does not depend on the order of outcomes.
+
+    Parameters:
+    - headlines: list of headlines to rate.
+    - outcomes: list of (winning headline, losing headline) of each comparison.
+    """
+    index = {h: i for i, h in enumerate(headlines)}
+    winners = np.fromiter((index[w] for w, _ in outcomes), dtype=np.int64, count=len(outcomes))
+    losers = np.fromiter((index[l] for _, l in outcomes), dtype=np.int64, count=len(outcomes))
+
+    scores, sigmas = fit_bradley_terry(len(headlines), winners, losers)
+    return {h: BradleyTerryRating(float(scores[i]), float(sigmas[i])) for h, i in index.items()}
+
+
+def run_batch_comparisons(headlines, headlines_to_labels, labels_to_headlines, ranking_model: str, poll_seconds: int, state_path: Path, client, rating_engine: str = "trueskill", ledger: JudgmentLedger = None):
+    """
+    Sends all pairwise comparisons as one Message Batch and rates the results once it has ended.
+    The pairs (with their random order) are saved with the batch ID, so an interrupted run resumes the same batch.
+
+    Parameters:
+    - headlines: list of headlines to rate.
+    - headlines_to_labels: dictionary containing unique labels for each headline.
+    - labels_to_headlines: dictionary containing headline for each label.
+    - ranking_model (str): Claude model alias used to rank headlines.
+    - poll_seconds (int): int object of number of seconds to wait between batch status polls.
+    - state_path (Path): Path object of JSON file recording the batch ID and pairs.
+    - client: Claude API client.
+    - rating_engine (str): "trueskill" to rate the results in random order, "bradley_terry" to fit them all at once.
+    - ledger (JudgmentLedger): optional JudgmentLedger object, recorded pairs are replayed and only new pairs are sent.
+    """
+    ts = TrueSkill(draw_probability=0)
+    ratings = {h: ts.create_rating() for h in headlines}
+
+    outcomes = replay_judgments(headlines, ranking_model, ledger)
+    played = {frozenset(outcome) for outcome in outcomes}
+    if rating_engine != "bradley_terry":
+        apply_outcomes(outcomes, ts, ratings)
+
+    state = load_batch_state(state_path)
+    if state:
+        print(f"resuming comparison batch {state['batch_id']}")
+    else:
+        requests, pairs = [], {}
+        for i, (h1, h2) in enumerate(combinations(headlines, 2)):
+            # skip, judged in an earlier run
+            if frozenset((h1, h2)) in played:
+                continue
+
+            # randomly swap the order of h1 and h2 to reduce bias
+            if random.choice([True, False]):
+                h1, h2 = h2, h1
+
+            custom_id = f"pair-{i}"
+            pairs[custom_id] = [headlines_to_labels[h1], headlines_to_labels[h2]]
+            requests.append({
+                "custom_id": custom_id,
+                "params": {
+                    "model": ranking_model,
+                    "max_tokens": 64,
+                    "temperature": 0,
+                    "messages": [{"role": "user", "content": make_comparison_prompt(h1, h2)}],
+                },
+            })
+
+        if not requests:
+            return rate_bradley_terry(headlines, outcomes) if rating_engine == "bradley_terry" else ratings
+
+        batch_id = submit_batch(requests, client)
+        state = {"phase": "comparison", "batch_id": batch_id, "pairs": pairs}
+        save_batch_state(state_path, state)
+
+    usage = client.cache.usage if isinstance(client, CachedClient) else None
+    results = wait_for_batch(state["batch_id"], poll_seconds, client, usage)
+
+    # rate in random order, same as the synchronous comparisons
+    custom_ids = list(results)
+    random.shuffle(custom_ids)
+    for i, custom_id in enumerate(custom_ids, 1):
+        l1, l2 = state["pairs"][custom_id]
+        h1, h2 = labels_to_headlines[l1], labels_to_headlines[l2]
+        try:
+            if rating_engine == "bradley_terry":
+                outcome = comparison_outcome(h1, h2, results[custom_id], headlines_to_labels, f"{i}/{len(custom_ids)}")
+                outcomes.append(outcome)
+            else:
+                outcome = apply_comparison(h1, h2, results[custom_id], ts, ratings, headlines_to_labels, f"{i}/{len(custom_ids)}")
+        except ValueError as e:
+            print(e)
+            continue
+
+        if ledger is not None:
+            ledger.record(h1, h2, outcome[0], ranking_model, COMPARISON_PROMPT_VERSION)
+
+    if rating_engine == "bradley_terry":
+        ratings = rate_bradley_terry(headlines, outcomes)
+
+    state_path.unlink(missing_ok=True)
+    return ratings
+
+
+def top_k_separated(ratings, k: int, z: float):
+    """
+    Checks whether the top-k headlines (by mu) are separated from the rest, i.e. the lowest lower bound
+    in the top-k is above the highest upper bound outside it.
+
+    Parameters:
+    - ratings: dictionary containing TrueSkill rating of each headline.
+    - k (int): int object of number of top headlines that must be separated.
+    - z (float): float object of number of sigmas used for the bounds.
+    """
+    ranked = sorted(ratings.values(), key=lambda r: r.mu, reverse=True)
+    if k >= len(ranked):
+        return True
+
+    lowest_top = min(r.mu - z * r.sigma for r in ranked[:k])
+    highest_rest = max(r.mu + z * r.sigma for r in ranked[k:])
+    return lowest_top > highest_rest
+
+
+def next_boundary_pair(ratings, k: int, z: float, played):
+    """
+    Picks the most informative not-yet-played pair across the top-k boundary: the pair of a top-k headline
+    and an outside headline whose confidence intervals overlap the most.
+
+    Parameters:
+    - ratings: dictionary containing TrueSkill rating of each headline.
+    - k (int): int object of number of top headlines.
+    - z (float): float object of number of sigmas used for the bounds.
+    - played: set of frozensets of headline pairs already compared.
+    """
+    ranked = sorted(ratings, key=lambda h: ratings[h].mu, reverse=True)
+    top, rest = ranked[:k], ranked[k:]
+
+    # only outside headlines that could still belong in the top-k are worth comparing
+    lowest_top = min(ratings[h].mu - z * ratings[h].sigma for h in top)
+    contenders = [h for h in rest if ratings[h].mu + z * ratings[h].sigma > lowest_top]
+
+    best_pair, best_overlap = None, None
+    for a in top:
+        for b in contenders:
+            if frozenset((a, b)) in played:
+                continue
+
+            # how much the confidence intervals overlap
+            overlap = (ratings[b].mu + z * ratings[b].sigma) - (ratings[a].mu - z * ratings[a].sigma)
+            if best_overlap is None or overlap > best_overlap:
+                best_pair, best_overlap = (a, b), overlap
+
+    return best_pair
+
+
+def run_adaptive_comparisons(headlines, headlines_to_labels, ranking_model, rate_limit_seconds: int, client, k: int, z: float, ledger: JudgmentLedger = None):
+    """
+    Ranks headlines with Swiss rounds followed by uncertainty-driven comparisons across the top-k boundary.
+    Stops once the top-k is separated from the rest, or after about n*log2(n) comparisons.
+
+    Parameters:
+    - headlines: list of headlines to rate.
+    - headlines_to_labels: dictionary containing unique labels for each headline.
+    - ranking_model (str): Claude model alias used to rank headlines.
+    - rate_limit_seconds (int): number of seconds to wait between prompts.
+    - client: Claude API client.
+    - k (int): int object of number of top headlines needed (K in the final report).
+    - z (float): float object of number of sigmas used to decide separation.
+    - ledger (JudgmentLedger): optional JudgmentLedger object, recorded pairs are replayed first and never compared again.
+    """
+    ts = TrueSkill(draw_probability=0)
+    ratings = {h: ts.create_rating() for h in headlines}
+
+    n = len(headlines)
+    if n < 2:
+        return ratings
+
+    replayed = replay_judgments(headlines, ranking_model, ledger)
+    apply_outcomes(replayed, ts, ratings)
+
+    rounds = math.ceil(math.log2(n))
+    max_comparisons = math.ceil(n * math.log2(n))
+    # replayed judgments count toward the budget, so re-ranking a window only pays for what it still needs
+    played = {frozenset(outcome) for outcome in replayed}
+    count = len(played)
+
+    # Swiss rounds: pair neighbours by current mu, never rematching
+    order = list(headlines)
+    random.shuffle(order)
+    for round_num in range(1, rounds + 1):
+        order.sort(key=lambda h: ratings[h].mu, reverse=True)
+        unpaired = list(order)
+
+        while len(unpaired) >= 2:
+            h1 = unpaired.pop(0)
+            partner = next((h for h in unpaired if frozenset((h1, h)) not in played), None)
+
+            # bye, h1 already played every remaining headline (a rematch would count the same judgment twice)
+            if partner is None:
+                continue
+            unpaired.remove(partner)
+
+            time.sleep(rate_limit_seconds)
+            count += 1
+            played.add(frozenset((h1, partner)))
+            compare_and_rate(h1, partner, ts, ratings, headlines_to_labels, ranking_model, client, f"swiss {round_num}/{rounds}, {count}", ledger)
+
+    # refine the top-k boundary until it is separated
+    while count < max_comparisons and not top_k_separated(ratings, k, z):
+        pair = next_boundary_pair(ratings, k, z, played)
+        if pair is None:
+            break
+
+        time.sleep(rate_limit_seconds)
+        count += 1
+        played.add(frozenset(pair))
+        compare_and_rate(pair[0], pair[1], ts, ratings, headlines_to_labels, ranking_model, client, f"boundary {count}/{max_comparisons}", ledger)
+
+    status = "separated" if top_k_separated(ratings, k, z) else "not separated"
+    print(f"\n{count} comparisons for {n} headlines, top {k} {status}")
 
     return ratings
 
 
 
+def split_groups(order, group_size: int, offset: int = 0):
+    """
+    Splits headlines into consecutive groups of group_size, the first group only offset long if offset is given,
+    so alternating offsets move the group boundaries between rounds. A leftover single headline joins its neighbour.
+
+    Parameters:
+    - order: list of headlines.
+    - group_size (int): int object of number of headlines per group.
+    - offset (int): int object of length of the first group, 0 for a full group.
+    """
+    cuts = [0] + list(range(offset or group_size, len(order), group_size)) + [len(order)]
+    groups = [order[a:b] for a, b in zip(cuts, cuts[1:]) if b > a]
+
+    if len(groups) > 1 and len(groups[0]) < 2:
+        first = groups.pop(0)
+        groups[0] = first + groups[0]
+    if len(groups) > 1 and len(groups[-1]) < 2:
+        last = groups.pop()
+        groups[-1] = groups[-1] + last
+    return [group for group in groups if len(group) >= 2]
+
+
+def rank_group_and_rate(group, ts, ratings, headlines_to_labels, ranking_model: str, client, progress: str):
+    """
+    Prompts Claude to order a group of headlines and updates their TrueSkill ratings in place with one multi-team
+    update, every headline being its own team ranked by its position in the ordering.
+
+    Parameters:
+    - group: list of headlines.
+    - ts: TrueSkill environment.
+    - ratings: dictionary containing TrueSkill rating of each headline.
+    - headlines_to_labels: dictionary containing unique labels for each headline.
+    - ranking_model (str): Claude model alias used to rank headlines.
+    - client: Claude API client.
+    - progress (str): string object printed as progress counter.
+    """
+    # randomly shuffle the order the headlines are shown in to reduce position bias
+    group = random.sample(group, len(group))
+
+    ordering = parse_group_ordering(rank_group_claude(group, ranking_model, client), len(group))
+    ranks = [0] * len(group)
+    for rank, position in enumerate(ordering):
+        ranks[position] = rank
+
+    new_ratings = ts.rate([(ratings[h],) for h in group], ranks=ranks)
+    for h, (rating,) in zip(group, new_ratings):
+        ratings[h] = rating
+
+    print(f"[{progress}] " + " > ".join(headlines_to_labels[group[position]] for position in ordering))
+
+
+def run_listwise_comparisons(headlines, headlines_to_labels, ranking_model, rate_limit_seconds: int, client, k: int, z: float, group_size: int = 8):
+    """
+    Ranks headlines by having Claude order groups of headlines. Runs Swiss rounds that group neighbours by mu,
+    with group boundaries moving every round, then groups the headlines around the top-k boundary.
+    Stops once the top-k is separated from the rest, or after about n*log2(n)/(group_size-1) groups.
+
+    Parameters:
+    - headlines: list of headlines to rate.
+    - headlines_to_labels: dictionary containing unique labels for each headline.
+    - ranking_model (str): Claude model alias used to rank headlines.
+    - rate_limit_seconds (int): number of seconds to wait between prompts.
+    - client: Claude API client.
+    - k (int): int object of number of top headlines needed (K in the final report).
+    - z (float): float object of number of sigmas used to decide separation.
+    - group_size (int): int object of number of headlines ordered per prompt.
+    """
+    ts = TrueSkill(draw_probability=0)
+    ratings = {h: ts.create_rating() for h in headlines}
+
+    n = len(headlines)
+    if n < 2:
+        return ratings
+
+    # a group of g headlines orders g-1 neighbouring pairs, so rounds and budget shrink accordingly
+    rounds = max(1, math.ceil(math.log2(n) / math.log2(group_size)))
+    max_groups = math.ceil(n * math.log2(n) / (group_size - 1))
+    count = 0
+
+    def rate(group, progress):
+        nonlocal count
+        time.sleep(rate_limit_seconds)
+        count += 1
+        try:
+            rank_group_and_rate(group, ts, ratings, headlines_to_labels, ranking_model, client, progress)
+        except ValueError as e:
+            print(e)
+
+    # Swiss rounds: group neighbours by current mu, shifting the group boundaries by half a group every other round
+    order = list(headlines)
+    random.shuffle(order)
+    for round_num in range(1, rounds + 1):
+        if round_num > 1:
+            order.sort(key=lambda h: ratings[h].mu, reverse=True)
+        offset = group_size // 2 if round_num % 2 == 0 else 0
+
+        for group in split_groups(order, group_size, offset):
+            rate(group, f"swiss {round_num}/{rounds}, {count + 1}")
+
+    # refine the top-k boundary until it is separated
+    while count < max_groups and not top_k_separated(ratings, k, z):
+        ranked = sorted(ratings, key=lambda h: ratings[h].mu, reverse=True)
+        lowest_top = min(ratings[h].mu - z * ratings[h].sigma for h in ranked[:k])
+        contenders = [h for h in ranked[k:] if ratings[h].mu + z * ratings[h].sigma > lowest_top]
+
+        # mix the top-k with the contenders, filling a single group up with the next headlines by mu
+        boundary = ranked[:k] + contenders
+        if len(boundary) < group_size:
+            boundary = ranked[:min(n, group_size)]
+        random.shuffle(boundary)
+
+        for group in split_groups(boundary, group_size):
+            if count >= max_groups:
+                break
+            rate(group, f"boundary {count + 1}/{max_groups}")
+
+    status = "separated" if top_k_separated(ratings, k, z) else "not separated"
+    print(f"\n{count} groups for {n} headlines, top {k} {status}")
+
+    return ratings
+
+
 def save_rankings(output_folder: Path, ratings, headlines_to_labels, start_day: datetime, end_day: datetime):
     """
     Calcualtes rankings from ratings of headlines based on pariwise comparisons and saves them to CSV file.
@@ -269,7 +921,7 @@ def save_rankings(output_folder: Path, ratings, headlines_to_labels, start_day:
 
 
 
-def rank_headlines(input_reports_folder: Path, output_rankings_folder: Path, start_day: datetime, end_day: datetime, ranking_model: str, rate_limit_seconds: int, claude_client):
+def rank_headlines(input_reports_folder: Path, output_rankings_folder: Path, start_day: datetime, end_day: datetime, ranking_model: str, rate_limit_seconds: int, claude_client, ranking_mode: str = "all_pairs", top_k: int = 3, separation_z: float = 1.0, batch_poll_seconds: int = 60, catalog: MeetingCatalog = None, group_size: int = 8, rating_engine: str = "trueskill", max_workers: int = 1, ledger: JudgmentLedger = None):
     """
     Ranks headlines using pairwise comparisons and TrueSkill comparison model.
 
@@ -281,10 +933,19 @@ def rank_headlines(input_reports_folder: Path, output_rankings_folder: Path, sta
     - ranking_model (str): string object of Claude model alias to rank headlines.
     - rate_limit_seconds (int): int object of number of seconds for Claude to sleep between prompts.
     - client: Claude API client.
+    - ranking_mode (str): "all_pairs" to compare every pair, "adaptive" to only refine the top-k, "listwise" to order groups of headlines, "batch" to send every pair as one Message Batch.
+    - top_k (int): int object of number of top headlines the adaptive mode must separate.
+    - separation_z (float): float object of number of sigmas the adaptive mode uses to decide separation.
+    - batch_poll_seconds (int): int object of number of seconds between batch status polls in batch mode.
+    - catalog (MeetingCatalog): optional MeetingCatalog object where reports are looked up.
+    - group_size (int): int object of number of headlines ordered per prompt in listwise mode.
+    - rating_engine (str): "trueskill" or "bradley_terry" in all_pairs and batch modes, adaptive and listwise modes always use TrueSkill.
+    - max_workers (int): int object of number of comparisons sent concurrently in all_pairs mode with the Bradley-Terry engine.
+    - ledger (JudgmentLedger): optional JudgmentLedger object, pairwise judgments of earlier runs are replayed and new ones recorded.
     """
     
     headlines, summaries = collect_headlines_summaries(
-        input_reports_folder, start_day, end_day
+        input_reports_folder, start_day, end_day, catalog
     )
 
     # map labels (H1, H2, …)
@@ -307,9 +968,23 @@ def rank_headlines(input_reports_folder: Path, output_rankings_folder: Path, sta
     )
 
     # run pairwise comparisons
-    ratings = run_pairwise_comparisons(
-        headlines, headlines_to_labels, ranking_model, rate_limit_seconds, claude_client
-    )
+    if ranking_mode == "adaptive":
+        ratings = run_adaptive_comparisons(
+            headlines, headlines_to_labels, ranking_model, rate_limit_seconds, claude_client, top_k, separation_z, ledger
+        )
+    elif ranking_mode == "listwise":
+        ratings = run_listwise_comparisons(
+            headlines, headlines_to_labels, ranking_model, rate_limit_seconds, claude_client, top_k, separation_z, group_size
+        )
+    elif ranking_mode == "batch":
+        state_path = output_rankings_folder / f'{start_day.strftime("%Y%m%d")}_{end_day.strftime("%Y%m%d")}_batch.json'
+        ratings = run_batch_comparisons(
+            headlines, headlines_to_labels, labels_to_headlines, ranking_model, batch_poll_seconds, state_path, claude_client, rating_engine, ledger
+        )
+    else:
+        ratings = run_pairwise_comparisons(
+            headlines, headlines_to_labels, ranking_model, rate_limit_seconds, claude_client, rating_engine, max_workers, ledger
+        )
 
     # save results
     save_rankings(
@@ -0,0 +1,205 @@
+import os
+import json
+import zlib
+import sqlite3
+import threading
+import pandas as pd
+from pathlib import Path
+
+
+# fastest zlib level, the long text cells are highly repetitive and compress well regardless
+COMPRESS_LEVEL = 1
+
+
+def main():
+    ######## CONFIGURATION ########
+    ARTIFACT_STORE_PATH = Path("artifacts.sqlite")
+    CSV_FOLDERS = {
+        "agenda_segments": Path("agenda_segments"),
+        "legislations": Path("legislations"),
+        "transcript_segments": Path("transcript_segments"),
+    }
+    ###############################
+
+    # one-time import of the CSV folders written by earlier runs
+    store = ArtifactStore(ARTIFACT_STORE_PATH)
+    for table, folder in CSV_FOLDERS.items():
+        import_csv_folder(store, folder, table)
+
+
+class ArtifactStore:
+    """
+    Per-meeting columnar store of stage outputs in SQLite. Every column of a meeting's table is one compressed
+    row, so a stage adding columns does not rewrite the others and readers only load the columns they ask for.
+
+    Parameters:
+    - db_path (Path): Path object of SQLite file where artifacts are stored.
+    """
+    def __init__(self, db_path: Path):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS columns (
+                meeting TEXT,
+                tbl TEXT,
+                name TEXT,
+                position INTEGER,
+                data BLOB,
+                PRIMARY KEY (meeting, tbl, name)
+            )
+            """
+        )
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sources (
+                meeting TEXT,
+                tbl TEXT,
+                mtime_ns INTEGER,
+                size INTEGER,
+                PRIMARY KEY (meeting, tbl)
+            )
+            """
+        )
+        self.conn.commit()
+
+    def columns(self, meeting: str, table: str):
+        """
+        Returns the column names of a meeting's table in order.
+
+        Parameters:
+        - meeting (str): string object of meeting file stem, e.g. 20250519_REG.
+        - table (str): string object of table name, e.g. agenda_segments.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT name FROM columns WHERE meeting = ? AND tbl = ? ORDER BY position", (meeting, table)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def read(self, meeting: str, table: str, columns=None):
+        """
+        Loads columns of a meeting's table as a DataFrame.
+
+        Parameters:
+        - meeting (str): string object of meeting file stem.
+        - table (str): string object of table name.
+        - columns: optional list of column names, None for all columns.
+        """
+        columns = columns or self.columns(meeting, table)
+        data = {}
+        with self.lock:
+            for name in columns:
+                row = self.conn.execute(
+                    "SELECT data FROM columns WHERE meeting = ? AND tbl = ? AND name = ?", (meeting, table, name)
+                ).fetchone()
+                if row is None:
+                    raise KeyError(f"!!! no column {name} in {table} of {meeting}")
+                data[name] = json.loads(zlib.decompress(row[0]))
+        return pd.DataFrame(data)
+
+    def write(self, meeting: str, table: str, df):
+        """
+        Saves the columns of a DataFrame to a meeting's table, replacing columns of the same name only.
+
+        Parameters:
+        - meeting (str): string object of meeting file stem.
+        - table (str): string object of table name.
+        - df: DataFrame of columns to save.
+        """
+        with self.lock:
+            for name in df.columns:
+                values = df[name].astype(object).where(df[name].notna(), None).tolist()
+                data = zlib.compress(json.dumps(values).encode("utf-8"), COMPRESS_LEVEL)
+
+                row = self.conn.execute(
+                    "SELECT position FROM columns WHERE meeting = ? AND tbl = ? AND name = ?", (meeting, table, name)
+                ).fetchone()
+                if row is None:
+                    row = self.conn.execute(
+                        "SELECT COALESCE(MAX(position) + 1, 0) FROM columns WHERE meeting = ? AND tbl = ?", (meeting, table)
+                    ).fetchone()
+
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO columns (meeting, tbl, name, position, data) VALUES (?, ?, ?, ?, ?)",
+                    (meeting, table, name, row[0], data),
+                )
+            self.conn.commit()
+
+    def import_csv(self, meeting: str, table: str, csv_path: Path, dtype=None):
+        """
+        Imports the columns of a CSV file into a meeting's table, replacing only the columns the CSV has.
+        Columns later stages wrote to the store only (e.g. combined_segment, headline) are kept while the number
+        of rows still matches, and dropped otherwise since their rows no longer line up.
+
+        Parameters:
+        - meeting (str): string object of meeting file stem.
+        - table (str): string object of table name.
+        - csv_path (Path): Path object of CSV file.
+        - dtype: optional dictionary of column types passed to pd.read_csv.
+        """
+        df = pd.read_csv(csv_path, dtype=dtype)
+        stat = os.stat(csv_path)
+
+        store_only = [name for name in self.columns(meeting, table) if name not in df.columns]
+        if store_only and len(self.read(meeting, table, store_only[:1])) != len(df):
+            print(f"!!! {csv_path} now has {len(df)} rows, dropping {', '.join(store_only)} of {meeting}")
+            with self.lock:
+                self.conn.executemany(
+                    "DELETE FROM columns WHERE meeting = ? AND tbl = ? AND name = ?", [(meeting, table, name) for name in store_only]
+                )
+
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sources (meeting, tbl, mtime_ns, size) VALUES (?, ?, ?, ?)",
+                (meeting, table, stat.st_mtime_ns, stat.st_size),
+            )
+        self.write(meeting, table, df)
+
+    def sync_csv(self, meeting: str, table: str, csv_path: Path, dtype=None):
+        """
+        Imports a CSV file written by an earlier stage if it was not imported yet or changed since.
+
+        Parameters:
+        - meeting (str): string object of meeting file stem.
+        - table (str): string object of table name.
+        - csv_path (Path): Path object of CSV file.
+        - dtype: optional dictionary of column types passed to pd.read_csv.
+        """
+        stat = os.stat(csv_path)
+        with self.lock:
+            row = self.conn.execute("SELECT mtime_ns, size FROM sources WHERE meeting = ? AND tbl = ?", (meeting, table)).fetchone()
+        if row != (stat.st_mtime_ns, stat.st_size):
+            self.import_csv(meeting, table, csv_path, dtype)
+
+    def export_csv(self, meeting: str, table: str, csv_path: Path, columns=None):
+        """
+        Saves columns of a meeting's table to a CSV file, for scripts that read CSV.
+
+        Parameters:
+        - meeting (str): string object of meeting file stem.
+        - table (str): string object of table name.
+        - csv_path (Path): Path object of destination CSV file.
+        - columns: optional list of column names, None for all columns.
+        """
+        csv_path.parent.mkdir(parents=True, exist_ok=True)
+        self.read(meeting, table, columns).to_csv(csv_path, index=False)
+
+
+def import_csv_folder(store: ArtifactStore, folder: Path, table: str):
+    """
+    Imports every CSV file of a folder into the store, one meeting per file.
+
+    Parameters:
+    - store (ArtifactStore): ArtifactStore object to import into.
+    - folder (Path): Path object of folder containing CSV files named by meeting.
+    - table (str): string object of table name.
+    """
+    dtype = {"item": str} if table == "legislations" else None
+    for csv_path in sorted(folder.glob("*.csv")):
+        print(f"importing: {csv_path}")
+        store.import_csv(csv_path.stem, table, csv_path, dtype)
+
+
+if __name__ == "__main__":
+    main()
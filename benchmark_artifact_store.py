@@ -0,0 +1,113 @@
+import os
+import time
+import tempfile
+import pandas as pd
+from pathlib import Path
+
+from artifact_store import ArtifactStore
+
+
+def main():
+    ######## CONFIGURATION ########
+    INPUT_AGENDA_SEGMENTS_FOLDER = Path("agenda_segments")
+    REPEATS = 3
+    ###############################
+
+    meetings = {csv_path.stem: pd.read_csv(csv_path) for csv_path in sorted(INPUT_AGENDA_SEGMENTS_FOLDER.glob("*.csv"))}
+    benchmark_artifact_store(meetings, REPEATS)
+
+
+def stage_columns(df):
+    """
+    Returns the columns each stage reads and adds, as (read columns, added columns DataFrame) per stage,
+    using a finished meeting's values: _06 adds legislation, _10 transcript and combined segment, _11 headline and summary.
+
+    Parameters:
+    - df: DataFrame of finished agenda segments of one meeting.
+    """
+    reports = pd.DataFrame({
+        "headline": df["agenda_segment"].str[:80],
+        "summary": df["combined_segment"].str[:1500],
+    })
+    return [
+        (["agenda_segment"], df[["matched_legislation"]]),
+        (["agenda_segment", "matched_legislation"], df[["matched_transcript", "combined_segment"]]),
+        (["combined_segment"], reports),
+    ]
+
+
+def run_csv_flow(meetings, folder: Path):
+    """
+    Every stage reads the whole CSV file and rewrites it with its columns added. Returns seconds.
+
+    Parameters:
+    - meetings: dictionary containing DataFrame of finished agenda segments for each meeting file stem.
+    - folder (Path): Path object of empty folder for CSV files.
+    """
+    for stem, df in meetings.items():
+        df[["agenda_segment"]].to_csv(folder / f"{stem}.csv", index=False)
+
+    start = time.perf_counter()
+    for stem, df in meetings.items():
+        csv_path = folder / f"{stem}.csv"
+        for read_columns, added in stage_columns(df):
+            stage_df = pd.read_csv(csv_path)
+            stage_df[read_columns]
+            for name in added.columns:
+                stage_df[name] = added[name].values
+            stage_df.to_csv(csv_path, index=False)
+    return time.perf_counter() - start
+
+
+def run_store_flow(meetings, db_path: Path):
+    """
+    Every stage reads only its columns from the artifact store and writes only the columns it adds. Returns seconds.
+
+    Parameters:
+    - meetings: dictionary containing DataFrame of finished agenda segments for each meeting file stem.
+    - db_path (Path): Path object of new SQLite file.
+    """
+    store = ArtifactStore(db_path)
+    for stem, df in meetings.items():
+        store.write(stem, "agenda_segments", df[["agenda_segment"]])
+
+    start = time.perf_counter()
+    for stem, df in meetings.items():
+        for read_columns, added in stage_columns(df):
+            store.read(stem, "agenda_segments", read_columns)
+            store.write(stem, "agenda_segments", added)
+    seconds = time.perf_counter() - start
+
+    store.conn.execute("VACUUM")
+    store.conn.close()
+    return seconds
+
+
+def benchmark_artifact_store(meetings, repeats: int):
+    """
+    Compares time of the _06, _10 and _11 read/write pattern and final disk size of CSV files against the artifact store.
+
+    Parameters:
+    - meetings: dictionary containing DataFrame of finished agenda segments for each meeting file stem.
+    - repeats (int): int object of number of runs, the fastest is reported.
+    """
+    print(f"{len(meetings)} meetings, {sum(len(df) for df in meetings.values())} agenda segments")
+
+    csv_seconds, store_seconds = [], []
+    for _ in range(repeats):
+        with tempfile.TemporaryDirectory() as folder:
+            csv_seconds.append(run_csv_flow(meetings, Path(folder)))
+            csv_bytes = sum(os.path.getsize(p) for p in Path(folder).glob("*.csv"))
+
+        with tempfile.TemporaryDirectory() as folder:
+            db_path = Path(folder) / "artifacts.sqlite"
+            store_seconds.append(run_store_flow(meetings, db_path))
+            store_bytes = os.path.getsize(db_path)
+
+    print(f"csv: {min(csv_seconds):.2f}s, {csv_bytes / 1e6:.1f} MB")
+    print(f"artifact store: {min(store_seconds):.2f}s, {store_bytes / 1e6:.1f} MB")
+    print(f"speedup: {min(csv_seconds) / min(store_seconds):.1f}x, size: {store_bytes / csv_bytes:.0%} of csv")
+
+
+if __name__ == "__main__":
+    main()
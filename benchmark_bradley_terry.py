@@ -0,0 +1,103 @@
+import time
+import numpy as np
+from trueskill import TrueSkill
+
+from _12_headline_ranking import fit_bradley_terry
+
+
+def main():
+    ######## CONFIGURATION ########
+    N_ITEMS = 5000
+    N_OUTCOMES = 1_000_000
+    N_TRUESKILL_OUTCOMES = 100_000  # sequential TrueSkill is timed on a prefix and extrapolated
+    TOP_K = 10
+    ###############################
+
+    benchmark_bradley_terry(N_ITEMS, N_OUTCOMES, N_TRUESKILL_OUTCOMES, TOP_K)
+
+
+def synthetic_outcomes(n_items: int, n_outcomes: int, seed: int = 0):
+    """
+    Draws random item pairs and decides each one with Bradley-Terry probabilities of hidden log-strengths.
+    Returns (log-strengths, winners, losers) as NumPy arrays.
+
+    Parameters:
+    - n_items (int): int object of number of items.
+    - n_outcomes (int): int object of number of outcomes.
+    - seed (int): int object of random seed.
+    """
+    rng = np.random.default_rng(seed)
+    true_scores = rng.normal(0, 1, n_items)
+
+    a = rng.integers(0, n_items, n_outcomes)
+    b = (a + rng.integers(1, n_items, n_outcomes)) % n_items
+    a_wins = rng.random(n_outcomes) < 1 / (1 + np.exp(true_scores[b] - true_scores[a]))
+
+    winners = np.where(a_wins, a, b)
+    losers = np.where(a_wins, b, a)
+    return true_scores, winners, losers
+
+
+def spearman(x, y):
+    return np.corrcoef(np.argsort(np.argsort(x)), np.argsort(np.argsort(y)))[0, 1]
+
+
+def rate_trueskill(n_items: int, winners, losers):
+    """
+    Previous engine: one TrueSkill update per outcome, in the given order. Returns mu of every item.
+
+    Parameters:
+    - n_items (int): int object of number of items.
+    - winners: NumPy array of index of winning item of each outcome.
+    - losers: NumPy array of index of losing item of each outcome.
+    """
+    ts = TrueSkill(draw_probability=0)
+    ratings = [ts.create_rating() for _ in range(n_items)]
+    for w, l in zip(winners.tolist(), losers.tolist()):
+        ratings[w], ratings[l] = ts.rate_1vs1(ratings[w], ratings[l])
+    return np.array([r.mu for r in ratings])
+
+
+def benchmark_bradley_terry(n_items: int, n_outcomes: int, n_trueskill_outcomes: int, top_k: int):
+    """
+    Fits Bradley-Terry scores to synthetic outcomes and prints fit time, rank correlation with the hidden strengths,
+    95% interval coverage and order dependence, next to sequential TrueSkill on the same outcomes.
+
+    Parameters:
+    - n_items (int): int object of number of items.
+    - n_outcomes (int): int object of number of outcomes.
+    - n_trueskill_outcomes (int): int object of number of outcomes rated with TrueSkill, timed and extrapolated to all outcomes.
+    - top_k (int): int object of number of top items compared between outcome orders.
+    """
+    true_scores, winners, losers = synthetic_outcomes(n_items, n_outcomes)
+    print(f"{n_items} items, {n_outcomes} outcomes")
+
+    start = time.perf_counter()
+    scores, sigmas = fit_bradley_terry(n_items, winners, losers)
+    seconds = time.perf_counter() - start
+
+    centered = true_scores - true_scores.mean()
+    coverage = np.mean(np.abs(scores - centered) <= 1.96 * sigmas)
+    print(f"bradley-terry: {seconds:.2f}s, spearman {spearman(scores, true_scores):.4f}, 95% interval coverage {coverage:.1%}")
+
+    # same outcomes in another order give the same fit
+    order = np.random.default_rng(1).permutation(n_outcomes)
+    shuffled_scores, _ = fit_bradley_terry(n_items, winners[order], losers[order])
+    print(f"bradley-terry, outcomes reordered: largest score change {np.max(np.abs(shuffled_scores - scores)):.1e}")
+
+    start = time.perf_counter()
+    mu = rate_trueskill(n_items, winners[:n_trueskill_outcomes], losers[:n_trueskill_outcomes])
+    seconds = time.perf_counter() - start
+    shuffled_mu = rate_trueskill(n_items, winners[:n_trueskill_outcomes][::-1], losers[:n_trueskill_outcomes][::-1])
+
+    bt_scores, _ = fit_bradley_terry(n_items, winners[:n_trueskill_outcomes], losers[:n_trueskill_outcomes])
+    top_same = len(set(np.argsort(-mu)[:top_k]) & set(np.argsort(-shuffled_mu)[:top_k]))
+    print(
+        f"trueskill on first {n_trueskill_outcomes}: {seconds:.2f}s (~{seconds * n_outcomes / n_trueskill_outcomes:.0f}s for all), "
+        f"spearman {spearman(mu, true_scores):.4f} (bradley-terry {spearman(bt_scores, true_scores):.4f}), "
+        f"top {top_k} shared after reversing the order {top_same}/{top_k}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import time
+import random
+import pandas as pd
+
+from _06_legislation_matching import match_legislation
+
+
+def main():
+    ######## CONFIGURATION ########
+    N_ITEMS = 2000
+    N_SEGMENTS = 2000
+    ITEMS_PER_SEGMENT = 3
+    ###############################
+
+    aseg_df, leg_df = synthetic_meeting(N_ITEMS, N_SEGMENTS, ITEMS_PER_SEGMENT)
+    benchmark_legislation_matching(aseg_df, leg_df)
+
+
+def synthetic_meeting(n_items: int, n_segments: int, items_per_segment: int, seed: int = 0):
+    """
+    Builds agenda segments and legislations shaped like a real meeting: Legistar style item numbers,
+    each segment mentioning a few of them in multi-kilobyte text.
+
+    Parameters:
+    - n_items (int): int object of number of legislations.
+    - n_segments (int): int object of number of agenda segments.
+    - items_per_segment (int): int object of number of item numbers mentioned per segment.
+    - seed (int): int object of random seed.
+    """
+    rng = random.Random(seed)
+    items = [f"2025-{i:04d}" for i in rng.sample(range(10000), n_items)]
+    filler = "Resolution authorizing the Mayor and the Director of the Department of Finance to enter into an agreement. "
+
+    segments = []
+    for i in range(n_segments):
+        mentioned = rng.sample(items, items_per_segment)
+        segments.append(f"Agenda Item {i + 1}\n" + filler * 20 + " ".join(f"Bill No. {item}" for item in mentioned))
+
+    leg_df = pd.DataFrame({"item": items, "link": "", "text": [f"Text of legislation {item}. " * 10 for item in items]})
+    aseg_df = pd.DataFrame({"agenda_segment": segments})
+    return aseg_df, leg_df
+
+
+def match_nested_iterrows(aseg_df, leg_df):
+    """
+    Previous matcher: substring test of every legislation against every agenda segment, growing matches by concatenation.
+
+    Parameters:
+    - aseg_df: DataFrame of agenda segments with agenda_segment column.
+    - leg_df: DataFrame of legislations with item and text columns.
+    """
+    aseg_df["matched_legislation"] = "NO_LEGISLATION"
+
+    for _, leg_row in leg_df.iterrows():
+        for aseg_idx, aseg_row in aseg_df.iterrows():
+            if leg_row["item"] in aseg_row["agenda_segment"]:
+                if aseg_df.at[aseg_idx, "matched_legislation"] == "NO_LEGISLATION":
+                    aseg_df.at[aseg_idx, "matched_legislation"] = leg_row["text"]
+                else:
+                    aseg_df.at[aseg_idx, "matched_legislation"] = aseg_df.at[aseg_idx, "matched_legislation"] + leg_row["text"]
+
+    return aseg_df
+
+
+def benchmark_legislation_matching(aseg_df, leg_df):
+    """
+    Times the nested iterrows matcher against the automaton matcher and checks they agree.
+
+    Parameters:
+    - aseg_df: DataFrame of agenda segments with agenda_segment column.
+    - leg_df: DataFrame of legislations with item and text columns.
+    """
+    print(f"{len(leg_df)} legislations, {len(aseg_df)} agenda segments")
+
+    start = time.perf_counter()
+    automaton_result = match_legislation(aseg_df.copy(), leg_df)
+    automaton_seconds = time.perf_counter() - start
+    print(f"automaton: {automaton_seconds:.2f}s")
+
+    start = time.perf_counter()
+    nested_result = match_nested_iterrows(aseg_df.copy(), leg_df)
+    nested_seconds = time.perf_counter() - start
+    print(f"nested iterrows: {nested_seconds:.2f}s")
+
+    same = automaton_result["matched_legislation"].equals(nested_result["matched_legislation"])
+    print(f"speedup: {nested_seconds / automaton_seconds:.0f}x, same output: {same}")
+
+
+if __name__ == "__main__":
+    main()
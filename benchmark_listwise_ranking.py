@@ -0,0 +1,127 @@
+import io
+import re
+import time
+import random
+import contextlib
+from statistics import NormalDist
+from types import SimpleNamespace
+from itertools import combinations
+
+from _12_headline_ranking import run_pairwise_comparisons, run_adaptive_comparisons, run_listwise_comparisons
+
+
+def main():
+    ######## CONFIGURATION ########
+    N_HEADLINES = 200
+    TOP_K = 3
+    SEPARATION_Z = 1.0
+    GROUP_SIZE = 8
+    JUDGE_NOISE = 0.3  # standard deviation of the judge's per-prompt noise on a headline's importance
+    POSITION_BIAS = 0.2  # importance added to the headline shown first
+    RUNS = 5
+    MIN_CALL_REDUCTION = 10  # listwise must make at least this many times fewer calls than all pairs
+    MIN_TOP_K_AGREEMENT = 0.9  # listwise top-k must overlap this much with the true top-k and between runs
+    ###############################
+
+    benchmark_listwise_ranking(N_HEADLINES, TOP_K, SEPARATION_Z, GROUP_SIZE, JUDGE_NOISE, POSITION_BIAS, RUNS, MIN_CALL_REDUCTION, MIN_TOP_K_AGREEMENT)
+
+
+class JudgeStub:
+    """
+    Local stand-in for client.messages that answers comparison and group prompts from a hidden importance of every
+    headline, perceived with fresh noise per prompt and a bonus for the headline shown first. Counts calls.
+
+    Parameters:
+    - importance: dictionary containing hidden importance of each headline.
+    - noise (float): float object of standard deviation of the perceived importance.
+    - position_bias (float): float object of importance added to the headline shown first.
+    - seed (int): int object of random seed.
+    """
+    def __init__(self, importance, noise: float, position_bias: float, seed: int):
+        self.importance = importance
+        self.noise = noise
+        self.position_bias = position_bias
+        self.rng = random.Random(seed)
+        self.calls = 0
+
+    def create(self, model: str, messages, **_):
+        self.calls += 1
+        shown = re.findall(r"^Headline (\d+): (.+)$", messages[0]["content"][-1]["text"], re.MULTILINE)
+        perceived = {
+            int(number): self.importance[headline] + self.rng.gauss(0, self.noise) + (self.position_bias if number == "1" else 0)
+            for number, headline in shown
+        }
+        ordering = sorted(perceived, key=perceived.get, reverse=True)
+
+        text = f"Headline {ordering[0]}" if len(ordering) == 2 else ", ".join(str(number) for number in ordering)
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text=text)])
+
+
+def top_k(ratings, k: int):
+    return frozenset(sorted(ratings, key=lambda h: ratings[h].mu, reverse=True)[:k])
+
+
+def benchmark_listwise_ranking(n_headlines: int, k: int, z: float, group_size: int, noise: float, position_bias: float, runs: int, min_call_reduction: float = 10, min_top_k_agreement: float = 0.9):
+    """
+    Ranks synthetic headlines with all-pairs, adaptive and listwise comparisons against a simulated judge and prints,
+    per mode, the calls made and the top-k stability over runs: mean overlap with the true top-k, how often the exact
+    true top-k was found, and mean agreement of the top-k between runs. Asserts that all pairs makes one call per pair,
+    that adaptive and listwise make fewer, and that listwise keeps the top-k with far fewer calls.
+
+    Parameters:
+    - n_headlines (int): int object of number of headlines.
+    - k (int): int object of number of top headlines.
+    - z (float): float object of number of sigmas used by adaptive and listwise modes to decide separation.
+    - group_size (int): int object of number of headlines ordered per prompt in listwise mode.
+    - noise (float): float object of standard deviation of the judge's noise.
+    - position_bias (float): float object of importance added to the headline shown first.
+    - runs (int): int object of number of runs per mode, each with its own seed.
+    - min_call_reduction (float): float object of minimum ratio of all-pairs calls to listwise calls.
+    - min_top_k_agreement (float): float object of minimum listwise top-k overlap with the truth and agreement between runs.
+    """
+    # evenly spaced normal quantiles, so the true top-k is well defined
+    headlines = [f"headline {i}" for i in range(n_headlines)]
+    importance = {h: NormalDist().inv_cdf((i + 0.5) / n_headlines) for i, h in enumerate(headlines)}
+    headlines_to_labels = {h: f"H{i + 1}" for i, h in enumerate(headlines)}
+    true_top = frozenset(sorted(headlines, key=importance.get, reverse=True)[:k])
+
+    modes = {
+        "all_pairs": lambda client: run_pairwise_comparisons(headlines, headlines_to_labels, "model", 0, client),
+        "adaptive": lambda client: run_adaptive_comparisons(headlines, headlines_to_labels, "model", 0, client, k, z),
+        "listwise": lambda client: run_listwise_comparisons(headlines, headlines_to_labels, "model", 0, client, k, z, group_size),
+    }
+
+    print(f"{n_headlines} headlines, top {k}, judge noise {noise}, position bias {position_bias}, {runs} runs per mode")
+    calls, overlaps, agreements = {}, {}, {}
+    for mode, run in modes.items():
+        tops, mode_calls = [], []
+        start = time.perf_counter()
+        for seed in range(runs):
+            random.seed(seed)
+            judge = JudgeStub(importance, noise, position_bias, seed)
+            with contextlib.redirect_stdout(io.StringIO()):
+                ratings = run(SimpleNamespace(messages=judge))
+            tops.append(top_k(ratings, k))
+            mode_calls.append(judge.calls)
+        seconds = time.perf_counter() - start
+
+        calls[mode] = sum(mode_calls) / runs
+        overlaps[mode] = sum(len(top & true_top) for top in tops) / (runs * k)
+        exact = sum(top == true_top for top in tops) / runs
+        agreements[mode] = sum(len(a & b) / k for a, b in combinations(tops, 2)) / max(1, len(tops) * (len(tops) - 1) // 2)
+        print(
+            f"{mode}: {calls[mode]:.0f} calls, top-{k} overlap with truth {overlaps[mode]:.0%}, exact {exact:.0%}, "
+            f"agreement between runs {agreements[mode]:.0%} ({seconds / runs:.1f}s per run)"
+        )
+
+    print(f"listwise: {calls['all_pairs'] / calls['listwise']:.0f}x fewer calls than all pairs")
+
+    assert calls["all_pairs"] == n_headlines * (n_headlines - 1) // 2, f"!!! all_pairs: {calls['all_pairs']:.0f} calls, expected one per pair"
+    assert calls["adaptive"] < calls["all_pairs"], f"!!! adaptive: {calls['adaptive']:.0f} calls, no fewer than all pairs"
+    assert calls["listwise"] * min_call_reduction <= calls["all_pairs"], f"!!! listwise: {calls['listwise']:.0f} calls, less than {min_call_reduction}x fewer than all pairs"
+    assert overlaps["listwise"] >= min_top_k_agreement, f"!!! listwise: top-{k} overlap with truth {overlaps['listwise']:.0%}"
+    assert agreements["listwise"] >= min_top_k_agreement, f"!!! listwise: top-{k} agreement between runs {agreements['listwise']:.0%}"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import os
+import time
+import tempfile
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from _02_agenda_preprocessing import process_pdf_to_text
+
+
+def main():
+    ######## CONFIGURATION ########
+    INPUT_RAW_AGENDA_FOLDER = Path("agendas_raw")
+    BACKENDS = ["pdfplumber", "pymupdf"]
+    WORKERS = os.cpu_count()
+    ###############################
+
+    benchmark_pdf_extraction(sorted(INPUT_RAW_AGENDA_FOLDER.rglob("*.pdf")), BACKENDS, WORKERS)
+
+
+def run_extraction(pdf_paths, backend: str, workers: int):
+    """
+    Extracts all PDFs into a temporary folder and returns (seconds, pages).
+
+    Parameters:
+    - pdf_paths: list of Path objects of PDF files.
+    - backend (str): string object of name of text backend.
+    - workers (int): int object of number of worker processes, 1 to extract in this process.
+    """
+    with tempfile.TemporaryDirectory() as output_folder:
+        start = time.perf_counter()
+        pages = 0
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for pdf_path in pdf_paths:
+                    pages += process_pdf_to_text(pdf_path, Path(output_folder) / f"{pdf_path.stem}.txt", backend, pool, workers)
+        else:
+            for pdf_path in pdf_paths:
+                pages += process_pdf_to_text(pdf_path, Path(output_folder) / f"{pdf_path.stem}.txt", backend)
+        return time.perf_counter() - start, pages
+
+
+def benchmark_pdf_extraction(pdf_paths, backends, workers: int):
+    """
+    Compares pages per second of each text backend, in one process and across a process pool.
+
+    Parameters:
+    - pdf_paths: list of Path objects of PDF files.
+    - backends: list of names of text backends.
+    - workers (int): int object of number of worker processes.
+    """
+    print(f"{len(pdf_paths)} PDFs, {workers} workers")
+
+    for backend in backends:
+        for n in sorted({1, workers}):
+            seconds, pages = run_extraction(pdf_paths, backend, n)
+            print(f"{backend}, {n} process{'es' if n > 1 else ''}: {pages} pages in {seconds:.1f}s ({pages / seconds:.1f} pages/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import json
+import hashlib
+import tempfile
+import pandas as pd
+from pathlib import Path
+from itertools import combinations
+from types import SimpleNamespace
+
+from llm_cache import LLMCache, CachedClient
+from _11_headline_summary_generation import generate_headline_claude, generate_summary_claude
+from _12_headline_ranking import compare_headlines_claude
+
+
+def main():
+    ######## CONFIGURATION ########
+    INPUT_REPORTS_FOLDER = Path("reports")
+    MODEL = "claude-sonnet-4-20250514"
+    MIN_CACHEABLE_TOKENS = 1024  # smallest cacheable prefix of Sonnet models
+    N_HEADLINES = 50  # about one week of headlines
+    ###############################
+
+    reports_df = pd.concat([pd.read_csv(path) for path in sorted(INPUT_REPORTS_FOLDER.glob("*.csv"))])
+    reports_df = reports_df[(reports_df["combined_segment"] != "NO_SEGMENT") & (reports_df["headline"] != "NO_HEADLINE")]
+
+    benchmark_prompt_caching(reports_df, MODEL, MIN_CACHEABLE_TOKENS, N_HEADLINES)
+
+
+def count_tokens(text: str):
+    # rough estimate of about four characters per token
+    return max(1, len(text) // 4)
+
+
+class PrefixCacheStub:
+    """
+    Local stand-in for client.messages that caches prompts like the API: the prefix up to the last block with
+    cache_control is written to the cache on first use and read on later requests with the same model and prefix,
+    if it is at least min_cacheable_tokens long. Reports the split in the usage of each response.
+
+    Parameters:
+    - min_cacheable_tokens (int): int object of minimum number of tokens of a cacheable prefix.
+    """
+    def __init__(self, min_cacheable_tokens: int):
+        self.min_cacheable_tokens = min_cacheable_tokens
+        self.prefixes = set()
+
+    def create(self, model: str, messages, max_tokens: int, **_):
+        blocks = []
+        for message in messages:
+            content = message["content"]
+            blocks.extend([{"type": "text", "text": content}] if isinstance(content, str) else content)
+
+        tokens = [count_tokens(block["text"]) for block in blocks]
+        marked = [i for i, block in enumerate(blocks) if "cache_control" in block]
+
+        cache_write = cache_read = 0
+        if marked and sum(tokens[:marked[-1] + 1]) >= self.min_cacheable_tokens:
+            prefix_tokens = sum(tokens[:marked[-1] + 1])
+            key = hashlib.sha256(json.dumps([model, blocks[:marked[-1] + 1]], sort_keys=True).encode("utf-8")).hexdigest()
+            if key in self.prefixes:
+                cache_read = prefix_tokens
+            else:
+                cache_write = prefix_tokens
+                self.prefixes.add(key)
+
+        return SimpleNamespace(
+            content=[SimpleNamespace(type="text", text="Headline 1")],
+            stop_reason="end_turn",
+            usage=SimpleNamespace(
+                input_tokens=sum(tokens) - cache_write - cache_read,
+                output_tokens=1,
+                cache_creation_input_tokens=cache_write,
+                cache_read_input_tokens=cache_read,
+            ),
+        )
+
+
+def run_with_stub(min_cacheable_tokens: int, run):
+    """
+    Runs a function with a Claude client backed by a fresh PrefixCacheStub and returns the usage totals.
+
+    Parameters:
+    - min_cacheable_tokens (int): int object of minimum number of tokens of a cacheable prefix.
+    - run: function taking the client.
+    """
+    with tempfile.TemporaryDirectory() as folder:
+        cache = LLMCache(Path(folder) / "llm_cache.sqlite", bypass=True)
+        client = CachedClient(SimpleNamespace(messages=PrefixCacheStub(min_cacheable_tokens)), cache)
+        run(client)
+        cache.conn.close()
+    return cache.usage
+
+
+def billed_input(totals):
+    # cache writes cost 1.25x and cache reads 0.1x of the base input price
+    return totals["input_tokens"] + 1.25 * totals["cache_creation_input_tokens"] + 0.1 * totals["cache_read_input_tokens"]
+
+
+def print_usage(name: str, usage):
+    t = usage.totals
+    uncached = t["input_tokens"] + t["cache_creation_input_tokens"] + t["cache_read_input_tokens"]
+    print(f"\n{name}")
+    usage.report()
+    print(f"billed input: {billed_input(t):.0f} of {uncached} tokens without caching ({billed_input(t) / uncached:.0%})")
+
+
+def benchmark_prompt_caching(reports_df, model: str, min_cacheable_tokens: int, n_headlines: int):
+    """
+    Replays the headline and summary requests of _11 and the pairwise comparisons of _12 against a local
+    prefix caching stub, and prints cached versus uncached input tokens. Checks that _11 reads its segment prefix from
+    the cache, and that _12, whose instructions are too short to cache, marks nothing and pays no cache writes.
+
+    Parameters:
+    - reports_df: DataFrame of reports with combined_segment and headline columns.
+    - model (str): string object of Claude model alias.
+    - min_cacheable_tokens (int): int object of minimum number of tokens of a cacheable prefix.
+    - n_headlines (int): int object of number of headlines compared pairwise.
+    """
+    def headlines_summaries(client):
+        for _, row in reports_df.iterrows():
+            generate_headline_claude(row["combined_segment"], model, client)
+            generate_summary_claude(row["headline"], row["combined_segment"], model, client)
+
+    def comparisons(client):
+        for h1, h2 in combinations(list(reports_df["headline"])[:n_headlines], 2):
+            compare_headlines_claude(h1, h2, model, client)
+
+    print(f"{len(reports_df)} segments, {n_headlines} headlines, prefixes cached from {min_cacheable_tokens} tokens")
+    usage = run_with_stub(min_cacheable_tokens, headlines_summaries)
+    print_usage("_11 headline and summary", usage)
+    assert usage.totals["cache_read_input_tokens"] > 0, "!!! _11 headline and summary: no prompt cache reads"
+
+    usage = run_with_stub(min_cacheable_tokens, comparisons)
+    print_usage("_12 pairwise comparisons", usage)
+    assert usage.totals["cache_creation_input_tokens"] == 0, "!!! _12 pairwise comparisons: prompt cache written for a prefix below the minimum"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import time
+import random
+import resource
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+
+def main():
+    ######## CONFIGURATION ########
+    TRANSCRIPT_FOLDER = Path("transcripts")
+    N_WORDS = 50000
+    WINDOW_WORDS = 200
+    OVERLAP_WORDS = 40
+    BATCH_SIZE = 8
+    WORKERS = 0
+    ###############################
+
+    text = synthetic_transcript(TRANSCRIPT_FOLDER, N_WORDS)
+    punct_options = {"window_words": WINDOW_WORDS, "overlap_words": OVERLAP_WORDS, "batch_size": BATCH_SIZE, "workers": WORKERS}
+
+    benchmark_punctuation(text, punct_options)
+
+
+def synthetic_transcript(transcript_folder: Path, n_words: int, seed: int = 0):
+    """
+    Builds an unpunctuated transcript of n_words by sampling words from existing transcripts.
+
+    Parameters:
+    - transcript_folder (Path): Path object of folder with TXT transcripts to take the vocabulary from.
+    - n_words (int): int object of number of words in the transcript.
+    - seed (int): int object of random seed.
+    """
+    import _08_audio_transcription as stage
+
+    vocabulary = []
+    for transcript_file in sorted(transcript_folder.glob("*.txt")):
+        vocabulary.extend(stage.clean_text(transcript_file.read_text(encoding="utf-8")).split())
+
+    rng = random.Random(seed)
+    return " ".join(rng.choice(vocabulary) for _ in range(n_words))
+
+
+def run_path(text: str, punct_options):
+    """
+    Punctuates text in a fresh process and returns (seconds, words, peak RSS MB after loading the model, peak RSS MB).
+
+    Parameters:
+    - text (str): Text with no punctuation.
+    - punct_options: dictionary of restore_punctuation_windowed arguments, None for a single restore_punctuation call.
+    """
+    import _08_audio_transcription as stage
+
+    punct_model = stage.PunctuationModel()
+    loaded_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    start = time.perf_counter()
+    if punct_options is None:
+        punct_model.restore_punctuation(text)
+    else:
+        stage.restore_punctuation_windowed(text, punct_model, **punct_options)
+    seconds = time.perf_counter() - start
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return seconds, len(text.split()), loaded_rss, peak_rss
+
+
+def benchmark_punctuation(text: str, punct_options):
+    """
+    Compares the single-call restore_punctuation path with the windowed, batched path and prints tokens (words)
+    per second and peak RSS. Each path runs in its own process so peak RSS is measured separately.
+
+    Parameters:
+    - text (str): Text with no punctuation.
+    - punct_options: dictionary of restore_punctuation_windowed arguments.
+    """
+    for name, options in (("single call", None), ("windowed", punct_options)):
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            seconds, words, loaded_rss, peak_rss = pool.submit(run_path, text, options).result()
+
+        print(
+            f"{name}: {words} words in {seconds:.1f}s ({words / seconds:.0f} words/s), "
+            f"peak RSS {peak_rss:.0f} MB ({peak_rss - loaded_rss:.0f} MB above loaded model)"
+        )
+
+
+if __name__ == "__main__":
+    main()
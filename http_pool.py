@@ -0,0 +1,39 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse
+
+
+def make_session(pool_size: int):
+    """
+    Creates a keep-alive HTTP session with a connection pool large enough for the worker threads.
+
+    Parameters:
+    - pool_size (int): int object of number of connections kept per host.
+    """
+    session = requests.Session()
+    session.headers.update({"User-Agent": "Mozilla/5.0"})
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class HostLimiter:
+    """
+    Limits the number of concurrent requests to each host.
+
+    Parameters:
+    - per_host_limit (int): int object of maximum concurrent requests per host.
+    """
+    def __init__(self, per_host_limit: int):
+        self.per_host_limit = per_host_limit
+        self.semaphores = {}
+        self.lock = threading.Lock()
+
+    def get(self, url: str):
+        host = urlparse(url).netloc
+        with self.lock:
+            if host not in self.semaphores:
+                self.semaphores[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self.semaphores[host]
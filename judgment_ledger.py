@@ -0,0 +1,130 @@
+import sqlite3
+import hashlib
+import time
+import threading
+from pathlib import Path
+
+
+def headline_hash(headline: str):
+    """
+    Returns SHA-256 of a headline's text, the same in every window whatever label the headline gets.
+
+    Parameters:
+    - headline (str): string object of headline.
+    """
+    return hashlib.sha256(headline.strip().encode("utf-8")).hexdigest()
+
+
+class JudgmentLedger:
+    """
+    Append-only SQLite ledger of pairwise comparison outcomes keyed by (headline hash pair, model, prompt version),
+    so later runs over overlapping windows replay earlier judgments instead of paying for them again.
+
+    Parameters:
+    - db_path (Path): Path object of SQLite file where judgments are stored.
+    """
+    def __init__(self, db_path: Path):
+        self.replayed = 0
+        self.recorded = 0
+        self.lock = threading.Lock()
+
+        self.conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS judgments (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                hash_a TEXT,
+                hash_b TEXT,
+                model TEXT,
+                prompt_version TEXT,
+                winner TEXT,
+                shown_first TEXT,
+                judged_at REAL
+            )
+            """
+        )
+        # hash_a < hash_b, so the pair index also serves lookups by hash_a alone
+        self.conn.execute("CREATE INDEX IF NOT EXISTS judgments_pair ON judgments (hash_a, hash_b, model, prompt_version)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS judgments_b ON judgments (hash_b)")
+        self.conn.commit()
+
+    def record(self, h1: str, h2: str, winner_h: str, model: str, prompt_version: str):
+        """
+        Appends the outcome of one comparison.
+
+        Parameters:
+        - h1 (str): string object containing headline shown first.
+        - h2 (str): string object containing headline shown second.
+        - winner_h (str): string object containing winning headline.
+        - model (str): string object of Claude model alias that judged.
+        - prompt_version (str): string object of version of the comparison prompt.
+        """
+        first, second = headline_hash(h1), headline_hash(h2)
+        hash_a, hash_b = sorted((first, second))
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO judgments (hash_a, hash_b, model, prompt_version, winner, shown_first, judged_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (hash_a, hash_b, model, prompt_version, headline_hash(winner_h), first, time.time()),
+            )
+            self.conn.commit()
+            self.recorded += 1
+
+    def replay(self, headlines, model: str, prompt_version: str):
+        """
+        Returns (winning headline, losing headline) of every recorded judgment between two of the headlines
+        by the model and prompt version, oldest first.
+
+        Parameters:
+        - headlines: list of headlines.
+        - model (str): string object of Claude model alias.
+        - prompt_version (str): string object of version of the comparison prompt.
+        """
+        by_hash = {headline_hash(h): h for h in headlines}
+
+        # candidates by hash_a through the index, the other side is filtered here
+        outcomes = []
+        with self.lock:
+            for hash_a in by_hash:
+                rows = self.conn.execute(
+                    "SELECT id, hash_b, winner FROM judgments WHERE hash_a = ? AND model = ? AND prompt_version = ?",
+                    (hash_a, model, prompt_version),
+                ).fetchall()
+                for row_id, hash_b, winner in rows:
+                    if hash_b in by_hash:
+                        loser = hash_b if winner == hash_a else hash_a
+                        outcomes.append((row_id, by_hash[winner], by_hash[loser]))
+
+        outcomes.sort()
+        self.replayed += len(outcomes)
+        return [(winner_h, loser_h) for _, winner_h, loser_h in outcomes]
+
+    def judgments_for(self, headline: str):
+        """
+        Returns every recorded judgment involving a headline as dictionaries with opponent hash, won, model and prompt version.
+
+        Parameters:
+        - headline (str): string object of headline.
+        """
+        h = headline_hash(headline)
+        with self.lock:
+            rows = self.conn.execute(
+                """
+                SELECT hash_b, winner, model, prompt_version, judged_at FROM judgments WHERE hash_a = ?
+                UNION ALL
+                SELECT hash_a, winner, model, prompt_version, judged_at FROM judgments WHERE hash_b = ?
+                ORDER BY judged_at
+                """,
+                (h, h),
+            ).fetchall()
+        return [
+            {"opponent": opponent, "won": winner == h, "model": model, "prompt_version": prompt_version, "judged_at": judged_at}
+            for opponent, winner, model, prompt_version, judged_at in rows
+        ]
+
+    def report(self):
+        """
+        Prints number of judgments replayed from and recorded to the ledger.
+        """
+        total = self.replayed + self.recorded
+        rate = self.replayed / total if total else 0
+        print(f"judgment ledger: {self.replayed} replayed, {self.recorded} recorded ({rate:.0%} of judgments replayed)")
@@ -0,0 +1,121 @@
+import sqlite3
+import time
+import threading
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+
+def matter_key(url: str):
+    """
+    Returns the Legistar matter key ("<ID>|<GUID>") parsed from a LegislationDetail URL, or the URL itself
+    if it has no ID/GUID.
+
+    Parameters:
+    - url (str): string object of Legistar legislation URL.
+    """
+    query = {k.lower(): v[0] for k, v in parse_qs(urlparse(url).query).items()}
+    if "id" in query or "guid" in query:
+        return f"{query.get('id', '')}|{query.get('guid', '').upper()}"
+    return url
+
+
+class LegislationStore:
+    """
+    Persistent SQLite store of legislation texts shared across meetings, keyed by Legistar matter.
+
+    Parameters:
+    - db_path (Path): Path object of SQLite file where legislation texts are stored.
+    - ttl_seconds (float): float object of age after which an entry is revalidated with a conditional request.
+    """
+    def __init__(self, db_path: Path, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        self.conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS matters (
+                matter_key TEXT PRIMARY KEY,
+                url TEXT,
+                text TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL
+            )
+            """
+        )
+        self.conn.commit()
+
+    def get(self, key: str):
+        """
+        Returns the stored entry of a matter as a dictionary, or None.
+
+        Parameters:
+        - key (str): string object of matter key.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT url, text, etag, last_modified, fetched_at FROM matters WHERE matter_key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"url": row[0], "text": row[1], "etag": row[2], "last_modified": row[3], "fetched_at": row[4]}
+
+    def is_fresh(self, entry):
+        """
+        Checks whether an entry is younger than the TTL.
+
+        Parameters:
+        - entry: dictionary returned by get.
+        """
+        return time.time() - entry["fetched_at"] < self.ttl_seconds
+
+    def put(self, key: str, url: str, text: str, etag: str = None, last_modified: str = None):
+        """
+        Saves the text of a matter with its HTTP validators.
+
+        Parameters:
+        - key (str): string object of matter key.
+        - url (str): string object of URL the text was fetched from.
+        - text (str): string object of legislation text.
+        - etag (str): string object of ETag response header, if any.
+        - last_modified (str): string object of Last-Modified response header, if any.
+        """
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO matters (matter_key, url, text, etag, last_modified, fetched_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, url, text, etag, last_modified, time.time()),
+            )
+            self.conn.commit()
+
+    def touch(self, key: str):
+        """
+        Marks an entry as fresh after the server confirmed it has not changed (304).
+
+        Parameters:
+        - key (str): string object of matter key.
+        """
+        with self.lock:
+            self.conn.execute("UPDATE matters SET fetched_at = ? WHERE matter_key = ?", (time.time(), key))
+            self.conn.commit()
+
+    def count(self, kind: str):
+        """
+        Increments one of the hits, revalidated or misses counters.
+
+        Parameters:
+        - kind (str): string object of counter name.
+        """
+        with self.lock:
+            setattr(self, kind, getattr(self, kind) + 1)
+
+    def report(self):
+        """
+        Prints hit rate of the run.
+        """
+        total = self.hits + self.revalidated + self.misses
+        rate = (self.hits + self.revalidated) / total if total else 0
+        print(f"legislation store: {self.hits} hits, {self.revalidated} revalidated, {self.misses} fetched ({rate:.0%} hit rate)")
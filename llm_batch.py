@@ -0,0 +1,72 @@
+import json
+import time
+from pathlib import Path
+
+
+def load_batch_state(state_path: Path):
+    """
+    Loads the state of an in-progress Message Batch, or an empty dictionary if there is none.
+
+    Parameters:
+    - state_path (Path): Path object of JSON file recording the batch ID and anything needed to resume.
+    """
+    if not state_path.exists():
+        return {}
+    with open(state_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_batch_state(state_path: Path, state):
+    """
+    Saves the state of an in-progress Message Batch so an interrupted run can resume by batch ID.
+
+    Parameters:
+    - state_path (Path): Path object of JSON file recording the batch ID and anything needed to resume.
+    - state: dictionary containing at least "phase" and "batch_id".
+    """
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(state_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=4)
+
+
+def submit_batch(requests, client):
+    """
+    Submits requests as one Message Batch and returns its ID.
+
+    Parameters:
+    - requests: list of {"custom_id": ..., "params": {...}} dictionaries, params as for client.messages.create.
+    - client: Claude API client.
+    """
+    batch = client.messages.batches.create(requests=requests)
+    print(f"submitted batch {batch.id} with {len(requests)} requests")
+    return batch.id
+
+
+def wait_for_batch(batch_id: str, poll_seconds: int, client, usage=None):
+    """
+    Polls a Message Batch until it has ended and returns the text of each succeeded request.
+
+    Parameters:
+    - batch_id (str): string object of Message Batch ID.
+    - poll_seconds (int): int object of number of seconds to wait between polls.
+    - client: Claude API client.
+    - usage (TokenUsage): optional TokenUsage object the usage of succeeded requests is added to.
+    """
+    while True:
+        batch = client.messages.batches.retrieve(batch_id)
+        if batch.processing_status == "ended":
+            break
+        print(f"batch {batch_id}: {batch.request_counts.processing} requests processing")
+        time.sleep(poll_seconds)
+
+    results = {}
+    for entry in client.messages.batches.results(batch_id):
+        if entry.result.type == "succeeded":
+            results[entry.custom_id] = entry.result.message.content[0].text.strip()
+            if usage is not None:
+                usage.add(entry.result.message.usage)
+        else:
+            print(f"!!! batch request {entry.custom_id} {entry.result.type}")
+
+    print(f"batch {batch_id} ended: {len(results)} succeeded")
+    return results
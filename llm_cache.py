@@ -0,0 +1,284 @@
+import sys
+import sqlite3
+import hashlib
+import json
+import time
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+
+class TokenUsage:
+    """
+    Thread safe totals of the token usage reported by Claude responses, including prompt cache writes and reads.
+    """
+    FIELDS = ("input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.totals = dict.fromkeys(self.FIELDS, 0)
+
+    def add(self, usage):
+        """
+        Adds the usage of one response.
+
+        Parameters:
+        - usage: usage object of a Claude response (fields missing or None count as 0).
+        """
+        if usage is None:
+            return
+        with self.lock:
+            self.requests += 1
+            for field in self.FIELDS:
+                self.totals[field] += getattr(usage, field, None) or 0
+
+    def report(self):
+        """
+        Prints token totals and the share of prompt tokens read from the prompt cache.
+        """
+        t = self.totals
+        prompt_tokens = t["input_tokens"] + t["cache_creation_input_tokens"] + t["cache_read_input_tokens"]
+        rate = t["cache_read_input_tokens"] / prompt_tokens if prompt_tokens else 0
+        print(
+            f"tokens: {self.requests} requests, {t['input_tokens']} uncached input, {t['cache_creation_input_tokens']} cache write, "
+            f"{t['cache_read_input_tokens']} cache read ({rate:.0%} of prompt tokens), {t['output_tokens']} output"
+        )
+
+
+class LLMCache:
+    """
+    Persistent SQLite cache of Claude responses keyed on (model, prompt hash, max_tokens, temperature).
+
+    Parameters:
+    - db_path (Path): Path object of SQLite file where responses are stored.
+    - max_size_mb (float): float object of maximum total size of cached responses before least recently used entries are evicted.
+    - bypass (bool): bool object, if True the cache is never read or written.
+    """
+    def __init__(self, db_path: Path, max_size_mb: float = 500, bypass: bool = False):
+        self.db_path = db_path
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self.usage = TokenUsage()
+        self.started_at = time.time()
+        self.lock = threading.Lock()
+
+        self.conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                response TEXT,
+                stop_reason TEXT,
+                size INTEGER,
+                last_used REAL
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                script TEXT,
+                started_at REAL,
+                finished_at REAL,
+                hits INTEGER,
+                misses INTEGER,
+                requests INTEGER,
+                input_tokens INTEGER,
+                output_tokens INTEGER,
+                cache_creation_input_tokens INTEGER,
+                cache_read_input_tokens INTEGER
+            )
+            """
+        )
+        self.conn.commit()
+
+        # running total of response sizes, so a store does not sum the whole table
+        self.total_size = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(model: str, messages, max_tokens: int, temperature: float = 1.0, system=None, **_):
+        """
+        Hashes the request fields that determine the response.
+
+        Parameters:
+        - model (str): string object of Claude model alias.
+        - messages: list of messages sent to Claude.
+        - max_tokens (int): int object of maximum output tokens.
+        - temperature (float): float object of sampling temperature.
+        - system: optional system prompt.
+        """
+        prompt_hash = hashlib.sha256(
+            json.dumps({"system": system, "messages": messages}, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+        return f"{model}|{prompt_hash}|{max_tokens}|{temperature}"
+
+    def lookup(self, **request):
+        """
+        Returns (text, stop_reason) of a cached response for the request, or None.
+
+        Parameters:
+        - request: arguments that would be passed to client.messages.create.
+        """
+        if self.bypass:
+            return None
+
+        key = self.make_key(**request)
+        with self.lock:
+            row = self.conn.execute("SELECT response, stop_reason FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+        return row[0], row[1]
+
+    def store(self, text: str, stop_reason: str, **request):
+        """
+        Saves a response for the request, then evicts least recently used entries over the size limit.
+
+        Parameters:
+        - text (str): string object of response text.
+        - stop_reason (str): string object of stop reason of the response.
+        - request: arguments that were passed to client.messages.create.
+        """
+        if self.bypass:
+            return
+
+        key = self.make_key(**request)
+        size = len(text.encode("utf-8"))
+        with self.lock:
+            replaced = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, stop_reason, size, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, request.get("model"), text, stop_reason, size, time.time()),
+            )
+            self.total_size += size - (replaced[0] if replaced else 0)
+
+            if self.total_size > self.max_size_bytes:
+                # other processes may share the file, so the total is recounted before evicting
+                self.total_size = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+                # walk oldest first and delete until back under the limit
+                to_delete = []
+                for old_key, old_size in self.conn.execute("SELECT key, size FROM responses ORDER BY last_used"):
+                    if self.total_size <= self.max_size_bytes:
+                        break
+                    to_delete.append((old_key,))
+                    self.total_size -= old_size
+                self.conn.executemany("DELETE FROM responses WHERE key = ?", to_delete)
+
+            self.conn.commit()
+
+    def report(self):
+        """
+        Prints hit/miss counters and token usage, and saves them as a row of the runs table.
+        """
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0
+        print(f"llm cache: {self.hits} hits, {self.misses} misses ({rate:.0%} hit rate)")
+        self.usage.report()
+
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (Path(sys.argv[0]).name, self.started_at, time.time(), self.hits, self.misses, self.usage.requests)
+                + tuple(self.usage.totals[field] for field in TokenUsage.FIELDS),
+            )
+            self.conn.commit()
+
+
+def cached_response(text: str, stop_reason: str = "end_turn"):
+    """
+    Builds an object shaped like a Claude response (response.content[0].text) from cached text.
+
+    Parameters:
+    - text (str): string object of response text.
+    - stop_reason (str): string object of stop reason of the response.
+    """
+    return SimpleNamespace(
+        content=[SimpleNamespace(type="text", text=text)],
+        stop_reason=stop_reason,
+        usage=SimpleNamespace(input_tokens=0, output_tokens=0),
+    )
+
+
+class CachedMessages:
+    """
+    Drop-in replacement for client.messages whose create() goes through an LLMCache.
+
+    Parameters:
+    - messages: messages resource of a Claude API client.
+    - cache (LLMCache): LLMCache object.
+    """
+    def __init__(self, messages, cache: LLMCache):
+        self._messages = messages
+        self.cache = cache
+
+    def __getattr__(self, name):
+        return getattr(self._messages, name)
+
+    def create(self, stream: bool = False, **request):
+        cached = self.cache.lookup(**request)
+
+        if stream:
+            if cached is not None:
+                return self._replay_stream(*cached)
+            return self._record_stream(self._messages.create(stream=True, **request), request)
+
+        if cached is not None:
+            return cached_response(*cached)
+
+        response = self._messages.create(**request)
+        self.cache.usage.add(response.usage)
+        self.cache.store(response.content[0].text, response.stop_reason, **request)
+        return response
+
+    @staticmethod
+    def _replay_stream(text: str, stop_reason: str):
+        yield SimpleNamespace(type="content_block_delta", delta=SimpleNamespace(type="text_delta", text=text))
+        yield SimpleNamespace(type="message_delta", delta=SimpleNamespace(stop_reason=stop_reason))
+
+    def _record_stream(self, stream, request):
+        parts = []
+        stop_reason = None
+        usage = None
+        for chunk in stream:
+            if chunk.type == "message_start":
+                usage = chunk.message.usage
+            elif chunk.type == "content_block_delta":
+                parts.append(chunk.delta.text)
+            elif chunk.type == "message_delta":
+                stop_reason = chunk.delta.stop_reason
+                if usage is not None:
+                    usage.output_tokens = chunk.usage.output_tokens
+            yield chunk
+
+        self.cache.usage.add(usage)
+
+        # only store streams that ran to the end
+        if stop_reason is not None:
+            self.cache.store("".join(parts), stop_reason, **request)
+
+
+class CachedClient:
+    """
+    Wraps a Claude API client so that client.messages.create is served from an LLMCache when possible.
+
+    Parameters:
+    - client: Claude API client.
+    - cache (LLMCache): LLMCache object.
+    """
+    def __init__(self, client, cache: LLMCache):
+        self._client = client
+        self.cache = cache
+        self.messages = CachedMessages(client.messages, cache)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
@@ -0,0 +1,344 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from datetime import datetime
+
+
+def main():
+    ######## CONFIGURATION ########
+    CATALOG_PATH = Path("meeting_catalog.sqlite")
+    ###############################
+
+    # one-time import of the artifacts written before stages kept the catalog in sync
+    catalog = MeetingCatalog(CATALOG_PATH)
+    for kind, folder, patterns, column in ARTIFACT_FOLDERS:
+        catalog.sync_folder(kind, folder, patterns, column)
+    catalog.report()
+
+
+# formats meeting audio is stored in, most preferred first. New downloads use the first (16 kHz mono FLAC for Whisper).
+AUDIO_FORMATS = ("flac", "opus", "wav")
+
+
+# default location of every artifact kind. Stages that add columns to a file in place (legislation text fetching,
+# legislation matching, segment combining) get their own kind, recognized by the column they add.
+ARTIFACT_FOLDERS = [
+    ("legistar_url", Path("__input_legistar_urls"), "*.txt", None),
+    ("youtube_url", Path("__input_youtube_urls"), "*.txt", None),
+    ("agenda_pdf", Path("agendas_raw"), "*.pdf", None),
+    ("agenda_text", Path("agendas_processed"), "*.txt", None),
+    ("agenda_segments", Path("agenda_segments"), "*.csv", None),
+    ("matched_legislation", Path("agenda_segments"), "*.csv", "matched_legislation"),
+    ("combined_segments", Path("agenda_segments"), "*.csv", "combined_segment"),
+    ("legislation_links", Path("legislations"), "*.csv", None),
+    ("legislations", Path("legislations"), "*.csv", "text"),
+    ("audio", Path("audios"), tuple(f"*.{audio_format}" for audio_format in reversed(AUDIO_FORMATS)), None),
+    ("transcript", Path("transcripts"), "*.txt", None),
+    ("transcript_segments", Path("transcript_segments"), "*.csv", None),
+    ("reports", Path("reports"), "*.csv", None),
+]
+
+
+def audio_file(folder: Path, stem: str):
+    """
+    Returns the audio file of a meeting in the most preferred format it exists in,
+    or the path a new download is saved to if there is none.
+
+    Parameters:
+    - folder (Path): Path object of folder containing audio files.
+    - stem (str): string object of meeting file stem.
+    """
+    for audio_format in AUDIO_FORMATS:
+        path = folder / f"{stem}.{audio_format}"
+        if path.exists():
+            return path
+    return folder / f"{stem}.{AUDIO_FORMATS[0]}"
+
+
+def parse_stem(stem: str):
+    """
+    Returns (date, meeting type) of a meeting file stem, e.g. 20250519_REG -> ("20250519", "REG").
+    Raises ValueError if the stem does not start with a date.
+
+    Parameters:
+    - stem (str): string object of meeting file stem.
+    """
+    parts = stem.split("_")
+    datetime.strptime(parts[0], "%Y%m%d")
+    return parts[0], parts[1] if len(parts) > 1 else ""
+
+
+def file_hash(path: Path):
+    """
+    Returns SHA-256 of file contents.
+
+    Parameters:
+    - path (Path): Path object of file to hash.
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class MeetingCatalog:
+    """
+    SQLite index of meetings (stem, date, type) and the path, hash and status of each of their artifacts.
+    Stages query it for the meetings in a time frame instead of scanning folders, and record every artifact they write.
+
+    Parameters:
+    - db_path (Path): Path object of SQLite file of the catalog.
+    """
+    def __init__(self, db_path: Path):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS meetings (
+                stem TEXT PRIMARY KEY,
+                date TEXT,
+                type TEXT
+            )
+            """
+        )
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS artifacts (
+                stem TEXT,
+                kind TEXT,
+                path TEXT,
+                hash TEXT,
+                size INTEGER,
+                mtime_ns INTEGER,
+                status TEXT,
+                updated_at REAL,
+                inputs TEXT,
+                PRIMARY KEY (stem, kind)
+            )
+            """
+        )
+        # catalogs created before run_pipeline kept its input fingerprints here
+        if "inputs" not in [row[1] for row in self.conn.execute("PRAGMA table_info(artifacts)")]:
+            self.conn.execute("ALTER TABLE artifacts ADD COLUMN inputs TEXT")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS meetings_date ON meetings (date)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS artifacts_kind_status ON artifacts (kind, status, stem)")
+        self.conn.commit()
+
+    def record(self, kind: str, path: Path, status: str = "done", inputs: str = None):
+        """
+        Records an artifact of a meeting with the current hash of its file. A missing file is recorded as "missing".
+
+        Parameters:
+        - kind (str): string object of artifact kind, e.g. agenda_pdf.
+        - path (Path): Path object of artifact file, named by meeting stem.
+        - status (str): string object of status, "done" or "failed".
+        - inputs (str): optional string object of fingerprint of what the artifact was made from, kept by run_pipeline.
+        """
+        path = Path(path)
+        date, meeting_type = parse_stem(path.stem)
+
+        if path.exists():
+            stat = os.stat(path)
+            digest, size, mtime_ns = file_hash(path), stat.st_size, stat.st_mtime_ns
+        else:
+            digest, size, mtime_ns, status = None, None, None, "missing"
+
+        with self.lock:
+            self.conn.execute("INSERT OR IGNORE INTO meetings (stem, date, type) VALUES (?, ?, ?)", (path.stem, date, meeting_type))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO artifacts (stem, kind, path, hash, size, mtime_ns, status, updated_at, inputs) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (path.stem, kind, str(path), digest, size, mtime_ns, status, time.time(), inputs),
+            )
+            self.conn.commit()
+
+    def has(self, kind: str, stem: str):
+        """
+        Checks whether a meeting has a done artifact of a kind.
+
+        Parameters:
+        - kind (str): string object of artifact kind.
+        - stem (str): string object of meeting file stem.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM artifacts WHERE stem = ? AND kind = ? AND status = 'done'", (stem, kind)
+            ).fetchone()
+        return row is not None
+
+    def get(self, kind: str, stem: str):
+        """
+        Returns the recorded artifact of a kind of a meeting as a dictionary with path, hash, status and inputs, None if there is none.
+
+        Parameters:
+        - kind (str): string object of artifact kind.
+        - stem (str): string object of meeting file stem.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT path, hash, status, inputs FROM artifacts WHERE stem = ? AND kind = ?", (stem, kind)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"path": Path(row[0]), "hash": row[1], "status": row[2], "inputs": row[3]}
+
+    def knows(self, kind: str):
+        """
+        Checks whether any artifact of a kind was ever recorded. Until then the catalog has not seen that kind's folder,
+        so stages scan it instead.
+
+        Parameters:
+        - kind (str): string object of artifact kind.
+        """
+        with self.lock:
+            row = self.conn.execute("SELECT 1 FROM artifacts WHERE kind = ? LIMIT 1", (kind,)).fetchone()
+        return row is not None
+
+    def paths(self, kind: str, start_day: datetime, end_day: datetime):
+        """
+        Returns paths of the done artifacts of a kind for meetings in time frame, ordered by stem.
+
+        Parameters:
+        - kind (str): string object of artifact kind.
+        - start_day (datetime): datetime object of earliest day in timeframe.
+        - end_day (datetime): datetime object of latest day in timeframe.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                """
+                SELECT a.path FROM meetings m JOIN artifacts a ON a.stem = m.stem
+                WHERE m.date BETWEEN ? AND ? AND a.kind = ? AND a.status = 'done'
+                ORDER BY m.stem
+                """,
+                (start_day.strftime("%Y%m%d"), end_day.strftime("%Y%m%d"), kind),
+            ).fetchall()
+        return [Path(row[0]) for row in rows]
+
+    def missing(self, kind: str, requires: str, start_day: datetime, end_day: datetime):
+        """
+        Returns paths of the done artifacts of kind requires for meetings in time frame that have no done artifact of kind yet,
+        i.e. the inputs a stage still has to process.
+
+        Parameters:
+        - kind (str): string object of artifact kind a stage writes.
+        - requires (str): string object of artifact kind the stage reads.
+        - start_day (datetime): datetime object of earliest day in timeframe.
+        - end_day (datetime): datetime object of latest day in timeframe.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                """
+                SELECT a.path FROM meetings m JOIN artifacts a ON a.stem = m.stem
+                WHERE m.date BETWEEN ? AND ? AND a.kind = ? AND a.status = 'done'
+                AND NOT EXISTS (SELECT 1 FROM artifacts b WHERE b.stem = m.stem AND b.kind = ? AND b.status = 'done')
+                ORDER BY m.stem
+                """,
+                (start_day.strftime("%Y%m%d"), end_day.strftime("%Y%m%d"), requires, kind),
+            ).fetchall()
+        return [Path(row[0]) for row in rows]
+
+    def meetings(self, start_day: datetime, end_day: datetime):
+        """
+        Returns stems of meetings in time frame.
+
+        Parameters:
+        - start_day (datetime): datetime object of earliest day in timeframe.
+        - end_day (datetime): datetime object of latest day in timeframe.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT stem FROM meetings WHERE date BETWEEN ? AND ? ORDER BY stem",
+                (start_day.strftime("%Y%m%d"), end_day.strftime("%Y%m%d")),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def sync_folder(self, kind: str, folder: Path, patterns, column: str = None):
+        """
+        Records the files of a folder no stage writes (input URLs) or written before the catalog existed.
+        Only files whose path, size or modification time changed are hashed again, and deleted files are marked missing.
+
+        Parameters:
+        - kind (str): string object of artifact kind.
+        - folder (Path): Path object of folder of artifact files named by meeting stem.
+        - patterns: glob pattern of artifact files, or tuple of patterns where files of later patterns win for the same meeting.
+        - column (str): optional string object of CSV column, only files whose header has it are recorded.
+        """
+        with self.lock:
+            known = {
+                row[0]: row[1:]
+                for row in self.conn.execute("SELECT stem, path, size, mtime_ns, status, inputs FROM artifacts WHERE kind = ?", (kind,))
+            }
+
+        files = {}
+        for pattern in ([patterns] if isinstance(patterns, str) else patterns):
+            for path in sorted(folder.glob(pattern)):
+                try:
+                    parse_stem(path.stem)
+                except ValueError:
+                    continue
+                files[path.stem] = path
+
+        for stem, path in files.items():
+            stat = os.stat(path)
+            row = known.get(stem)
+            if row is not None and row[:4] == (str(path), stat.st_size, stat.st_mtime_ns, "done"):
+                continue
+            # run_pipeline tracks what it wrote by input fingerprint, an in-place rewrite downstream is not a new version
+            if row is not None and row[0] == str(path) and row[3] == "done" and row[4] is not None:
+                continue
+            if column is not None:
+                with open(path, "r", encoding="utf-8") as f:
+                    if column not in f.readline().strip().split(","):
+                        continue
+            self.record(kind, path)
+
+        for stem, (path, _, _, status, _) in known.items():
+            if status == "done" and Path(path).parent == folder and not Path(path).exists():
+                self.record(kind, Path(path))
+
+    def report(self):
+        """
+        Prints number of done artifacts of each kind.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT kind, COUNT(*) FROM artifacts WHERE status = 'done' GROUP BY kind ORDER BY kind"
+            ).fetchall()
+        for kind, count in rows:
+            print(f"{kind}: {count} meetings")
+
+
+def meeting_paths(folder: Path, pattern: str, start_day: datetime, end_day: datetime, catalog: MeetingCatalog = None, kind: str = None):
+    """
+    Returns paths of artifacts of meetings in time frame, from the catalog, or by scanning the folder without one
+    or while the catalog has no artifact of the kind (before the one-time import).
+
+    Parameters:
+    - folder (Path): Path object of folder of artifact files, scanned if the catalog cannot answer.
+    - pattern (str): string object of glob pattern of artifact files, used when scanning.
+    - start_day (datetime): datetime object of earliest day in timeframe.
+    - end_day (datetime): datetime object of latest day in timeframe.
+    - catalog (MeetingCatalog): optional MeetingCatalog object.
+    - kind (str): string object of artifact kind looked up in the catalog.
+    """
+    if catalog is not None and catalog.knows(kind):
+        return catalog.paths(kind, start_day, end_day)
+
+    paths = []
+    for path in sorted(folder.rglob(pattern)):
+        meeting_date = str(path.name).split("_")[0]
+        meeting_datetime = datetime.strptime(meeting_date, "%Y%m%d")
+
+        # skip, out of time frame
+        if not (start_day <= meeting_datetime <= end_day):
+            continue
+
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,414 @@
+import os
+import json
+import hashlib
+import importlib
+import threading
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from meeting_catalog import MeetingCatalog, audio_file, file_hash
+from artifact_store import ArtifactStore
+
+
+def main():
+    ######## CONFIGURATION ########
+    CATALOG_PATH = Path("meeting_catalog.sqlite")
+    START_DAY = datetime.strptime("20250519", "%Y%m%d")
+    END_DAY = datetime.strptime("20250523", "%Y%m%d")
+    WORKERS = 4
+    ADOPT_EXISTING_OUTPUTS = True  # record outputs of stage scripts run by hand as up to date instead of re-running
+    USE_ARTIFACT_STORE = False  # same setting as in _06, _10 and _11, which keep their columns in the store when it is on
+    ARTIFACT_STORE_PATH = Path("artifacts.sqlite")
+    ###############################
+
+    store = ArtifactStore(ARTIFACT_STORE_PATH) if USE_ARTIFACT_STORE else None
+
+    run_pipeline(CATALOG_PATH, START_DAY, END_DAY, WORKERS, ADOPT_EXISTING_OUTPUTS, store)
+
+
+# per meeting stage graph. "kind" is the meeting catalog artifact kind of the output, "deps" are upstream stages,
+# "raw" are input files no stage produces, "output" is the file the stage writes (agenda_segments and legislations
+# are rewritten in place downstream). {audio} is the meeting's audio file in whichever format it was downloaded in.
+STAGES = {
+    "agenda_download": {
+        "kind": "agenda_pdf",
+        "deps": [],
+        "raw": ["__input_legistar_urls/{stem}.txt"],
+        "output": "agendas_raw/{stem}.pdf",
+    },
+    "agenda_preprocessing": {
+        "kind": "agenda_text",
+        "deps": ["agenda_download"],
+        "raw": [],
+        "output": "agendas_processed/{stem}.txt",
+    },
+    "agenda_segmentation": {
+        "kind": "agenda_segments",
+        "deps": ["agenda_preprocessing"],
+        "raw": [],
+        "output": "agenda_segments/{stem}.csv",
+    },
+    "legislation_link_fetching": {
+        "kind": "legislation_links",
+        "deps": [],
+        "raw": ["__input_legistar_urls/{stem}.txt"],
+        "output": "legislations/{stem}.csv",
+    },
+    "legislation_text_fetching": {
+        "kind": "legislations",
+        "deps": ["legislation_link_fetching"],
+        "raw": [],
+        "output": "legislations/{stem}.csv",
+    },
+    "legislation_matching": {
+        "kind": "matched_legislation",
+        "deps": ["agenda_segmentation", "legislation_text_fetching"],
+        "raw": [],
+        "output": "agenda_segments/{stem}.csv",
+    },
+    "audio_download": {
+        "kind": "audio",
+        "deps": [],
+        "raw": ["__input_youtube_urls/{stem}.txt"],
+        "output": "{audio}",
+    },
+    "audio_transcription": {
+        "kind": "transcript",
+        "deps": ["audio_download"],
+        "raw": [],
+        "output": "transcripts/{stem}.txt",
+        "exclusive": True,
+    },
+    "transcript_segmentation": {
+        "kind": "transcript_segments",
+        "deps": ["audio_transcription", "agenda_segmentation"],
+        "raw": [],
+        "output": "transcript_segments/{stem}.csv",
+    },
+    "combine_segments": {
+        "kind": "combined_segments",
+        "deps": ["transcript_segmentation", "legislation_matching"],
+        "raw": [],
+        "output": "agenda_segments/{stem}.csv",
+    },
+    "headline_summary_generation": {
+        "kind": "reports",
+        "deps": ["combine_segments"],
+        "raw": [],
+        "output": "reports/{stem}.csv",
+    },
+}
+
+
+class PipelineContext:
+    """
+    Holds configuration and lazily created resources (Claude client, web drivers, Whisper) shared by stage runners.
+
+    Parameters:
+    - catalog (MeetingCatalog): MeetingCatalog object where stage outputs and their input fingerprints are recorded.
+    - store (ArtifactStore): optional ArtifactStore object passed to the stages that add agenda segment columns.
+    """
+    def __init__(self, catalog: MeetingCatalog, store: ArtifactStore = None):
+        self.catalog = catalog
+        self.store = store
+        self.lock = threading.Lock()
+        self.exclusive_lock = threading.Lock()
+        self.local = threading.local()
+        self.drivers = []
+        self.resources = {}
+
+    def get(self, name: str, factory):
+        """
+        Returns a shared resource, creating it on first use.
+
+        Parameters:
+        - name (str): string object of resource name.
+        - factory: function that creates the resource.
+        """
+        with self.lock:
+            if name not in self.resources:
+                self.resources[name] = factory()
+            return self.resources[name]
+
+    def claude_client(self):
+        def factory():
+            import anthropic
+            from dotenv import load_dotenv
+            from llm_cache import LLMCache, CachedClient
+            load_dotenv()
+            return CachedClient(anthropic.Anthropic(api_key=os.getenv("CLAUDE_KEY")), LLMCache(Path("llm_cache.sqlite")))
+        return self.get("claude_client", factory)
+
+    def driver(self):
+        # selenium drivers are not thread safe, so each worker thread gets its own
+        if not hasattr(self.local, "driver"):
+            from selenium import webdriver
+            from selenium.webdriver.chrome.service import Service
+            from selenium.webdriver.chrome.options import Options
+            from webdriver_manager.chrome import ChromeDriverManager
+
+            chrome_options = Options()
+            chrome_options.add_argument("--headless")
+            chrome_options.add_argument("--disable-gpu")
+            chrome_options.add_argument("--window-size=1920,1080")
+            self.local.driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+            with self.lock:
+                self.drivers.append(self.local.driver)
+        return self.local.driver
+
+    def close(self):
+        for driver in self.drivers:
+            driver.quit()
+
+
+def run_stage(stage: str, stem: str, ctx: PipelineContext):
+    """
+    Runs one stage for one meeting by calling the per meeting function of the stage script.
+
+    Parameters:
+    - stage (str): string object of stage name (key of STAGES).
+    - stem (str): string object of meeting file stem, e.g. 20250519_REG.
+    - ctx (PipelineContext): PipelineContext object of shared resources.
+    """
+    if stage == "agenda_download":
+        module = importlib.import_module("_01_agenda_download")
+        Path("agendas_raw").mkdir(parents=True, exist_ok=True)
+        module.download_agenda(Path(f"__input_legistar_urls/{stem}.txt"), Path("agendas_raw"), "ctl00_ContentPlaceHolder1_hypMinutes")
+
+    elif stage == "agenda_preprocessing":
+        module = importlib.import_module("_02_agenda_preprocessing")
+        module.process_pdf_to_text(Path(f"agendas_raw/{stem}.pdf"), Path(f"agendas_processed/{stem}.txt"), "pymupdf")
+
+    elif stage == "agenda_segmentation":
+        module = importlib.import_module("_03_agenda_segmentation")
+        Path("agenda_segments").mkdir(parents=True, exist_ok=True)
+        text = Path(f"agendas_processed/{stem}.txt").read_text(encoding="utf-8")
+        segments_json = module.claude_segment(text, "claude-3-5-haiku-20241022", ctx.claude_client())
+        module.save_json_segments_to_csv(segments_json, Path(f"agenda_segments/{stem}.csv"))
+
+    elif stage == "legislation_link_fetching":
+        module = importlib.import_module("_04_legislation_link_fetching")
+        Path("legislations").mkdir(parents=True, exist_ok=True)
+        module.fetch_meeting_links(Path(f"__input_legistar_urls/{stem}.txt"), Path("legislations"), "ctl00_ContentPlaceHolder1_gridMain_ctl00")
+
+    elif stage == "legislation_text_fetching":
+        module = importlib.import_module("_05_legislation_text_fetching")
+        tab_xpath = '//li[contains(@class, "rtsLI") and contains(@class, "rtsLast")]//span[contains(@class, "rtsTxt") and text()="Text"]/ancestor::li'
+        session = ctx.get("http_session", lambda: module.make_session(8))
+        limiter = ctx.get("host_limiter", lambda: module.HostLimiter(4))
+        store = ctx.get("legislation_store", lambda: importlib.import_module("legislation_store").LegislationStore(Path("legislation_store.sqlite"), 7 * 24 * 60 * 60))
+        module.fetch_meeting_text(Path(f"legislations/{stem}.csv"), tab_xpath, "ctl00_ContentPlaceHolder1_pageText", ctx.driver, session, limiter, 8, store)
+
+    elif stage == "legislation_matching":
+        module = importlib.import_module("_06_legislation_matching")
+        module.match_meeting_legislation(Path(f"legislations/{stem}.csv"), Path(f"agenda_segments/{stem}.csv"), ctx.store)
+
+    elif stage == "audio_download":
+        module = importlib.import_module("_07_audio_download")
+        Path("audios").mkdir(parents=True, exist_ok=True)
+        link = Path(f"__input_youtube_urls/{stem}.txt").read_text().strip()
+        module.download_audio(link, audio_file(Path("audios"), stem))
+
+    elif stage == "audio_transcription":
+        module = importlib.import_module("_08_audio_transcription")
+        # in chunked mode every worker process loads its own model
+        asr_model = None if module.CHUNKED else ctx.get("asr_model", lambda: module.whisper.load_model(module.ASR_MODEL_NAME))
+        punct_model = ctx.get("punct_model", module.PunctuationModel)
+        Path("transcripts").mkdir(parents=True, exist_ok=True)
+        module.transcribe_meeting(
+            audio_file(Path("audios"), stem),
+            Path(f"transcripts/{stem}.txt"),
+            asr_model,
+            punct_model,
+            module.CHUNKED,
+            module.ASR_MODEL_NAME,
+            module.CHUNK_SECONDS,
+            module.count_chunk_workers(module.THREADS_PER_WORKER),
+            module.THREADS_PER_WORKER,
+            module.punct_options(),
+        )
+
+    elif stage == "transcript_segmentation":
+        module = importlib.import_module("_09_transcript_segmentation")
+        module.segment_transcript(
+            Path(f"transcripts/{stem}.txt"),
+            Path(f"agenda_segments/{stem}.csv"),
+            Path(f"transcript_segments/{stem}.csv"),
+            module.SEGMENTATION_MODEL,
+            ctx.claude_client(),
+            module.CHUNKED,
+            module.WINDOW_WORDS,
+            module.OVERLAP_WORDS,
+            module.MAX_WORKERS,
+            module.USE_SEGMENT_OFFSETS,
+            module.PRE_ALIGN,
+            module.ALIGN_BLOCK_WORDS,
+            module.ALIGN_MARGIN,
+            module.ALIGN_MAX_BLOCKS,
+        )
+
+    elif stage == "combine_segments":
+        module = importlib.import_module("_10_combine_segments")
+        module.combine_segments(Path(f"agenda_segments/{stem}.csv"), Path(f"transcript_segments/{stem}.csv"), Path(f"transcripts/{stem}_segments.csv"), ctx.store)
+
+    elif stage == "headline_summary_generation":
+        module = importlib.import_module("_11_headline_summary_generation")
+        Path("reports").mkdir(parents=True, exist_ok=True)
+        stats = module.SingleCallStats() if module.SINGLE_CALL else None
+        module.generate_meeting_headlines_summaries(Path(f"agenda_segments/{stem}.csv"), Path(f"reports/{stem}.csv"), module.HEADLINE_MODEL, module.SUMMARY_MODEL, module.RATE_LIMIT_SECONDS, ctx.claude_client(), ctx.store, stats=stats)
+        if stats is not None:
+            stats.report()
+
+
+def output_path(stage: str, stem: str):
+    """
+    Returns the path of a stage's output file for one meeting.
+
+    Parameters:
+    - stage (str): string object of stage name.
+    - stem (str): string object of meeting file stem.
+    """
+    return Path(STAGES[stage]["output"].format(stem=stem, audio=audio_file(Path("audios"), stem)))
+
+
+def stage_fingerprint(stage: str, stem: str, catalog: MeetingCatalog):
+    """
+    Returns a hash of everything a stage reads: the catalog hashes of its upstream stages' outputs and the
+    content hashes of its raw inputs. Returns None if an upstream stage is not done or a raw input is missing.
+
+    Using the hash recorded when the upstream stage ran (instead of hashing the file again) keeps stages that rewrite
+    their input in place (legislation_matching, combine_segments) from making their upstream stage look stale.
+
+    Parameters:
+    - stage (str): string object of stage name.
+    - stem (str): string object of meeting file stem.
+    - catalog (MeetingCatalog): MeetingCatalog object of recorded stage outputs.
+    """
+    parts = {}
+    for dep in STAGES[stage]["deps"]:
+        recorded = catalog.get(STAGES[dep]["kind"], stem)
+        if recorded is None or recorded["status"] != "done":
+            return None
+        parts[dep] = recorded["hash"]
+
+    for raw in STAGES[stage]["raw"]:
+        path = Path(raw.format(stem=stem))
+        if not path.exists():
+            return None
+        parts[raw] = file_hash(path)
+
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def topological_order():
+    """
+    Returns stage names ordered so every stage comes after its dependencies.
+    """
+    order, done = [], set()
+
+    def visit(stage):
+        if stage in done:
+            return
+        for dep in STAGES[stage]["deps"]:
+            visit(dep)
+        done.add(stage)
+        order.append(stage)
+
+    for stage in STAGES:
+        visit(stage)
+    return order
+
+
+def run_meeting(stem: str, adopt_existing: bool, ctx: PipelineContext):
+    """
+    Runs the stale stages of one meeting in dependency order.
+
+    Parameters:
+    - stem (str): string object of meeting file stem.
+    - adopt_existing (bool): bool object, if True outputs of stages with no recorded run are recorded instead of re-run.
+    - ctx (PipelineContext): PipelineContext object of shared resources.
+    """
+    ran = []
+
+    for stage in topological_order():
+        kind = STAGES[stage]["kind"]
+
+        # blocked, upstream stage failed or raw input missing
+        fingerprint = stage_fingerprint(stage, stem, ctx.catalog)
+        if fingerprint is None:
+            continue
+
+        recorded = ctx.catalog.get(kind, stem)
+        path = output_path(stage, stem)
+
+        # skip, up to date
+        if recorded and recorded["status"] == "done" and recorded["inputs"] == fingerprint and path.exists():
+            continue
+
+        # output of a stage script run by hand, or from before the pipeline kept state. A file another stage
+        # also writes (rewritten in place) only counts if the catalog recorded it as this stage's kind.
+        if recorded is None:
+            adoptable = not any(other != stage and STAGES[other]["output"] == STAGES[stage]["output"] for other in STAGES)
+        else:
+            adoptable = recorded["status"] == "done" and recorded["inputs"] is None
+        if adopt_existing and adoptable and path.exists():
+            ctx.catalog.record(kind, path, "done", fingerprint)
+            continue
+
+        print(f"running {stage}: {stem}")
+        try:
+            if STAGES[stage].get("exclusive"):
+                with ctx.exclusive_lock:
+                    run_stage(stage, stem, ctx)
+            else:
+                run_stage(stage, stem, ctx)
+        except Exception as e:
+            print(f"!!! {stage} failed for {stem}: {e}")
+            ctx.catalog.record(kind, path, "failed")
+            continue
+
+        # the audio file name depends on the format it was downloaded in
+        path = output_path(stage, stem)
+        if not path.exists():
+            print(f"!!! {stage} produced no output for {stem}")
+            ctx.catalog.record(kind, path)
+            continue
+
+        ctx.catalog.record(kind, path, "done", fingerprint)
+        ran.append(stage)
+
+    return ran
+
+
+def run_pipeline(catalog_path: Path, start_day: datetime, end_day: datetime, workers: int, adopt_existing: bool = False, store: ArtifactStore = None):
+    """
+    Runs only the stale stages of every meeting in time frame, with independent meetings in parallel.
+    Every stage output is recorded in the meeting catalog with the fingerprint of the inputs it was made from.
+
+    Parameters:
+    - catalog_path (Path): Path object of meeting catalog SQLite file, where meetings are looked up and stage outputs recorded.
+    - start_day (datetime): datetime object of earliest day in timeframe.
+    - end_day (datetime): datetime object of latest day in timeframe.
+    - workers (int): int object of number of meetings processed at once.
+    - adopt_existing (bool): bool object, if True outputs of stages with no recorded run are recorded instead of re-run.
+    - store (ArtifactStore): optional ArtifactStore object, legislation matching, segment combining and headline generation keep their columns there.
+    """
+    # meetings are defined by their input URL files
+    catalog = MeetingCatalog(catalog_path)
+    catalog.sync_folder("legistar_url", Path("__input_legistar_urls"), "*.txt")
+    catalog.sync_folder("youtube_url", Path("__input_youtube_urls"), "*.txt")
+    stems = catalog.meetings(start_day, end_day)
+
+    ctx = PipelineContext(catalog, store)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = dict(zip(stems, pool.map(lambda stem: run_meeting(stem, adopt_existing, ctx), stems)))
+    finally:
+        ctx.close()
+
+    for stem, ran in results.items():
+        print(f"{stem}: {', '.join(ran) if ran else 'up to date'}")
+
+
+if __name__ == "__main__":
+    main()